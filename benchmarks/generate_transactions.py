@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute  # noqa: F401  (pa.compute)
+import pyarrow.csv as pacsv
+
+
+# Rows are generated in fixed-size chunks, each from its own seeded stream,
+# so a spec always yields the same rows however they are consumed
+GEN_CHUNK_ROWS = 500_000
+
+TRANSACTION_TYPES = np.array(["INCOME", "EXPENSE", "REFUND"])
+TYPE_WEIGHTS = (0.3, 0.6, 0.1)
+DESCRIPTIONS = np.array(["Supplier invoice", "Grant payment", "Tuition fee", "Refund", "Travel"])
+
+# One injected defect per affected row, named after the rule it breaks
+# (src/validation/rules.py); wrong_amount_sign breaks the R6 rule of the
+# row's type. Read through read_transactions_csv, a non-numeric amount keeps
+# the amount column as text so the non_numeric_amount rule reports it.
+ERROR_KINDS = (
+    "missing_transaction_id",
+    "missing_transaction_date",
+    "missing_department_id",
+    "missing_transaction_type",
+    "missing_amount",
+    "invalid_transaction_date",
+    "non_numeric_amount",
+    "invalid_transaction_type",
+    "wrong_amount_sign",
+    "duplicate_transaction_id",
+)
+# What src/ingestion/load_csv.py quarantines; it fails on any other CRITICAL rule
+QUARANTINE_ERROR_RATES = {
+    "missing_transaction_id": 0.001,
+    "missing_transaction_date": 0.001,
+    "missing_department_id": 0.001,
+    "missing_transaction_type": 0.001,
+    "missing_amount": 0.001,
+    "invalid_transaction_date": 0.002,
+    "duplicate_transaction_id": 0.001,
+}
+# Everything ingestion/validate_raw_data.py rejects, under its 5% threshold
+VALIDATION_ERROR_RATES = {
+    **QUARANTINE_ERROR_RATES,
+    "non_numeric_amount": 0.001,
+    "invalid_transaction_type": 0.001,
+    "wrong_amount_sign": 0.002,
+}
+ERROR_PRESETS = {
+    "none": {},
+    "quarantine": QUARANTINE_ERROR_RATES,
+    "validation": VALIDATION_ERROR_RATES,
+}
+
+
+@dataclass(frozen=True)
+class SyntheticSpec:
+    """What to generate: ``rows`` transactions over ``departments`` and ``days``."""
+
+    rows: int
+    departments: int = 40
+    start_date: str = "2024-01-01"
+    days: int = 730
+    error_rates: Dict[str, float] = field(default_factory=dict)
+    seed: int = 0
+    id_offset: int = 0
+
+    def __post_init__(self) -> None:
+        unknown = set(self.error_rates) - set(ERROR_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown error kinds: {sorted(unknown)}")
+        if sum(self.error_rates.values()) >= 1:
+            raise ValueError("Error rates must sum to less than 1")
+
+
+def _chunk_bounds(spec: SyntheticSpec) -> Iterator[tuple[int, int, int]]:
+    for i, lo in enumerate(range(0, spec.rows, GEN_CHUNK_ROWS)):
+        yield i, lo, min(lo + GEN_CHUNK_ROWS, spec.rows)
+
+
+def _error_kinds(spec: SyntheticSpec, chunk: int, n: int) -> np.ndarray:
+    """Index into ERROR_KINDS per row, len(ERROR_KINDS) for clean rows."""
+    rates = np.array([spec.error_rates.get(k, 0.0) for k in ERROR_KINDS])
+    u = np.random.default_rng([spec.seed, chunk, 1]).random(n)
+    kinds = np.searchsorted(np.cumsum(rates), u, side="right")
+    # Duplicates copy the id of the chunk's first row, which stays clean
+    kinds[:1] = len(ERROR_KINDS)
+    return kinds
+
+
+def _labels(prefix: str, values: np.ndarray, width: int) -> pa.Array:
+    return pa.compute.binary_join_element_wise(
+        prefix, pa.compute.utf8_lpad(pa.array(values).cast(pa.string()), width, "0"), ""
+    )
+
+
+def _chunk_table(spec: SyntheticSpec, chunk: int, lo: int, hi: int) -> pa.Table:
+    n = hi - lo
+    rng = np.random.default_rng([spec.seed, chunk])
+    start = date.fromisoformat(spec.start_date)
+    day_labels = np.array([(start + timedelta(days=d)).isoformat() for d in range(spec.days)])
+    dept_labels = np.array([f"D{d:03d}" for d in range(1, spec.departments + 1)])
+
+    ids = np.asarray(_labels("T", np.arange(spec.id_offset + lo, spec.id_offset + hi), 10), dtype=object)
+    dates = day_labels[rng.integers(0, spec.days, n)].astype(object)
+    depts = dept_labels[rng.integers(0, spec.departments, n)].astype(object)
+    types = TRANSACTION_TYPES[rng.choice(len(TRANSACTION_TYPES), n, p=TYPE_WEIGHTS)].astype(object)
+    cents = np.exp(rng.normal(9.0, 1.5, n)).astype(np.int64).clip(1, 10_000_000)
+    cents = np.where(types == "REFUND", -cents, cents)
+    descriptions = DESCRIPTIONS[rng.integers(0, len(DESCRIPTIONS), n)]
+
+    kinds = _error_kinds(spec, chunk, n)
+    kind = {k: kinds == i for i, k in enumerate(ERROR_KINDS)}
+    ids[kind["missing_transaction_id"]] = None
+    ids[kind["duplicate_transaction_id"]] = ids[0]
+    dates[kind["missing_transaction_date"]] = None
+    dates[kind["invalid_transaction_date"]] = "2024-02-30"
+    depts[kind["missing_department_id"]] = None
+    types[kind["missing_transaction_type"]] = None
+    types[kind["invalid_transaction_type"]] = "TRANSFER"
+    cents = np.where(kind["wrong_amount_sign"], -cents, cents)
+
+    # Two-decimal text, as amounts appear in the ledgers
+    whole = pa.array(np.abs(cents) // 100).cast(pa.string())
+    frac = pa.compute.utf8_lpad(pa.array(np.abs(cents) % 100).cast(pa.string()), 2, "0")
+    sign = pa.array(np.where(cents < 0, "-", ""))
+    amounts = pa.compute.binary_join_element_wise(sign, whole, ".", frac, "")
+    amounts = amounts.to_numpy(zero_copy_only=False).astype(object)
+    amounts[kind["missing_amount"]] = None
+    # A typo pandas does not read as missing (as it would "n/a")
+    amounts[kind["non_numeric_amount"]] = "12.3O"
+
+    return pa.table(
+        {
+            "transaction_id": pa.array(ids, pa.string()),
+            "transaction_date": pa.array(dates, pa.string()),
+            "department_id": pa.array(depts, pa.string()),
+            "transaction_type": pa.array(types, pa.string()),
+            "amount": pa.array(amounts, pa.string()),
+            "description": pa.array(descriptions, pa.string()),
+        }
+    )
+
+
+def iter_transaction_tables(spec: SyntheticSpec) -> Iterator[pa.Table]:
+    """The synthetic rows as Arrow tables of raw (string) columns."""
+    for chunk, lo, hi in _chunk_bounds(spec):
+        yield _chunk_table(spec, chunk, lo, hi)
+
+
+def generate_transactions(spec: SyntheticSpec) -> pd.DataFrame:
+    """The synthetic rows in memory, as the raw CSV text would read."""
+    return pa.concat_tables(iter_transaction_tables(spec)).to_pandas()
+
+
+def injected_errors(spec: SyntheticSpec) -> Dict[str, int]:
+    """How many rows of each error kind ``spec`` injects."""
+    counts = np.zeros(len(ERROR_KINDS) + 1, dtype=np.int64)
+    for chunk, lo, hi in _chunk_bounds(spec):
+        counts += np.bincount(_error_kinds(spec, chunk, hi - lo), minlength=len(counts))
+    return {k: int(c) for k, c in zip(ERROR_KINDS, counts) if c}
+
+
+def write_transactions_csv(spec: SyntheticSpec, path: Path) -> Path:
+    """Write the rows as a raw transactions CSV, chunk by chunk."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tables = iter_transaction_tables(spec)
+    first = next(tables)
+    options = pacsv.WriteOptions(quoting_style="none")
+    with pacsv.CSVWriter(path, first.schema, write_options=options) as writer:
+        writer.write_table(first)
+        for table in tables:
+            writer.write_table(table)
+    return path
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate a synthetic transactions CSV")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--out", type=Path, default=Path("data/raw/transactions_synthetic.csv"))
+    parser.add_argument("--departments", type=int, default=40)
+    parser.add_argument("--start-date", default="2024-01-01")
+    parser.add_argument("--days", type=int, default=730, help="Date span in days")
+    parser.add_argument(
+        "--errors",
+        choices=sorted(ERROR_PRESETS),
+        default="quarantine",
+        help="Injected defects: quarantine (what ingestion quarantines), validation (all rules) or none",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--id-offset", type=int, default=0, help="First transaction id number")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    spec = SyntheticSpec(
+        rows=args.rows,
+        departments=args.departments,
+        start_date=args.start_date,
+        days=args.days,
+        error_rates=ERROR_PRESETS[args.errors],
+        seed=args.seed,
+        id_offset=args.id_offset,
+    )
+    path = write_transactions_csv(spec, args.out)
+    print(f"✅ wrote {spec.rows} rows to {path}; injected errors: {injected_errors(spec)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+BASELINE_PATH = PROJECT_ROOT / "benchmarks" / "baseline.json"
+WORK_DIR = Path(tempfile.gettempdir()) / "pipeline_benchmarks"
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+TOLERANCE = 0.3
+
+# Benchmarked stages, in run order, with the stage whose outputs they read.
+# extract only prepares validate's input and is not reported.
+STAGES = ("load", "transform", "transform_duckdb", "validate", "build")
+NEEDS = {
+    "transform": "load",
+    "transform_duckdb": "load",
+    "validate": "extract",
+    "build": "validate",
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark each pipeline stage on synthetic data and compare with a baseline"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: int(float(s)),
+        nargs="+",
+        default=list(DEFAULT_SIZES),
+        help="Row counts to run at, e.g. 1e4 1e5 1e6 1e7",
+    )
+    parser.add_argument(
+        "--stages", nargs="+", choices=STAGES, default=list(STAGES), help="Stages to report"
+    )
+    parser.add_argument("--workdir", type=Path, default=WORK_DIR, help="Generated data and outputs")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Store these results as the baseline"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=TOLERANCE,
+        help="Relative slowdown / memory growth over the baseline reported as a regression",
+    )
+    parser.add_argument(
+        "--check", action="store_true", help="Exit with status 1 when a stage regressed"
+    )
+    parser.add_argument("--out", type=Path, default=None, help="Also write the results as JSON")
+    # Internal: run one stage in this (fresh) process and print its timing
+    parser.add_argument("--run-stage", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+# --- Stages (run with the size's work directory as cwd) ---
+
+
+def _extract(raw: Path) -> None:
+    from ingestion.extract_csv_data import extract
+
+    extract(raw)
+
+
+def _load(raw: Path) -> None:
+    from src.ingestion.load_csv import load_transactions_csv
+
+    load_transactions_csv(raw_path=raw, processed_dir=Path("processed"))
+
+
+def _transform(raw: Path) -> None:
+    from src.transforms.transform_transactions import transform_transactions
+
+    transform_transactions(processed_dir=Path("processed"), gold_dir=Path("gold"))
+
+
+def _transform_duckdb(raw: Path) -> None:
+    from src.transforms.duckdb_backend import transform_transactions_duckdb
+
+    transform_transactions_duckdb(processed_dir=Path("processed"), gold_dir=Path("gold_duckdb"))
+
+
+# Stages run in the benchmark work dir; keep their id index there too
+# instead of touching the project's warehouse index
+BENCH_ID_INDEX = Path("warehouse_transaction_ids.npy")
+
+
+def _validate(raw: Path) -> None:
+    from ingestion import validate_raw_data
+
+    validate_raw_data.ID_INDEX_PATH = BENCH_ID_INDEX
+    # Validate a fresh batch each time, not one the build stage already loaded
+    BENCH_ID_INDEX.unlink(missing_ok=True)
+    validate_raw_data.validate("lenient")
+
+
+def _build(raw: Path) -> None:
+    import duckdb
+
+    from transformations import run_build
+
+    run_build.ID_INDEX_PATH = BENCH_ID_INDEX
+    con = duckdb.connect(str(run_build.DB_PATH))
+    try:
+        # A full build; the SQL files are read relative to the project root
+        sql_files = [PROJECT_ROOT / p for p in run_build.SQL_FILES]
+        run_build.run_sql_files(con, sql_files)
+        run_build.rebuild_id_index(con)
+    finally:
+        con.close()
+
+
+STAGE_FUNCS: Dict[str, Callable[[Path], None]] = {
+    "extract": _extract,
+    "load": _load,
+    "transform": _transform,
+    "transform_duckdb": _transform_duckdb,
+    "validate": _validate,
+    "build": _build,
+}
+
+
+def run_stage(stage: str, rows: int) -> Dict[str, Any]:
+    """
+    Time ``stage`` in this process (cwd is the size's work directory).
+    Throughput is over the generated rows, so stages compare directly.
+    """
+    from src.metrics.timing import StageTimer
+
+    timer = StageTimer()
+    with timer.stage(stage, rows):
+        STAGE_FUNCS[stage](Path("raw.csv"))
+    return timer.to_dict()[stage]
+
+
+def _stage_subprocess(stage: str, rows: int, size_dir: Path) -> Dict[str, Any]:
+    # A fresh interpreter per stage: peak RSS is that stage's, not the run's
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT), LOG_LEVEL="WARNING")
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--run-stage", stage, "--rows", str(rows)],
+        cwd=size_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Benchmark {stage}@{rows} failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def prepare_data(rows: int, workdir: Path) -> Path:
+    """Generate (or reuse) the raw CSV for ``rows`` rows; returns its directory."""
+    from benchmarks.generate_transactions import (
+        QUARANTINE_ERROR_RATES,
+        SyntheticSpec,
+        write_transactions_csv,
+    )
+
+    size_dir = workdir / f"rows_{rows}"
+    size_dir.mkdir(parents=True, exist_ok=True)
+    # Quarantinable defects only: anything else fails the load stage
+    spec = SyntheticSpec(rows=rows, error_rates=QUARANTINE_ERROR_RATES)
+    spec_path = size_dir / "spec.json"
+    spec_json = json.dumps(spec.__dict__, sort_keys=True)
+    stale = not spec_path.exists() or spec_path.read_text() != spec_json
+    if stale or not (size_dir / "raw.csv").exists():
+        write_transactions_csv(spec, size_dir / "raw.csv")
+        spec_path.write_text(spec_json)
+    return size_dir
+
+
+def run_benchmarks(
+    sizes: List[int], stages: List[str], workdir: Path
+) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    for rows in sizes:
+        size_dir = prepare_data(rows, workdir)
+        # Requested stages plus whatever produces their inputs
+        todo = set(stages)
+        while any(NEEDS.get(s) not in todo for s in todo if s in NEEDS):
+            todo |= {NEEDS[s] for s in todo if s in NEEDS}
+        for stage in ("extract", *STAGES):
+            if stage not in todo:
+                continue
+            record = _stage_subprocess(stage, rows, size_dir)
+            if stage in stages:
+                results[f"{stage}@{rows}"] = record
+                print(
+                    f"✅ {stage}@{rows}: {record['wall_s']:.3f}s, "
+                    f"{record.get('rows_per_s', 0):,.0f} rows/s, {record.get('peak_rss_mb')} MB",
+                    flush=True,
+                )
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float
+) -> List[Dict[str, Any]]:
+    """One row per result with its baseline figures and a status."""
+    rows = []
+    for key, record in results.items():
+        base = baseline.get(key)
+        row = {
+            "benchmark": key,
+            "wall_s": record["wall_s"],
+            "rows_per_s": record.get("rows_per_s"),
+            "peak_rss_mb": record.get("peak_rss_mb"),
+            "base_rows_per_s": None,
+            "throughput": None,
+            "base_rss_mb": None,
+            "status": "new",
+        }
+        if base:
+            row["base_rows_per_s"] = base.get("rows_per_s")
+            row["base_rss_mb"] = base.get("peak_rss_mb")
+            status = "ok"
+            if row["rows_per_s"] and row["base_rows_per_s"]:
+                ratio = row["rows_per_s"] / row["base_rows_per_s"]
+                row["throughput"] = f"{ratio - 1:+.0%}"
+                if ratio < 1 - tolerance:
+                    status = "REGRESSION (speed)"
+            if row["peak_rss_mb"] and row["base_rss_mb"]:
+                if row["peak_rss_mb"] > row["base_rss_mb"] * (1 + tolerance):
+                    status = "REGRESSION (memory)"
+            row["status"] = status
+        rows.append(row)
+    return rows
+
+
+def main() -> None:
+    args = parse_args()
+    if args.run_stage:
+        print(json.dumps(run_stage(args.run_stage, args.rows)))
+        return
+
+    from src.metrics.summarize_runs import print_table
+
+    results = run_benchmarks(args.sizes, args.stages, args.workdir.resolve())
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8")).get("results", {})
+
+    rows = compare(results, baseline, args.tolerance)
+    print()
+    print_table(rows)
+
+    payload = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.out:
+        args.out.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    if args.save_baseline:
+        # Keep baseline entries for sizes/stages not run this time
+        if args.baseline.exists():
+            payload["results"] = {**baseline, **results}
+        args.baseline.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+        print(f"\nSaved baseline -> {args.baseline}")
+
+    if args.check and any(r["status"].startswith("REGRESSION") for r in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
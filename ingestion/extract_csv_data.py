@@ -1,32 +1,102 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
+
 import pandas as pd
 
 from ingestion.logging_config import setup_logging
+from src.ingestion.load_csv import concat_transaction_frames, resolve_raw_files
+from src.ingestion.manifest import MANIFEST_NAME, RawFileManifest
+from src.validation.validate_schema import read_transactions_csv
 
 logger = setup_logging("extract")
 
 RAW_PATH = Path("data/raw/transactions_sample.csv")
 OUT_PATH = Path("data/staging/transactions_raw.parquet")
+MANIFEST_PATH = OUT_PATH.parent / MANIFEST_NAME
 
-def main() -> None:
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Extract raw CSV data to staging parquet")
+    parser.add_argument(
+        "--raw",
+        default=str(RAW_PATH),
+        help="Raw input: a CSV file, a directory of CSV files, or a glob",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes used to read multiple files (default: all cores)",
+    )
+    return parser.parse_args()
+
+
+def extract(
+    raw: str | Path | list[str | Path] = RAW_PATH, workers: int | None = None
+) -> pd.DataFrame | None:
+    """
+    Read the raw CSV file(s) into the staging parquet and return the batch.
+    Returns None when the raw files are unchanged since the last extract
+    and the existing staging parquet was kept.
+    """
     logger.info("Starting extract step")
 
-    if not RAW_PATH.exists():
-        logger.error("Missing input file: %s", RAW_PATH)
-        raise FileNotFoundError(f"Missing input file: {RAW_PATH}")
+    try:
+        raw_files = resolve_raw_files(raw)
+    except FileNotFoundError:
+        logger.error("Missing input file: %s", raw)
+        raise
+
+    for path in raw_files:
+        if path.stat().st_size == 0:
+            logger.error("Input file is empty: %s", path)
+            raise ValueError(f"Input file is empty: {path}")
 
-    if RAW_PATH.stat().st_size == 0:
-        logger.error("Input file is empty: %s", RAW_PATH)
-        raise ValueError(f"Input file is empty: {RAW_PATH}")
+    manifest = RawFileManifest.load(MANIFEST_PATH)
+    statuses = [manifest.status(p) for p in raw_files]
+    if (
+        OUT_PATH.exists()
+        and set(statuses) == {"unchanged"}
+        and len(raw_files) == len(manifest.entries)
+    ):
+        manifest.save()
+        logger.info("Raw files unchanged since last extract; keeping %s", OUT_PATH)
+        return None
 
-    logger.info("Reading CSV from %s", RAW_PATH.resolve())
-    df = pd.read_csv(RAW_PATH)
+    max_workers = min(workers or os.cpu_count() or 1, len(raw_files))
+    if max_workers <= 1:
+        frames = [read_transactions_csv(p) for p in raw_files]
+    else:
+        logger.info("Reading %d CSV files with %d workers", len(raw_files), max_workers)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            frames = list(pool.map(read_transactions_csv, raw_files))
+
+    for path, frame in zip(raw_files, frames):
+        logger.info("Read %d rows from %s", len(frame), path.resolve())
+    df = concat_transaction_frames(frames)
 
     OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
     df.to_parquet(OUT_PATH, index=False)
 
+    # The staging parquet is a snapshot of exactly these files
+    manifest.reset()
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    for path, frame in zip(raw_files, frames):
+        manifest.record(path, len(frame), run_id)
+    manifest.save()
+
     logger.info("Loaded %d rows", len(df))
     logger.info("Wrote raw parquet to %s", OUT_PATH.resolve())
+    return df
+
+
+def main() -> None:
+    args = parse_args()
+    extract(args.raw, args.workers)
+
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,25 @@
 from __future__ import annotations
 
 import argparse
+import json
+from datetime import datetime
 from pathlib import Path
 import sys
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from ingestion.logging_config import setup_logging
+from src.ingestion.load_csv import concat_transaction_frames
+from src.metrics.profile import BatchProfile
+from src.storage.id_index import ID_INDEX_PATH, TransactionIdIndex
+from src.validation.rules import (
+    CRITICAL,
+    WARNING,
+    RuleResult,
+    evaluate_rules,
+    missing_columns,
+)
 
 logger = setup_logging("validate")
 
@@ -13,19 +27,11 @@ IN_PATH = Path("data/staging/transactions_raw.parquet")
 VALID_OUT_PATH = Path("data/staging/transactions_valid.parquet")
 REJECTED_OUT_PATH = Path("data/staging/transactions_rejected.parquet")
 REPORT_PATH = Path("data/staging/validation_report.txt")
-
-REQUIRED_COLS = [
-    "transaction_id",
-    "transaction_date",
-    "department_id",
-    "transaction_type",
-    "amount",
-]
-
-ALLOWED_TRANSACTION_TYPES = {"EXPENSE", "INCOME", "REFUND"}
+METRICS_DIR = Path("metrics")
 
 MAX_REJECT_RATE = 0.05   # 5%
 MAX_REJECT_ROWS = 0      # disabled
+CHUNK_ROWS = 100_000
 
 
 def parse_args() -> argparse.Namespace:
@@ -36,123 +42,251 @@ def parse_args() -> argparse.Namespace:
         default="strict",
         help="Validation mode: strict fails on threshold breach, lenient logs warnings only",
     )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=CHUNK_ROWS,
+        help="Rows validated per chunk; strict mode stops at the first chunk that breaches the threshold",
+    )
     return parser.parse_args()
 
 
-def main() -> None:
-    args = parse_args()
+def budget_breached(rejected_n: int, total: int) -> bool:
+    """
+    True once ``rejected_n`` rejects break the threshold for a file of
+    ``total`` rows. Rejects only accumulate, so this holds for the final
+    count as soon as it holds for a partial one.
+    """
+    fail_by_rate = total > 0 and rejected_n / total > MAX_REJECT_RATE
+    fail_by_rows = (MAX_REJECT_ROWS > 0) and (rejected_n > MAX_REJECT_ROWS)
+    return fail_by_rate or fail_by_rows
+
+
+def apply_rules(
+    df: pd.DataFrame,
+    id_index: TransactionIdIndex | None = None,
+    seen_ids: TransactionIdIndex | None = None,
+) -> tuple[pd.DataFrame, RuleResult]:
+    """
+    Evaluate the shared rule set (rules 2-7) and return the typed frame
+    (parsed dates, numeric amounts and ``amount_cents``, the exact integer
+    amount the warehouse stores) with the per-row result. ``id_index``
+    adds the check against ids already in the warehouse, ``seen_ids`` the
+    check against earlier chunks of this file.
+    """
+    result = evaluate_rules(df, id_index=id_index, seen_ids=seen_ids)
+    df = df.copy()
+    df["transaction_date"] = result.context.dates
+    df["amount"] = result.context.amount
+    df["amount_cents"] = result.context.cents
+    return df, result
+
+
+def write_report(
+    path: Path,
+    result: RuleResult,
+    total: int,
+    valid_n: int,
+    rejected_n: int,
+    title: str = "Validation Report (Quarantine + Threshold Mode)",
+    rows_in_file: int | None = None,
+) -> None:
+    reject_rate = rejected_n / total if total else 0.0
+    with path.open("w", encoding="utf-8") as f:
+        f.write(f"{title}\n")
+        f.write("=" * len(title) + "\n\n")
+        f.write(f"Rows checked: {total}\n")
+        if rows_in_file is not None and rows_in_file != total:
+            f.write(f"Rows in file: {rows_in_file} (stopped early, counts are partial)\n")
+        f.write(f"Valid rows: {valid_n}\n")
+        f.write(f"Rejected rows: {rejected_n}\n")
+        f.write(f"Rejection rate: {reject_rate:.2%}\n\n")
 
-    logger.info("Starting validation step (quarantine + threshold mode)")
+        rejections = result.count(result.mask_for(severity=CRITICAL))
+        if rejected_n:
+            f.write("Rejection reasons (count)\n")
+            f.write("-------------------------\n")
+            for reason, count in sorted(rejections.items(), key=lambda kv: -kv[1]):
+                f.write(f"- {reason}: {count}\n")
+        else:
+            f.write("No rejected rows.\n")
 
-    if not IN_PATH.exists():
-        raise FileNotFoundError(f"Missing input file: {IN_PATH}")
+        warnings = result.count(result.mask_for(severity=WARNING))
+        if warnings:
+            f.write("\nWarnings (count, rows kept)\n")
+            f.write("---------------------------\n")
+            for reason, count in sorted(warnings.items(), key=lambda kv: -kv[1]):
+                f.write(f"- {reason}: {count}\n")
+
+        f.write("\nRule evaluation time (ms)\n")
+        f.write("-------------------------\n")
+        for rule in result.rules:
+            f.write(
+                f"- {rule.rule_id} {rule.reason} [{rule.severity}]: "
+                f"{result.timings[rule.reason] * 1000:.2f}\n"
+            )
 
-    # Load data FIRST
-    df = pd.read_parquet(IN_PATH)
-    logger.info("Loaded %d rows from %s", len(df), IN_PATH.resolve())
 
-    # Ensure required columns exist
-    missing_cols = [c for c in REQUIRED_COLS if c not in df.columns]
+def write_run_metrics(
+    total: int, valid_n: int, rejected_n: int, profile: BatchProfile
+) -> Path:
+    """
+    Record this validation as a run in ``metrics/`` (same layout as the src
+    pipeline's run JSON) so summarize_runs can trend and merge its profile.
+    """
+    now = datetime.now()
+    # Microseconds: scheduler micro-batches can validate within the same second
+    run_id = now.strftime("%Y%m%d_%H%M%S_%f")
+    payload = {
+        "run": {
+            "run_id": run_id,
+            "timestamp": now.isoformat(timespec="seconds"),
+            "pipeline": "ingestion/validate_raw_data",
+        },
+        "ingestion": {
+            "input_rows": total,
+            "clean_rows": valid_n,
+            "quarantined_rows": rejected_n,
+            "quarantine_rate": round(rejected_n / total, 4) if total else 0.0,
+            "profile": profile.to_dict(),
+        },
+    }
+    METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    out_path = METRICS_DIR / f"run_{run_id}_validate.json"
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, default=str)
+    return out_path
+
+
+def _non_empty(parts: list[pd.DataFrame]) -> list[pd.DataFrame]:
+    # Empty chunks carry no inferred dtypes; leave them out of the concat
+    return [p for p in parts if len(p)] or parts[:1]
+
+
+def validate(
+    mode: str = "strict",
+    chunk_rows: int = CHUNK_ROWS,
+    table: pa.Table | None = None,
+) -> pd.DataFrame:
+    """
+    Validate the staged batch and write the valid/rejected parquet, report
+    and run metrics. ``table`` is the extracted batch already in memory;
+    without it the staging parquet is read. Returns the valid rows. Exits
+    with status 1 (``SystemExit``) when strict mode breaches the threshold.
+    """
+    logger.info("Starting validation step (quarantine + threshold mode)")
+
+    if table is not None:
+        source = "extracted batch (in memory)"
+        rows_in_file = table.num_rows
+        schema = table.schema
+        batches = table.to_batches(max_chunksize=chunk_rows)
+    else:
+        if not IN_PATH.exists():
+            raise FileNotFoundError(f"Missing input file: {IN_PATH}")
+        parquet = pq.ParquetFile(IN_PATH)
+        source = str(IN_PATH.resolve())
+        rows_in_file = parquet.metadata.num_rows
+        schema = parquet.schema_arrow
+        batches = parquet.iter_batches(batch_size=chunk_rows)
+    if not rows_in_file:
+        batches = [schema.empty_table()]
+
+    logger.info(
+        "Validating %d rows from %s in chunks of %d",
+        rows_in_file,
+        source,
+        chunk_rows,
+    )
+
+    # Rule 1: required columns exist
+    missing_cols = missing_columns(schema.names)
     if missing_cols:
         raise ValueError(f"Missing required columns: {missing_cols}")
 
-    df = df.copy()
-    df["rejection_reasons"] = ""
-
-    def add_reason(mask: pd.Series, reason: str) -> None:
-        df.loc[mask, "rejection_reasons"] = df.loc[mask, "rejection_reasons"].apply(
-            lambda existing: (existing + ("; " if existing else "") + reason)
+    id_index = TransactionIdIndex.load(ID_INDEX_PATH)
+    logger.info("Probing %d warehouse transaction ids for duplicates", len(id_index))
+    seen_ids = TransactionIdIndex()
+
+    # Profile the whole batch (rejects included) for drift detection
+    profile = BatchProfile()
+    results: list[RuleResult] = []
+    valid_parts: list[pd.DataFrame] = []
+    rejected_parts: list[pd.DataFrame] = []
+    rejected_n = 0
+
+    for batch in batches:
+        chunk, result = apply_rules(batch.to_pandas(), id_index, seen_ids)
+        ctx = result.context
+        seen_ids.add(ctx.id_hashes[~ctx.blank("transaction_id").to_numpy()])
+        profile.update(ctx.df, ctx)
+        results.append(result)
+
+        # Split valid vs rejected; WARNING rules never reject a row
+        rejected_mask = result.violations(result.mask_for(severity=CRITICAL))
+        valid_parts.append(chunk.loc[~rejected_mask])
+
+        # Reasons are only spelled out for the rejected rows
+        rejected_codes = result.codes[rejected_mask]
+        rejected_chunk = chunk.loc[rejected_mask].copy()
+        rejected_chunk["rejection_code"] = rejected_codes
+        rejected_chunk["rejection_reasons"] = result.decode(rejected_codes)
+        rejected_parts.append(rejected_chunk)
+        rejected_n += len(rejected_chunk)
+
+        if mode == "strict" and budget_breached(rejected_n, rows_in_file):
+            break
+
+    result = RuleResult.combine(results)
+    total = len(result.codes)
+
+    if total < rows_in_file:
+        # Strict mode: the rest of the file cannot bring the rate back under
+        # the threshold, so stop here with a partial report and no outputs.
+        write_report(
+            REPORT_PATH,
+            result,
+            total,
+            total - rejected_n,
+            rejected_n,
+            title="Validation Report (ABORTED: reject threshold breached)",
+            rows_in_file=rows_in_file,
+        )
+        logger.error(
+            "Validation FAILED (strict mode): rejected=%d after %d of %d rows "
+            "(threshold %.2f%%); wrote partial report to %s",
+            rejected_n,
+            total,
+            rows_in_file,
+            MAX_REJECT_RATE * 100,
+            REPORT_PATH,
         )
+        sys.exit(1)
 
-    # 1) Missing required fields
-    for col in REQUIRED_COLS:
-        missing_mask = df[col].isna() | df[col].astype(str).str.strip().eq("")
-        if missing_mask.any():
-            add_reason(missing_mask, f"missing_{col}")
-
-    # 2) Parse transaction_date
-    parsed_dates = pd.to_datetime(df["transaction_date"], errors="coerce")
-    bad_date_mask = parsed_dates.isna()
-    if bad_date_mask.any():
-        add_reason(bad_date_mask, "invalid_transaction_date")
-    df["transaction_date"] = parsed_dates
-
-    # 3) Parse amount (no double-counting)
-    raw_amount = df["amount"]
-    is_amount_missing = raw_amount.isna() | raw_amount.astype(str).str.strip().eq("")
-    numeric_amount = pd.to_numeric(raw_amount, errors="coerce")
-
-    is_amount_non_numeric = (~is_amount_missing) & (numeric_amount.isna())
-    if is_amount_non_numeric.any():
-        add_reason(is_amount_non_numeric, "non_numeric_amount")
-
-    df["amount"] = numeric_amount
-
-    # 4) Transaction type allowed values
-    invalid_type_mask = ~df["transaction_type"].isin(ALLOWED_TRANSACTION_TYPES)
-    if invalid_type_mask.any():
-        add_reason(invalid_type_mask, "invalid_transaction_type")
-
-    # 5) Sign rules
-    valid_mask = df["transaction_type"].notna() & df["amount"].notna()
-
-    expense_bad = valid_mask & (df["transaction_type"] == "EXPENSE") & (df["amount"] <= 0)
-    income_bad = valid_mask & (df["transaction_type"] == "INCOME") & (df["amount"] <= 0)
-    refund_bad = valid_mask & (df["transaction_type"] == "REFUND") & (df["amount"] >= 0)
-
-    if expense_bad.any():
-        add_reason(expense_bad, "expense_amount_must_be_positive")
-    if income_bad.any():
-        add_reason(income_bad, "income_amount_must_be_positive")
-    if refund_bad.any():
-        add_reason(refund_bad, "refund_amount_must_be_negative")
-
-    # Split valid vs rejected
-    rejected_mask = df["rejection_reasons"] != ""
-    rejected_df = df.loc[rejected_mask].copy()
-    valid_df = df.loc[~rejected_mask].copy()
+    valid_df = concat_transaction_frames(_non_empty(valid_parts))
+    rejected_df = concat_transaction_frames(_non_empty(rejected_parts))
 
     VALID_OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
     valid_df.to_parquet(VALID_OUT_PATH, index=False)
     rejected_df.to_parquet(REJECTED_OUT_PATH, index=False)
 
-    total = len(df)
-    rejected_n = len(rejected_df)
     reject_rate = rejected_n / total if total else 0.0
 
-    # Write validation report
-    with REPORT_PATH.open("w", encoding="utf-8") as f:
-        f.write("Validation Report (Quarantine + Threshold Mode)\n")
-        f.write("==============================================\n\n")
-        f.write(f"Rows checked: {total}\n")
-        f.write(f"Valid rows: {len(valid_df)}\n")
-        f.write(f"Rejected rows: {rejected_n}\n")
-        f.write(f"Rejection rate: {reject_rate:.2%}\n\n")
+    write_report(REPORT_PATH, result, total, len(valid_df), rejected_n)
 
-        if rejected_n:
-            f.write("Rejection reasons (count)\n")
-            f.write("-------------------------\n")
-            reasons = (
-                rejected_df["rejection_reasons"]
-                .str.split("; ")
-                .explode()
-                .value_counts()
-            )
-            for reason, count in reasons.items():
-                f.write(f"- {reason}: {count}\n")
-        else:
-            f.write("No rejected rows.\n")
+    warnings = result.count(result.mask_for(severity=WARNING))
+    for reason, count in warnings.items():
+        logger.warning("Data quality warning: %s rows=%d", reason, count)
 
     logger.info("Wrote valid parquet to %s (rows=%d)", VALID_OUT_PATH, len(valid_df))
     logger.info("Wrote rejected parquet to %s (rows=%d)", REJECTED_OUT_PATH, rejected_n)
     logger.info("Wrote validation report to %s", REPORT_PATH)
+    metrics_path = write_run_metrics(total, len(valid_df), rejected_n, profile)
+    logger.info("Wrote run metrics and data profile to %s", metrics_path)
 
     # Threshold-based fail decision
-    fail_by_rate = reject_rate > MAX_REJECT_RATE
-    fail_by_rows = (MAX_REJECT_ROWS > 0) and (rejected_n > MAX_REJECT_ROWS)
-
-    if fail_by_rate or fail_by_rows:
-        if args.mode == "strict":
+    if budget_breached(rejected_n, total):
+        if mode == "strict":
             logger.error(
                 "Validation FAILED (strict mode): rejected=%d (%.2f%%)",
                 rejected_n,
@@ -175,6 +309,13 @@ def main() -> None:
     else:
         logger.info("Validation PASSED with no rejected rows")
 
+    return valid_df
+
+
+def main() -> None:
+    args = parse_args()
+    validate(args.mode, args.chunk_rows)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
+
+from orchestration.dag import print_lines
+
+if TYPE_CHECKING:
+    import duckdb
+
+
+CACHE_DIR = Path(".cache/steps")
+ENTRY_FILE = "entry.json"
+CURRENT_FILE = "CURRENT.json"
+
+
+def file_digest(path: Path) -> Optional[str]:
+    """sha256 of a file's bytes, or None if it does not exist."""
+    if not path.exists():
+        return None
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def step_key(step: str, **inputs: Any) -> str:
+    """Content address of a step run: a hash of its name and every input."""
+    payload = json.dumps({"step": step, **inputs}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _stat(path: Path) -> List[int]:
+    st = path.stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_json(path: Path, payload: Dict[str, Any]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+class StepCache:
+    """
+    Content-addressed cache of step outputs.
+
+    Each entry lives in ``root/<step>/<key>/`` with copies of the step's
+    output files and warehouse tables (as parquet). ``root/<step>/CURRENT.json``
+    records which key the outputs in place were produced by (with file
+    stats and table fingerprints to notice edits made since), so an
+    unchanged rerun skips the step without copying anything; a key seen
+    before but not current is restored from its entry. ``force`` runs every
+    step and refreshes its entry.
+    """
+
+    def __init__(self, root: Path = CACHE_DIR, force: bool = False):
+        self.root = root
+        self.force = force
+        self._lock = threading.Lock()
+
+    def run(
+        self,
+        step: str,
+        key: str,
+        compute: Callable[[], Any],
+        files: Iterable[Path] = (),
+        tables: Iterable[str] = (),
+        con: duckdb.DuckDBPyConnection | None = None,
+        load: Callable[[], Any] = lambda: None,
+    ) -> Any:
+        """
+        Return ``compute()`` and cache its outputs, or, if ``key`` is cached,
+        put the cached outputs in place and return ``load()`` instead.
+        """
+        files, tables = list(files), list(tables)
+        entry_dir = self.root / step / key
+        entry = _read_json(entry_dir / ENTRY_FILE)
+
+        if entry is not None and not self.force:
+            if self._is_current(step, key, files, tables, con):
+                print_lines(f"↺ {step}: inputs unchanged (key {key[:12]}), outputs up to date")
+            else:
+                self._restore(entry_dir, entry, con)
+                self._mark_current(step, key, files, tables, con)
+                print_lines(
+                    f"↺ {step}: inputs unchanged (key {key[:12]}), outputs restored from cache"
+                )
+            entry["last_used"] = time.time()
+            _write_json(entry_dir / ENTRY_FILE, entry)
+            return load()
+
+        result = compute()
+        self._store(step, key, files, tables, con)
+        self._mark_current(step, key, files, tables, con)
+        return result
+
+    def invalidate(self, step: str) -> None:
+        """
+        Forget which entry produced ``step``'s outputs in place, e.g. after
+        they were changed outside the cache (a micro-batch merge). A later
+        hit then restores its entry instead of trusting the outputs.
+        """
+        (self.root / step / CURRENT_FILE).unlink(missing_ok=True)
+
+    def _is_current(
+        self,
+        step: str,
+        key: str,
+        files: List[Path],
+        tables: List[str],
+        con: duckdb.DuckDBPyConnection | None,
+    ) -> bool:
+        current = _read_json(self.root / step / CURRENT_FILE)
+        if current is None or current.get("key") != key:
+            return False
+        for path in files:
+            if not path.exists() or _stat(path) != current["files"].get(str(path)):
+                return False
+        for name in tables:
+            if _table_fingerprint(con, name) != current["tables"].get(name):
+                return False
+        return True
+
+    def _mark_current(
+        self,
+        step: str,
+        key: str,
+        files: List[Path],
+        tables: List[str],
+        con: duckdb.DuckDBPyConnection | None,
+    ) -> None:
+        _write_json(
+            self.root / step / CURRENT_FILE,
+            {
+                "key": key,
+                "files": {str(p): _stat(p) for p in files},
+                "tables": {name: _table_fingerprint(con, name) for name in tables},
+            },
+        )
+
+    def _store(
+        self,
+        step: str,
+        key: str,
+        files: List[Path],
+        tables: List[str],
+        con: duckdb.DuckDBPyConnection | None,
+    ) -> None:
+        entry_dir = self.root / step / key
+        tmp_dir = entry_dir.with_name(key + ".tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+
+        stored_files = []
+        for i, path in enumerate(files):
+            name = f"{i:02d}-{path.name}"
+            shutil.copy2(path, tmp_dir / name)
+            stored_files.append({"path": str(path), "file": name})
+        stored_tables = []
+        for name in tables:
+            out = tmp_dir / f"table-{name}.parquet"
+            con.execute(f"COPY (SELECT * FROM {name}) TO '{out.as_posix()}' (FORMAT parquet)")
+            stored_tables.append({"name": name, "file": out.name})
+
+        now = time.time()
+        _write_json(
+            tmp_dir / ENTRY_FILE,
+            {
+                "step": step,
+                "key": key,
+                "created": now,
+                "last_used": now,
+                "files": stored_files,
+                "tables": stored_tables,
+            },
+        )
+        # Swap the complete entry in; a concurrent or crashed run never
+        # leaves a half-written one behind under the key
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        tmp_dir.rename(entry_dir)
+
+    def _restore(
+        self, entry_dir: Path, entry: Dict[str, Any], con: duckdb.DuckDBPyConnection | None
+    ) -> None:
+        for f in entry["files"]:
+            target = Path(f["path"])
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(entry_dir / f["file"], target)
+        for t in entry["tables"]:
+            con.execute(
+                f"CREATE OR REPLACE TABLE {t['name']} AS "
+                f"SELECT * FROM read_parquet('{(entry_dir / t['file']).as_posix()}')"
+            )
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Every cached entry with its ``dir`` and on-disk ``bytes``."""
+        found = []
+        for entry_file in sorted(self.root.glob(f"*/*/{ENTRY_FILE}")):
+            entry = _read_json(entry_file)
+            if entry is None:
+                continue
+            entry["dir"] = entry_file.parent
+            entry["bytes"] = sum(p.stat().st_size for p in entry_file.parent.iterdir())
+            found.append(entry)
+        return found
+
+    def evict(self, max_age_days: float | None = None, max_bytes: int | None = None) -> int:
+        """
+        Drop entries unused for ``max_age_days``, then least recently used
+        ones until the cache fits in ``max_bytes``. Entries whose outputs
+        are currently in place are kept. Returns how many were removed.
+        """
+        with self._lock:
+            current = {
+                (p.parent.name, (_read_json(p) or {}).get("key"))
+                for p in self.root.glob(f"*/{CURRENT_FILE}")
+            }
+            entries = sorted(self.entries(), key=lambda e: e["last_used"])
+            evictable = [e for e in entries if (e["step"], e["key"]) not in current]
+            total = sum(e["bytes"] for e in entries)
+
+            removed = 0
+            cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+            for e in evictable:
+                too_old = cutoff is not None and e["last_used"] < cutoff
+                too_big = max_bytes is not None and total > max_bytes
+                if not (too_old or too_big):
+                    continue
+                shutil.rmtree(e["dir"], ignore_errors=True)
+                total -= e["bytes"]
+                removed += 1
+            return removed
+
+
+def _table_fingerprint(
+    con: duckdb.DuckDBPyConnection | None, name: str
+) -> Optional[List[int]]:
+    """
+    Row count and content hash of a table, or None if it does not exist.
+
+    Row hashes are summed rather than XORed so duplicate rows do not cancel
+    out; either way the result does not depend on row order.
+    """
+    import duckdb
+
+    try:
+        rows, total = con.execute(
+            f"SELECT COUNT(*), SUM(hash({name})::HUGEINT) FROM {name}"
+        ).fetchone()
+    except duckdb.CatalogException:
+        return None
+    return [int(rows), int(total or 0)]
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List
+
+
+@dataclass(frozen=True)
+class Step:
+    """
+    One node of the pipeline DAG. ``run`` is called with the results of
+    ``deps`` (in that order) and its return value is handed to the steps
+    that depend on it, so intermediate tables stay in memory.
+    """
+
+    name: str
+    run: Callable[..., Any]
+    deps: tuple[str, ...] = ()
+    title: str | None = None
+
+    @property
+    def label(self) -> str:
+        return self.title or self.name
+
+
+class StepFailed(RuntimeError):
+    """A step raised or exited non-zero; ``exit_code`` is what the run exits with."""
+
+    def __init__(self, step: str, exit_code: int):
+        super().__init__(f"Step {step} failed with exit code {exit_code}")
+        self.step = step
+        self.exit_code = exit_code
+
+
+_print_lock = threading.Lock()
+
+
+def print_lines(*lines: str) -> None:
+    """Print lines together, never interleaved with other steps' output."""
+    with _print_lock:
+        for line in lines:
+            print(line, flush=True)
+
+
+def topological_order(steps: Iterable[Step]) -> List[Step]:
+    """Steps in dependency order; raises ``ValueError`` on unknown deps or cycles."""
+    by_name = {s.name: s for s in steps}
+    for s in by_name.values():
+        unknown = [d for d in s.deps if d not in by_name]
+        if unknown:
+            raise ValueError(f"Step {s.name} depends on unknown steps: {unknown}")
+
+    order: List[Step] = []
+    state: Dict[str, str] = {}
+
+    def visit(name: str) -> None:
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Dependency cycle through step {name}")
+        state[name] = "visiting"
+        for dep in by_name[name].deps:
+            visit(dep)
+        state[name] = "done"
+        order.append(by_name[name])
+
+    for name in by_name:
+        visit(name)
+    return order
+
+
+def _exit_code(exc: BaseException) -> int:
+    if isinstance(exc, SystemExit):
+        code = exc.code
+        if code is None or isinstance(code, int):
+            return code or 0
+        # sys.exit("message") prints the message and exits with 1
+        print_lines(str(code))
+        return 1
+    traceback.print_exception(exc)
+    return 1
+
+
+def run_dag(steps: Iterable[Step], max_workers: int | None = None) -> Dict[str, Any]:
+    """
+    Run ``steps`` in one process, each as soon as its dependencies have
+    finished; independent steps run concurrently on a thread pool.
+
+    Fail-fast: after the first failure no further step starts, steps
+    already running are allowed to finish, and ``StepFailed`` is raised
+    with the failing step's exit code (the ``SystemExit`` code, or 1 for an
+    exception). Returns each step's result by name.
+    """
+    pending = {s.name: s for s in topological_order(steps)}
+    results: Dict[str, Any] = {}
+    running: Dict[Future, tuple[Step, float]] = {}
+    failure: StepFailed | None = None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            if failure is None:
+                ready = [s for s in pending.values() if all(d in results for d in s.deps)]
+                for step in ready:
+                    del pending[step.name]
+                    print_lines(
+                        "\n" + "=" * 70,
+                        f"STEP: {step.label}",
+                        f"TIME: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                        "=" * 70,
+                    )
+                    args = [results[d] for d in step.deps]
+                    running[pool.submit(step.run, *args)] = (step, time.perf_counter())
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step, started = running.pop(future)
+                elapsed = time.perf_counter() - started
+                exc = future.exception()
+                code = _exit_code(exc) if exc is not None else 0
+                if code == 0:
+                    results[step.name] = None if exc is not None else future.result()
+                    print_lines(f"✅ SUCCESS: {step.label} ({elapsed:.2f}s)")
+                    continue
+
+                print_lines(
+                    "\n" + "-" * 70,
+                    f"❌ FAILED: {step.label} (exit code {code})",
+                    "Stopping pipeline.",
+                    "-" * 70,
+                )
+                if failure is None:
+                    failure = StepFailed(step.name, code)
+
+    if failure is not None:
+        raise failure
+    return results
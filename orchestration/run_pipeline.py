@@ -1,14 +1,43 @@
 from __future__ import annotations
 
 import argparse
-import subprocess
+import os
 import sys
 from pathlib import Path
-from datetime import datetime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import duckdb
 
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
-def parse_args() -> argparse.Namespace:
+# Run as ``python orchestration/run_pipeline.py``: make the project importable
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from orchestration.cache import CACHE_DIR, StepCache, file_digest, step_key  # noqa: E402
+from orchestration.dag import Step, StepFailed, run_dag  # noqa: E402
+from src.metrics.timing import StageTimer  # noqa: E402
+
+
+# Code each step's output depends on besides its data inputs; editing any of
+# these changes the step's cache key. SQL files are added per step below.
+STEP_CODE = {
+    "extract": [
+        "ingestion/extract_csv_data.py",
+        "src/ingestion/load_csv.py",
+        "src/validation/validate_schema.py",
+    ],
+    "validate": [
+        "ingestion/validate_raw_data.py",
+        "src/validation/rules.py",
+        "src/validation/money.py",
+    ],
+    "rebuild_id_index": ["src/storage/id_index.py"],
+}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Run the full data pipeline")
     parser.add_argument(
         "--mode",
@@ -16,50 +45,254 @@ def parse_args() -> argparse.Namespace:
         default="strict",
         help="Pipeline mode: strict stops on validation threshold breach; lenient continues",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--raw",
+        nargs="+",
+        default=None,
+        help="Run over just these raw files (a micro-batch) instead of the configured raw path",
+    )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Rebuild the warehouse tables from the validated batch instead of merging "
+        "new and changed rows into them",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Steps run concurrently when their dependencies allow (default: thread pool default)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run every step even if its inputs are unchanged (cache entries are refreshed)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=CACHE_DIR,
+        help=f"Step output cache directory (default: {CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-max-age-days",
+        type=float,
+        default=30,
+        help="Evict cache entries unused for this many days",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=2048,
+        help="Evict least recently used cache entries beyond this size",
+    )
+    return parser.parse_args(argv)
+
+
+def _code_digest(paths) -> dict[str, str | None]:
+    return {str(p): file_digest(Path(p)) for p in paths}
 
 
+def sql_step_name(sql_path: Path) -> str:
+    """A SQL file's step, named after the full build of its table (also for merges)."""
+    from transformations.run_build import table_name
 
-def run_step(name: str, cmd: list[str]) -> None:
+    return f"build_{table_name(sql_path)}"
+
+
+def build_steps(
+    mode: str,
+    con: duckdb.DuckDBPyConnection,
+    cache: StepCache | None = None,
+    timer: StageTimer | None = None,
+    raw: list[str | Path] | None = None,
+    sql_files: list[Path] | None = None,
+) -> list[Step]:
     """
-    Run a pipeline step as a subprocess.
-    Fails fast if the step returns a non-zero exit code.
+    extract -> validate -> fact -> (dim_dates | dim_departments | id_index).
+
+    Each step gets the previous step's table in memory. The warehouse SQL
+    steps are ordered by the tables they read and write
+    (``run_build.sql_dependencies``): the dims and the id index only read
+    fact_transactions, so they run concurrently, each on its own cursor of
+    the warehouse connection.
+
+    With a ``cache`` every step is keyed by the content of its inputs (raw
+    files, upstream outputs, SQL text, mode and the code listed in
+    ``STEP_CODE``); a step whose key is cached is skipped and its outputs
+    reused. A skipped step hands ``None`` downstream, which then reads the
+    staging parquet / warehouse table instead of an in-memory frame.
+    ``timer`` records each SQL file and the id index rebuild.
+
+    ``raw`` runs the DAG over just those files (a scheduler micro-batch).
+    ``sql_files`` is the warehouse build plan (``run_build.plan_sql``; by
+    default tables that already exist are merged incrementally). A merge
+    depends on what the warehouse already holds as well as on its inputs,
+    so merge steps are never cached.
     """
-    print("\n" + "=" * 70)
-    print(f"STEP: {name}")
-    print(f"CMD : {' '.join(cmd)}")
-    print(f"TIME: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("=" * 70)
-
-    result = subprocess.run(
-        cmd,
-        cwd=str(PROJECT_ROOT),
-        text=True,
-    )
+    import pyarrow as pa
+
+    from ingestion import extract_csv_data, validate_raw_data
+    from src.ingestion.load_csv import resolve_raw_files
+    from src.storage.id_index import TransactionIdIndex
+    from transformations import run_build
+
+    keys: dict[str, str] = {}
+    sql_files = sql_files or run_build.plan_sql(con)
+    sql_deps = run_build.sql_dependencies(sql_files)
+    incremental = run_build.MERGE_FACT_SQL in sql_files
+
+    def cached(name, key, compute, **outputs):
+        keys[name] = key
+        if cache is None:
+            return compute()
+        if key is None:
+            result = compute()
+            cache.invalidate(name)
+            return result
+        return cache.run(name, key, compute, **outputs)
+
+    def extract_batch():
+        raw_files = resolve_raw_files(raw or extract_csv_data.RAW_PATH)
+        key = step_key(
+            "extract",
+            raw={str(p): file_digest(p) for p in raw_files},
+            code=_code_digest(STEP_CODE["extract"]),
+        )
+        return cached(
+            "extract",
+            key,
+            lambda: extract_csv_data.extract(raw_files),
+            files=[extract_csv_data.OUT_PATH, extract_csv_data.MANIFEST_PATH],
+        )
+
+    def validate_batch(raw_df):
+        key = step_key(
+            "validate",
+            extract=keys["extract"],
+            mode=mode,
+            chunk_rows=validate_raw_data.CHUNK_ROWS,
+            # Cross-run duplicate warnings depend on the ids already loaded
+            id_index=file_digest(validate_raw_data.ID_INDEX_PATH),
+            code=_code_digest(STEP_CODE["validate"]),
+        )
 
-    if result.returncode != 0:
-        print("\n" + "-" * 70)
-        print(f"❌ FAILED: {name} (exit code {result.returncode})")
-        print("Stopping pipeline.")
-        print("-" * 70)
-        sys.exit(result.returncode)
+        def compute():
+            table = None if raw_df is None else pa.Table.from_pandas(raw_df, preserve_index=False)
+            return validate_raw_data.validate(mode, table=table)
 
-    print(f"✅ SUCCESS: {name}")
+        return cached(
+            "validate",
+            key,
+            compute,
+            files=[
+                validate_raw_data.VALID_OUT_PATH,
+                validate_raw_data.REJECTED_OUT_PATH,
+                validate_raw_data.REPORT_PATH,
+            ],
+        )
 
+    def sql_step(sql_path):
+        name = sql_step_name(sql_path)
+        upstream = tuple(sql_step_name(d) for d in sql_deps[sql_path])
+        staging = run_build.reads_staging(sql_path)
+        # Nothing is written to the warehouse before validation has passed
+        deps = ("validate", *upstream) if staging or not upstream else upstream
+        sql = sql_path.read_text(encoding="utf-8")
+
+        def run(*inputs):
+            cur = con.cursor()
+            key = None
+            if sql_path not in run_build.MERGE_SQL.values() and all(keys[u] for u in upstream):
+                key = step_key(
+                    name,
+                    # Keyed by the validated rows themselves: a revalidation that
+                    # yields the same rows (e.g. only new duplicate warnings)
+                    # reuses the fact
+                    valid=file_digest(validate_raw_data.VALID_OUT_PATH) if staging else None,
+                    upstream={u: keys[u] for u in upstream},
+                    sql=sql,
+                )
+
+            def compute():
+                if staging:
+                    run_build.register_staging(cur, inputs[0] if deps[0] == "validate" else None)
+                return run_build.run_sql(cur, sql_path, timer)
+
+            tables = sorted(run_build.sql_tables(sql)[0])
+            return cached(name, key, compute, tables=tables, con=cur)
+
+        return Step(name, run, deps=deps, title=str(sql_path))
+
+    def rebuild_id_index(_fact):
+        key = keys["build_fact_transactions"] and step_key(
+            "rebuild_id_index",
+            fact=keys["build_fact_transactions"],
+            code=_code_digest(STEP_CODE["rebuild_id_index"]),
+        )
+        update = run_build.update_id_index if incremental else run_build.rebuild_id_index
+        return cached(
+            "rebuild_id_index",
+            key,
+            lambda: update(con.cursor(), timer),
+            files=[run_build.ID_INDEX_PATH],
+            load=lambda: TransactionIdIndex.load(run_build.ID_INDEX_PATH),
+        )
+
+    return [
+        Step("extract", extract_batch, title="Extract CSV -> staging parquet"),
+        Step(
+            "validate",
+            validate_batch,
+            deps=("extract",),
+            title=f"Validate + quarantine ({mode} mode)",
+        ),
+        *(sql_step(p) for p in sql_files),
+        Step("rebuild_id_index", rebuild_id_index, deps=("build_fact_transactions",)),
+    ]
+
+
+def main(argv: list[str] | None = None, con: duckdb.DuckDBPyConnection | None = None) -> None:
+    """
+    Run the DAG. ``con`` is an already open warehouse connection (kept open
+    by a warm worker); without it one is opened and closed for this run.
+    """
+    args = parse_args(argv)
+    # Steps use paths relative to the project root
+    os.chdir(PROJECT_ROOT)
 
-def main() -> None:
-    args = parse_args()
+    # Imported after argument parsing so --help answers instantly
+    import duckdb
 
-    # Use the same Python executable that is running this script
-    py = sys.executable
+    from transformations import run_build
 
-    run_step("Extract CSV -> staging parquet", [py, "-m", "ingestion.extract_csv_data"])
-    run_step(
-    f"Validate + quarantine ({args.mode} mode)",
-    [py, "-m", "ingestion.validate_raw_data", "--mode", args.mode],
-)
+    cache = StepCache(args.cache_dir, force=args.force)
+    timer = StageTimer()
+    owns_con = con is None
+    if owns_con:
+        con = duckdb.connect(str(run_build.DB_PATH))
+    try:
+        sql_files = run_build.plan_sql(con, args.full_refresh)
+        results = run_dag(
+            build_steps(args.mode, con, cache, timer, args.raw, sql_files),
+            max_workers=args.workers,
+        )
+        row_counts: dict[str, dict[str, int]] = {}
+        for sql_path in sql_files:
+            # Cached steps return no counts; print_summary counts those tables
+            run_build.combine_row_counts(row_counts, results[sql_step_name(sql_path)] or {})
+        run_build.print_summary(con, results["rebuild_id_index"], row_counts)
+        if timer.stages:
+            print(f"Timings -> {run_build.write_build_metrics(timer, row_counts)}")
+    except StepFailed as e:
+        sys.exit(e.exit_code)
+    finally:
+        if owns_con:
+            con.close()
 
-    run_step("Build warehouse (facts + dims)", [py, "transformations/run_build.py"])
+    evicted = cache.evict(args.cache_max_age_days, int(args.cache_max_mb * 1024 * 1024))
+    if evicted:
+        print(f"🧹 evicted {evicted} step cache entries")
 
     print("\n🎉 Pipeline completed successfully.")
 
@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+# Run as ``python orchestration/scheduler.py``: make the project importable
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.ingestion.manifest import MANIFEST_NAME, RawFileManifest  # noqa: E402
+
+
+WATCH_DIR = Path("data/raw")
+STATE_DIR = Path(".scheduler")
+METRICS_DIR = Path("metrics")
+STOP_FILE = "stop"
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Watch the raw directory and run the pipeline over micro-batches of new files"
+    )
+    parser.add_argument(
+        "--watch", type=Path, default=WATCH_DIR, help=f"Directory to watch (default: {WATCH_DIR})"
+    )
+    parser.add_argument("--pattern", default="*.csv", help="Files to pick up (default: *.csv)")
+    parser.add_argument(
+        "--mode",
+        choices=["strict", "lenient"],
+        default="strict",
+        help="Validation mode for every batch",
+    )
+    parser.add_argument(
+        "--debounce-seconds",
+        type=float,
+        default=2.0,
+        help="A file is ready once its size and mtime have not changed for this long",
+    )
+    parser.add_argument(
+        "--max-wait-seconds",
+        type=float,
+        default=10.0,
+        help="Dispatch a batch once its oldest ready file has waited this long",
+    )
+    parser.add_argument(
+        "--max-batch-files",
+        type=int,
+        default=50,
+        help="Dispatch a batch as soon as this many files are ready",
+    )
+    parser.add_argument(
+        "--max-pending-batches",
+        type=int,
+        default=2,
+        help="Batches queued behind the running one; when full, ready files wait and "
+        "join later batches",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Steps of a batch run concurrently (the DAG's thread pool)",
+    )
+    parser.add_argument(
+        "--poll-seconds", type=float, default=0.5, help="How often to scan the watched directory"
+    )
+    parser.add_argument(
+        "--drain",
+        action="store_true",
+        help="Process the files already landed without waiting to fill batches, then exit",
+    )
+    parser.add_argument(
+        "--stop",
+        action="store_true",
+        help="Ask a running scheduler to exit once its current batch is done",
+    )
+    parser.add_argument(
+        "--state-dir",
+        type=Path,
+        default=STATE_DIR,
+        help=f"Where processed files are recorded (default: {STATE_DIR})",
+    )
+    return parser.parse_args(argv)
+
+
+@dataclass
+class LandedFile:
+    path: Path
+    size: int
+    mtime: float
+    # Wall clock when its size/mtime were last seen changing
+    changed_at: float
+
+    @property
+    def arrived(self) -> float:
+        """When the file finished landing (its last write)."""
+        return min(self.mtime, self.changed_at)
+
+
+class MicroBatcher:
+    """
+    Debounces landed files and cuts them into micro-batches.
+
+    A file is ready once its size and mtime have been stable for
+    ``debounce_s`` (so half-copied files are never read). A batch is cut
+    when ``max_files`` files are ready, or when the oldest ready file has
+    waited ``max_wait_s``; it holds the oldest ready files first.
+    """
+
+    def __init__(self, debounce_s: float, max_wait_s: float, max_files: int):
+        if max_files < 1:
+            raise ValueError("max_files must be at least 1")
+        self.debounce_s = debounce_s
+        self.max_wait_s = max_wait_s
+        self.max_files = max_files
+        self.pending: Dict[Path, LandedFile] = {}
+
+    def observe(self, files: Dict[Path, Tuple[int, float]], now: float) -> None:
+        """Update with the latest ``{path: (size, mtime)}`` of unprocessed files."""
+        for path in set(self.pending) - set(files):
+            del self.pending[path]  # removed (or renamed) before it was picked up
+        for path, (size, mtime) in files.items():
+            seen = self.pending.get(path)
+            if seen is None or (seen.size, seen.mtime) != (size, mtime):
+                self.pending[path] = LandedFile(path, size, mtime, now)
+
+    def ready(self, now: float) -> List[LandedFile]:
+        ready = [f for f in self.pending.values() if now - f.changed_at >= self.debounce_s]
+        return sorted(ready, key=lambda f: (f.changed_at, f.path))
+
+    def next_batch(self, now: float, flush: bool = False) -> List[LandedFile]:
+        """Remove and return the next batch, or ``[]`` if none is due yet."""
+        ready = self.ready(now)
+        if not ready:
+            return []
+        oldest_ready_at = ready[0].changed_at + self.debounce_s
+        if len(ready) < self.max_files and now - oldest_ready_at < self.max_wait_s and not flush:
+            return []
+        batch = ready[: self.max_files]
+        for f in batch:
+            del self.pending[f.path]
+        return batch
+
+
+def scan(watch_dir: Path, pattern: str) -> Dict[Path, Tuple[int, float]]:
+    files = {}
+    for path in watch_dir.glob(pattern):
+        # Skip hidden/partial files some uploaders write before renaming
+        if path.name.startswith(".") or not path.is_file():
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files[path] = (stat.st_size, stat.st_mtime)
+    return files
+
+
+def batch_record(
+    batch_id: str,
+    files: List[LandedFile],
+    cut_at: float,
+    started_at: float,
+    finished_at: float,
+    exit_code: int,
+) -> Dict[str, Any]:
+    """Per-batch metrics: latency from each file's arrival to the warehouse."""
+    latencies = [finished_at - f.arrived for f in files]
+    return {
+        "batch": {
+            "id": batch_id,
+            "files": [
+                {
+                    "path": f.path.as_posix(),
+                    "bytes": f.size,
+                    "arrived": datetime.fromtimestamp(f.arrived).isoformat(timespec="milliseconds"),
+                    "latency_s": round(latency, 4),
+                }
+                for f, latency in zip(files, latencies)
+            ],
+            "exit_code": exit_code,
+        },
+        "latency": {
+            # arrival -> batch cut: debounce plus waiting for the batch to fill
+            "batching_s": round(cut_at - min(f.arrived for f in files), 4),
+            # cut -> start: time queued behind earlier batches
+            "queued_s": round(started_at - cut_at, 4),
+            "run_s": round(finished_at - started_at, 4),
+            "min_s": round(min(latencies), 4),
+            "max_s": round(max(latencies), 4),
+            "mean_s": round(sum(latencies) / len(latencies), 4),
+        },
+        "run": {
+            "timestamp": datetime.fromtimestamp(finished_at).isoformat(timespec="seconds"),
+            "warehouse_available": exit_code == 0,
+        },
+    }
+
+
+def _write_batch_metrics(record: Dict[str, Any]) -> Path:
+    METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    out_path = METRICS_DIR / f"batch_{record['batch']['id']}.json"
+    out_path.write_text(json.dumps(record, indent=2), encoding="utf-8")
+    return out_path
+
+
+def _run_batches(
+    batches: "queue.Queue[Any]",
+    results: "queue.Queue[Any]",
+    mode: str,
+    workers: int | None,
+) -> None:
+    """Runner thread: one batch at a time over a warm warehouse connection."""
+    import duckdb
+
+    from orchestration.worker import run_request, warm_up
+    from transformations.run_build import DB_PATH
+
+    runners = warm_up()
+    con = duckdb.connect(str(DB_PATH))
+    try:
+        while True:
+            item = batches.get()
+            if item is None:
+                return
+            batch_id, files, cut_at = item
+            args = ["--mode", mode, "--raw", *(f.path.as_posix() for f in files)]
+            if workers:
+                args += ["--workers", str(workers)]
+            print(f"\n▶ batch {batch_id}: {len(files)} file(s)", flush=True)
+            started_at = time.time()
+            exit_code = run_request({"pipeline": "orchestration", "args": args}, runners, con)
+            record = batch_record(batch_id, files, cut_at, started_at, time.time(), exit_code)
+            record["metrics"] = str(_write_batch_metrics(record))
+            results.put(record)
+    finally:
+        con.close()
+
+
+def serve(
+    watch_dir: Path = WATCH_DIR,
+    pattern: str = "*.csv",
+    mode: str = "strict",
+    debounce_s: float = 2.0,
+    max_wait_s: float = 10.0,
+    max_batch_files: int = 50,
+    max_pending_batches: int = 2,
+    workers: int | None = None,
+    poll_s: float = 0.5,
+    drain: bool = False,
+    state_dir: Path = STATE_DIR,
+) -> int:
+    """
+    Watch ``watch_dir`` and merge newly landed files into the warehouse in
+    micro-batches; returns the number of failed batches.
+
+    Batches run one at a time on a runner thread (the warehouse has a single
+    writer and the staging files are shared), while this thread keeps
+    scanning. Up to ``max_pending_batches`` cut batches queue behind the
+    running one; past that no new batch is cut, so under load ready files
+    accumulate and the next batch is bigger. ``workers`` bounds the steps
+    run concurrently inside a batch.
+
+    Merged files are recorded in ``<state_dir>/_raw_manifest.json`` and not
+    picked up again unless their content changes. Files of a failed batch
+    are retried when they change or on restart.
+    """
+    os.chdir(PROJECT_ROOT)
+    manifest = RawFileManifest.load(state_dir / MANIFEST_NAME)
+    batcher = MicroBatcher(debounce_s, max_wait_s, max_batch_files)
+    batches: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending_batches)
+    results: "queue.Queue[Any]" = queue.Queue()
+    runner = threading.Thread(
+        target=_run_batches, args=(batches, results, mode, workers), daemon=True
+    )
+    runner.start()
+
+    in_flight: Dict[Path, LandedFile] = {}
+    failed: Dict[Path, Tuple[int, float]] = {}
+    failures = 0
+    held = False
+    print(f"👀 watching {watch_dir}/{pattern} (mode {mode})", flush=True)
+    try:
+        while True:
+            while not results.empty():
+                record = results.get()
+                files = [in_flight.pop(Path(f["path"])) for f in record["batch"]["files"]]
+                latency = record["latency"]
+                if record["batch"]["exit_code"] == 0:
+                    for f in files:
+                        manifest.record(f.path, None, record["batch"]["id"])
+                    manifest.save()
+                    print(
+                        f"✅ batch {record['batch']['id']}: {len(files)} file(s) in warehouse, "
+                        f"latency {latency['min_s']:.2f}-{latency['max_s']:.2f}s "
+                        f"(run {latency['run_s']:.2f}s, queued {latency['queued_s']:.2f}s)",
+                        flush=True,
+                    )
+                else:
+                    failures += 1
+                    failed.update({f.path: (f.size, f.mtime) for f in files})
+                    print(
+                        f"❌ batch {record['batch']['id']} failed with exit code "
+                        f"{record['batch']['exit_code']}; its files are retried once they change",
+                        flush=True,
+                    )
+
+            if not runner.is_alive():
+                raise RuntimeError("Batch runner thread exited unexpectedly")
+            if (state_dir / STOP_FILE).exists():
+                (state_dir / STOP_FILE).unlink()
+                break
+
+            now = time.time()
+            landed = {
+                path: stat
+                for path, stat in scan(watch_dir, pattern).items()
+                if path not in in_flight
+                and failed.get(path) != stat
+                and manifest.status(path) != "unchanged"
+            }
+            batcher.observe(landed, now)
+
+            while batcher.ready(now):
+                if batches.full():
+                    if not held:
+                        print(
+                            f"⏸ {batches.qsize()} batches queued; holding "
+                            f"{len(batcher.ready(now))} ready file(s)",
+                            flush=True,
+                        )
+                        held = True
+                    break
+                batch = batcher.next_batch(now, flush=drain)
+                if not batch:
+                    break
+                held = False
+                batch_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+                in_flight.update({f.path: f for f in batch})
+                batches.put((batch_id, batch, now))
+
+            if drain and not in_flight and not batcher.pending:
+                break
+            time.sleep(poll_s)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Let the running batch finish; drop the queued ones
+        while not batches.empty():
+            batches.get_nowait()
+        batches.put(None)
+        runner.join()
+    return failures
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = parse_args(argv)
+    state_dir = args.state_dir if args.state_dir.is_absolute() else PROJECT_ROOT / args.state_dir
+    if args.stop:
+        state_dir.mkdir(parents=True, exist_ok=True)
+        (state_dir / STOP_FILE).touch()
+        return
+    failures = serve(
+        args.watch,
+        args.pattern,
+        args.mode,
+        args.debounce_seconds,
+        args.max_wait_seconds,
+        args.max_batch_files,
+        args.max_pending_batches,
+        args.workers,
+        args.poll_seconds,
+        args.drain,
+        state_dir,
+    )
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import io
+import json
+import os
+import sys
+import time
+import traceback
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+# Run as ``python orchestration/worker.py``: make the project importable
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+SPOOL_DIR = Path(".spool")
+PIPELINES = ("orchestration", "pipeline")
+STOP_FILE = "stop"
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Warm pipeline worker: runs requests dropped in a spool directory"
+    )
+    parser.add_argument(
+        "--spool", type=Path, default=SPOOL_DIR, help=f"Spool directory (default: {SPOOL_DIR})"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser(
+        "serve", help="Keep modules and the warehouse connection warm and run requests"
+    )
+    serve.add_argument(
+        "--poll-seconds", type=float, default=0.1, help="How often to look for new requests"
+    )
+    serve.add_argument(
+        "--max-requests", type=int, default=None, help="Exit after this many requests"
+    )
+
+    submit = sub.add_parser("submit", help="Queue a run for the worker")
+    submit.add_argument(
+        "--pipeline",
+        choices=PIPELINES,
+        default="orchestration",
+        help="orchestration/run_pipeline.py (DAG) or src/pipeline/run_pipeline.py",
+    )
+    submit.add_argument(
+        "--wait", action="store_true", help="Wait for the run, print its log and exit with its code"
+    )
+    submit.add_argument(
+        "--timeout", type=float, default=None, help="Give up waiting after this many seconds"
+    )
+    submit.add_argument(
+        "args", nargs=argparse.REMAINDER, help="Arguments for the pipeline (after --)"
+    )
+
+    sub.add_parser("stop", help="Ask the worker to exit once the current request is done")
+    return parser.parse_args(argv)
+
+
+def _spool_dirs(spool: Path) -> Dict[str, Path]:
+    dirs = {name: spool / name for name in ("incoming", "running", "done")}
+    for d in dirs.values():
+        d.mkdir(parents=True, exist_ok=True)
+    return dirs
+
+
+def _write_json(path: Path, payload: Dict[str, Any]) -> None:
+    # Write then rename, so a reader never sees a partial file
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+def submit(args: List[str], pipeline: str = "orchestration", spool: Path = SPOOL_DIR) -> str:
+    """Queue a run; returns its request id."""
+    if pipeline not in PIPELINES:
+        raise ValueError(f"Unknown pipeline: {pipeline} (expected one of {PIPELINES})")
+    dirs = _spool_dirs(spool)
+    # Timestamp first so requests run in submission order
+    request_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}-{uuid.uuid4().hex[:8]}"
+    _write_json(
+        dirs["incoming"] / f"{request_id}.json",
+        {
+            "id": request_id,
+            "pipeline": pipeline,
+            "args": list(args),
+            "submitted": datetime.now().isoformat(timespec="seconds"),
+        },
+    )
+    return request_id
+
+
+def wait_for(
+    request_id: str, spool: Path = SPOOL_DIR, timeout: float | None = None
+) -> Dict[str, Any]:
+    """Block until the worker has finished ``request_id``; returns its result."""
+    result_path = spool / "done" / f"{request_id}.json"
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not result_path.exists():
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f"Request {request_id} not finished after {timeout}s")
+        time.sleep(0.1)
+    return json.loads(result_path.read_text(encoding="utf-8"))
+
+
+class _RequestOutput(io.TextIOBase):
+    """
+    Stands in for stdout/stderr while the worker runs, so prints and log
+    handlers created by the pipelines write to the current request's log.
+    """
+
+    def __init__(self, default):
+        self.default = default
+        self.target = None
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        return (self.target or self.default).write(s)
+
+    def flush(self) -> None:
+        (self.target or self.default).flush()
+
+
+def warm_up() -> Dict[str, Callable[..., None]]:
+    """Import both pipelines and their heavy dependencies once."""
+    import duckdb  # noqa: F401
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    import pyarrow  # noqa: F401
+    import yaml  # noqa: F401
+
+    from ingestion import extract_csv_data, validate_raw_data  # noqa: F401
+    from orchestration import run_pipeline as orchestration_pipeline
+    from src.pipeline import run_pipeline as src_pipeline
+    from src.transforms import duckdb_backend, transform_transactions  # noqa: F401
+
+    return {"orchestration": orchestration_pipeline.main, "pipeline": src_pipeline.run}
+
+
+def run_request(
+    request: Dict[str, Any], runners: Dict[str, Callable[..., None]], con: Any
+) -> int:
+    """Run one pipeline request with the warmed-up ``runners``; returns its exit code."""
+    runner = runners[request["pipeline"]]
+    try:
+        if request["pipeline"] == "orchestration":
+            runner(request["args"], con=con)
+        else:
+            runner(request["args"])
+        return 0
+    except SystemExit as e:
+        code = e.code
+        if code is None or isinstance(code, int):
+            return code or 0
+        print(code)
+        return 1
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        # Steps chdir into the project root; keep every run starting there
+        os.chdir(PROJECT_ROOT)
+
+
+def serve(
+    spool: Path = SPOOL_DIR, poll_seconds: float = 0.1, max_requests: int | None = None
+) -> None:
+    """
+    Run queued requests one at a time in this process, keeping imported
+    modules, parsed configs (re-read when the file changes) and the
+    warehouse DuckDB connection open between runs.
+
+    Requests are claimed by renaming ``incoming/<id>.json`` to ``running/``
+    (atomic, so several workers can share a spool); the run's output goes to
+    ``done/<id>.log`` and its exit code and timing to ``done/<id>.json``.
+    Code changes need a worker restart.
+    """
+    os.chdir(PROJECT_ROOT)
+    spool = spool if spool.is_absolute() else PROJECT_ROOT / spool
+    dirs = _spool_dirs(spool)
+    output = _RequestOutput(sys.stdout)
+    console, console_err = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = output
+
+    started = time.perf_counter()
+    runners = warm_up()
+    import duckdb
+
+    from transformations.run_build import DB_PATH
+
+    con = duckdb.connect(str(DB_PATH))
+    print(
+        f"✅ worker ready in {time.perf_counter() - started:.2f}s "
+        f"(pid {os.getpid()}, spool {spool})",
+        file=console,
+        flush=True,
+    )
+
+    served = 0
+    try:
+        while max_requests is None or served < max_requests:
+            if (spool / STOP_FILE).exists():
+                (spool / STOP_FILE).unlink()
+                break
+            queued = sorted(dirs["incoming"].glob("*.json"))
+            if not queued:
+                time.sleep(poll_seconds)
+                continue
+
+            claimed = dirs["running"] / queued[0].name
+            try:
+                queued[0].rename(claimed)
+            except FileNotFoundError:
+                continue  # another worker took it
+            request = json.loads(claimed.read_text(encoding="utf-8"))
+            log_path = dirs["done"] / f"{request['id']}.log"
+
+            t0 = time.perf_counter()
+            started_at = datetime.now().isoformat(timespec="seconds")
+            with log_path.open("w", encoding="utf-8") as log:
+                output.target = log
+                try:
+                    exit_code = run_request(request, runners, con)
+                finally:
+                    output.target = None
+            wall_s = round(time.perf_counter() - t0, 4)
+            gc.collect()
+
+            _write_json(
+                dirs["done"] / f"{request['id']}.json",
+                {
+                    **request,
+                    "exit_code": exit_code,
+                    "started": started_at,
+                    "wall_s": wall_s,
+                    "log": str(log_path),
+                },
+            )
+            claimed.unlink()
+            served += 1
+            status = "✅" if exit_code == 0 else "❌"
+            print(
+                f"{status} {request['id']} {request['pipeline']} {' '.join(request['args'])} "
+                f"-> exit {exit_code} ({wall_s:.2f}s)",
+                file=console,
+                flush=True,
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sys.stdout, sys.stderr = console, console_err
+        con.close()
+
+
+def main(argv: List[str] | None = None) -> None:
+    args = parse_args(argv)
+    spool = args.spool if args.spool.is_absolute() else PROJECT_ROOT / args.spool
+
+    if args.command == "serve":
+        serve(spool, args.poll_seconds, args.max_requests)
+        return
+    if args.command == "stop":
+        _spool_dirs(spool)
+        (spool / STOP_FILE).touch()
+        return
+
+    pipeline_args = args.args[1:] if args.args[:1] == ["--"] else args.args
+    request_id = submit(pipeline_args, args.pipeline, spool)
+    if not args.wait:
+        print(request_id)
+        return
+    result = wait_for(request_id, spool, args.timeout)
+    print(Path(result["log"]).read_text(encoding="utf-8"), end="")
+    sys.exit(result["exit_code"])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,100 +1,149 @@
+import glob
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
-from typing import Any, Dict, Tuple, Union
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 import pandas as pd
 
+from src.metrics.profile import BatchProfile, merge_profiles
+from src.metrics.timing import StageTimer, merge_timings
+from src.storage.datasets import DatasetWriter, OutputSpec, write_dataset
+from src.validation.money import to_cents
 from src.validation.validate_schema import (
     SchemaValidationError,
+    coerce_numeric,
+    read_transactions_csv,
     transactions_schema_spec,
     validate_schema,
-    validate_transaction_dates,
-    validate_transaction_types,
+)
+from src.validation.rules import (
+    CRITICAL,
+    REQUIRED_COLUMNS,
+    WARNING,
+    RuleResult,
+    evaluate_rules,
 )
 
 
-def load_transactions_csv(
-    raw_path: Path | None = None,
-    processed_dir: Path | None = None,
-    quarantine_enabled: bool = True,
-    return_metrics: bool = False,
-) -> Union[pd.DataFrame, Tuple[pd.DataFrame, Dict[str, Any]]]:
-    """
-    Load transactions CSV, optionally quarantine bad rows, validate clean rows,
-    and write processed outputs.
-    """
-    file_path = raw_path or Path("data/raw/transactions_sample.csv")
-    processed_dir = processed_dir or Path("data/processed")
-
-    if not file_path.exists():
-        raise FileNotFoundError(f"File not found: {file_path}")
-
-    processed_dir.mkdir(parents=True, exist_ok=True)
+# Rows failing these rules are quarantined; any other CRITICAL rule failing
+# on a remaining row fails the load.
+QUARANTINE_REASONS = tuple(f"missing_{c}" for c in REQUIRED_COLUMNS) + (
+    "invalid_transaction_date",
+)
 
-    df = pd.read_csv(file_path)
 
-    metrics: Dict[str, Any] = {
-        "input_rows": int(len(df)),
+def _new_metrics(quarantine_enabled: bool) -> Dict[str, Any]:
+    return {
+        "input_rows": 0,
         "clean_rows": None,
         "quarantined_rows": 0,
         "quarantine_missing_required": 0,
         "quarantine_invalid_date": 0,
         "quarantine_enabled": bool(quarantine_enabled),
+        "rule_violations": {},
+        "rule_timings_ms": {},
     }
 
-    quarantine_df = pd.DataFrame(columns=df.columns)
 
-    if quarantine_enabled:
-        required_cols = [
-            "transaction_id",
-            "transaction_date",
-            "department_id",
-            "transaction_type",
-            "amount",
-        ]
+def _evaluate(df: pd.DataFrame, metrics: Dict[str, Any]) -> RuleResult:
+    """
+    Run the shared rule set once and add its counts and timings to ``metrics``.
+
+    No id index is passed: this pipeline writes the processed and gold
+    layers, not ``fact_transactions``, so ``transaction_id_already_loaded``
+    only fires on the orchestration path (ingestion/validate_raw_data.py).
+    """
+    result = evaluate_rules(df)
+    for reason, count in result.counts.items():
+        metrics["rule_violations"][reason] = metrics["rule_violations"].get(reason, 0) + count
+    for reason, seconds in result.timings.items():
+        metrics["rule_timings_ms"][reason] = round(
+            metrics["rule_timings_ms"].get(reason, 0.0) + seconds * 1000, 3
+        )
+    for reason, count in result.count(result.mask_for(severity=WARNING)).items():
+        logging.warning(f"Data quality warning: {reason} rows={count}")
+    return result
+
 
-        missing_required_mask = df[required_cols].isna().any(axis=1)
-        parsed_dates = pd.to_datetime(df["transaction_date"], errors="coerce")
-        invalid_date_mask = parsed_dates.isna()
+def _quarantine(
+    df: pd.DataFrame, result: RuleResult
+) -> Tuple[pd.DataFrame, pd.DataFrame, Dict[str, int]]:
+    """
+    Split a frame into (clean, quarantined) rows using the rule results.
 
-        quarantine_mask = missing_required_mask | invalid_date_mask
+    The clean rows carry the parsed ``transaction_date`` so validation and
+    the transform do not parse it again; quarantined rows keep the raw text.
+    Returns the per-reason counts so callers can sum them across chunks.
+    """
+    missing_required_mask = result.violations(
+        result.mask_for(reasons=[f"missing_{c}" for c in REQUIRED_COLUMNS])
+    )
+    invalid_date_mask = result.violations(result.bit("invalid_transaction_date"))
+    quarantine_mask = result.violations(result.mask_for(reasons=QUARANTINE_REASONS))
 
-        quarantine_df = df[quarantine_mask].copy()
-        df = df[~quarantine_mask].copy()
+    counts = {
+        "quarantined_rows": int(quarantine_mask.sum()),
+        "quarantine_missing_required": int(missing_required_mask.sum()),
+        "quarantine_invalid_date": int(invalid_date_mask.sum()),
+    }
+    # Rows that made a numeric column fall back to text may all have been
+    # quarantined, in which case the clean rows can take the numeric dtype.
+    clean = coerce_numeric(df[~quarantine_mask].copy(), transactions_schema_spec())
+    clean["transaction_date"] = result.context.dates[~quarantine_mask]
+    return clean, df[quarantine_mask].copy(), counts
 
-        metrics["quarantined_rows"] = int(len(quarantine_df))
-        metrics["quarantine_missing_required"] = int(missing_required_mask.sum())
-        metrics["quarantine_invalid_date"] = int(invalid_date_mask.sum())
 
-        if len(quarantine_df) > 0:
-            logging.warning(f"Quarantining {len(quarantine_df)} bad rows")
-            logging.warning(
-                "Quarantine reasons: "
-                f"missing_required={metrics['quarantine_missing_required']}, "
-                f"invalid_date={metrics['quarantine_invalid_date']}"
-            )
+def _attach_parsed_dates(df: pd.DataFrame, result: RuleResult) -> pd.DataFrame:
+    # Without quarantine, keep the raw text if anything fails to parse so the
+    # validation error can name the offending values.
+    parsed_dates = result.context.dates
+    if not parsed_dates.isna().any():
+        df["transaction_date"] = parsed_dates
+    return df
 
-        quarantine_path = processed_dir / "transactions_quarantine.csv"
-        quarantine_df.to_csv(quarantine_path, index=False)
-        logging.info(f"Wrote quarantined rows to: {quarantine_path}")
 
-    # Validate clean data
+def _validate_clean(
+    df: pd.DataFrame, result: RuleResult, rows: Optional[Any] = None
+) -> None:
+    """
+    Fail on any CRITICAL rule broken by the clean rows (``rows`` selects
+    them from ``result``), reporting every violation with its count.
+    """
     try:
-        spec = transactions_schema_spec()
-        validate_schema(df, spec)
-        validate_transaction_types(df)
-        validate_transaction_dates(df)
-        logging.info("Schema & business validation passed")
+        violations = result.count(result.mask_for(severity=CRITICAL), rows=rows)
+        if violations:
+            raise SchemaValidationError(f"Data quality rules failed: {violations}")
+        validate_schema(df, transactions_schema_spec())
     except SchemaValidationError as e:
         logging.error(f"Validation failed: {e}")
         raise
 
-    clean_path = processed_dir / "transactions_clean.csv"
-    df.to_csv(clean_path, index=False)
-    logging.info(f"Wrote cleaned data to: {clean_path}")
 
-    metrics["clean_rows"] = int(len(df))
+def _log_quarantine(metrics: Dict[str, Any]) -> None:
+    if metrics["quarantined_rows"] > 0:
+        logging.warning(f"Quarantining {metrics['quarantined_rows']} bad rows")
+        logging.warning(
+            "Quarantine reasons: "
+            f"missing_required={metrics['quarantine_missing_required']}, "
+            f"invalid_date={metrics['quarantine_invalid_date']}"
+        )
+
 
+def _add_cents_by_type(metrics: Dict[str, Any], df: pd.DataFrame) -> None:
+    """Sum a clean chunk's amounts in cents per normalized transaction type."""
+    if df.empty:
+        return
+    cents = pd.Series(to_cents(df["amount"]), index=df.index)
+    types = df["transaction_type"].astype(str).str.strip().str.lower()
+    by_type = metrics["cents_by_type"]
+    for t, c in cents.groupby(types.to_numpy()).sum().items():
+        by_type[t] = by_type.get(t, 0) + int(c)
+
+
+def _finalize_metrics(metrics: Dict[str, Any]) -> None:
     # Trend-friendly metric
     if metrics["input_rows"] > 0:
         metrics["quarantine_rate"] = round(
@@ -103,6 +152,197 @@ def load_transactions_csv(
     else:
         metrics["quarantine_rate"] = 0.0
 
+
+def merge_ingest_metrics(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum per-file ingestion metrics into one run-level dict."""
+    merged = _new_metrics(all(m["quarantine_enabled"] for m in parts) if parts else True)
+    merged["clean_rows"] = 0
+    for m in parts:
+        for key in ("input_rows", "clean_rows", "quarantined_rows",
+                    "quarantine_missing_required", "quarantine_invalid_date"):
+            merged[key] += m[key]
+        for key in ("rule_violations", "rule_timings_ms"):
+            for reason, value in m.get(key, {}).items():
+                merged[key][reason] = merged[key].get(reason, 0) + value
+    profiles = [m["profile"] for m in parts if "profile" in m]
+    if profiles:
+        merged["profile"] = merge_profiles(profiles)
+    if any("chunks" in m for m in parts):
+        merged["chunks"] = sum(m.get("chunks", 0) for m in parts)
+    if any("cents_by_type" in m for m in parts):
+        merged["cents_by_type"] = {}
+        for m in parts:
+            for t, c in m.get("cents_by_type", {}).items():
+                merged["cents_by_type"][t] = merged["cents_by_type"].get(t, 0) + c
+    merged["timings"] = merge_timings(m.get("timings", {}) for m in parts)
+    merged["files"] = len(parts)
+    _finalize_metrics(merged)
+    return merged
+
+
+def _load_streaming(
+    file_paths: List[Path],
+    processed_dir: Path,
+    quarantine_enabled: bool,
+    chunk_size: int,
+    output: OutputSpec,
+    append: bool,
+    part_prefix: str | None,
+) -> List[Dict[str, Any]]:
+    """
+    Process the raw files chunk by chunk, appending each chunk's clean and
+    quarantined rows to the processed outputs. Returns metrics per file.
+
+    All files share one pair of writers whose outputs go to temporary paths
+    and are only moved into place once every chunk of every file has passed
+    validation, so a failed batch never leaves a half-written processed
+    layer behind.
+    """
+    with ExitStack() as stack:
+        clean_writer = stack.enter_context(
+            DatasetWriter(
+                processed_dir, "transactions_clean", output,
+                append=append, part_prefix=part_prefix,
+            )
+        )
+        quarantine_writer = None
+        if quarantine_enabled:
+            quarantine_writer = stack.enter_context(
+                DatasetWriter(
+                    processed_dir, "transactions_quarantine", output.unpartitioned(),
+                    append=append, part_prefix=part_prefix,
+                )
+            )
+        per_file = [
+            _stream_file(path, chunk_size, clean_writer, quarantine_writer)
+            for path in file_paths
+        ]
+
+    if quarantine_writer is not None:
+        logging.info(f"Wrote quarantined rows to: {quarantine_writer.path}")
+    logging.info(f"Wrote cleaned data to: {clean_writer.path}")
+    return per_file
+
+
+def _stream_file(
+    file_path: Path,
+    chunk_size: int,
+    clean_writer: DatasetWriter,
+    quarantine_writer: Optional[DatasetWriter],
+) -> Dict[str, Any]:
+    metrics = _new_metrics(quarantine_writer is not None)
+    metrics["chunk_size"] = int(chunk_size)
+    metrics["chunks"] = 0
+    # Streaming keeps no clean frame, so the batch totals are summed here
+    metrics["cents_by_type"] = {}
+    profile = BatchProfile()
+    timer = StageTimer()
+    rows_before = clean_writer.rows
+
+    chunks = timer.iterate("read", read_transactions_csv(file_path, chunk_size=chunk_size))
+    for chunk in chunks:
+        metrics["chunks"] += 1
+        metrics["input_rows"] += int(len(chunk))
+        rows = len(chunk)
+
+        # Duplicate ids (a warning) are only detected within a chunk.
+        with timer.stage("quarantine", rows):
+            result = _evaluate(chunk, metrics)
+            if quarantine_writer is not None:
+                clean_chunk, quarantine_chunk, counts = _quarantine(chunk, result)
+                clean_rows = ~result.violations(result.mask_for(reasons=QUARANTINE_REASONS))
+            else:
+                clean_chunk = _attach_parsed_dates(chunk, result)
+                clean_rows = None
+        with timer.stage("profile", rows):
+            profile.update(chunk, result.context)
+        chunk = clean_chunk
+        if quarantine_writer is not None:
+            for key, value in counts.items():
+                metrics[key] += value
+            with timer.stage("write.transactions_quarantine", len(quarantine_chunk)):
+                quarantine_writer.write(quarantine_chunk)
+
+        with timer.stage("validate", len(chunk)):
+            _validate_clean(chunk, result, clean_rows)
+        _add_cents_by_type(metrics, chunk)
+        with timer.stage("write.transactions_clean", len(chunk)):
+            clean_writer.write(chunk)
+
+    if metrics["chunks"] == 0:
+        header = pd.read_csv(file_path, nrows=0)
+        clean_writer.write(header)
+        if quarantine_writer is not None:
+            quarantine_writer.write(header)
+
+    metrics["clean_rows"] = clean_writer.rows - rows_before
+    metrics["profile"] = profile.to_dict()
+    metrics["timings"] = timer.to_dict()
+    _log_quarantine(metrics)
+    logging.info(f"Schema & business validation passed: {file_path}")
+    logging.info(
+        f"Clean rows: {metrics['clean_rows']} | Chunks: {metrics['chunks']}"
+    )
+
+    _finalize_metrics(metrics)
+    return metrics
+
+
+def load_transactions_csv(
+    raw_path: Path | None = None,
+    processed_dir: Path | None = None,
+    quarantine_enabled: bool = True,
+    return_metrics: bool = False,
+    chunk_size: int | None = None,
+    write_clean: bool = True,
+    output: OutputSpec | None = None,
+    append: bool = False,
+    part_prefix: str | None = None,
+) -> Union[
+    Optional[pd.DataFrame], Tuple[Optional[pd.DataFrame], Dict[str, Any]]
+]:
+    """
+    Load transactions CSV, optionally quarantine bad rows, validate clean rows,
+    and write processed outputs.
+
+    When ``chunk_size`` is set the file is streamed in chunks of that many rows
+    so peak memory stays bounded by the chunk rather than the file. In that
+    mode the clean rows are only written to disk and ``None`` is returned in
+    place of the DataFrame; the metrics are summed across chunks and include
+    the clean amounts in cents per transaction type (``"cents_by_type"``).
+
+    ``write_clean=False`` skips writing ``transactions_clean`` for callers
+    that hand the returned frame straight to the transform. Streaming mode
+    always writes it, since that is the only copy of the clean rows.
+    ``output`` selects the on-disk format of the processed datasets (CSV by
+    default). ``append=True`` adds this file's rows to the existing processed
+    datasets instead of replacing them; ``part_prefix`` names the parquet
+    part files written for it.
+    """
+    file_path = raw_path or Path("data/raw/transactions_sample.csv")
+    processed_dir = processed_dir or Path("data/processed")
+    output = output or OutputSpec()
+
+    if not file_path.exists():
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    processed_dir.mkdir(parents=True, exist_ok=True)
+
+    if chunk_size:
+        metrics = _load_streaming(
+            [file_path], processed_dir, quarantine_enabled, chunk_size, output,
+            append, part_prefix,
+        )[0]
+        if return_metrics:
+            return None, metrics
+        return None
+
+    df, quarantine_df, metrics = _process_file(file_path, quarantine_enabled)
+    timer = StageTimer()
+    _write_processed(
+        df, quarantine_df, processed_dir, output, write_clean, append, part_prefix, timer
+    )
+    metrics["timings"] = merge_timings([metrics["timings"], timer.to_dict()])
     logging.info(f"Clean rows: {len(df)} | Columns: {list(df.columns)}")
 
     if return_metrics:
@@ -111,6 +351,199 @@ def load_transactions_csv(
     return df
 
 
+def _process_file(
+    file_path: Path, quarantine_enabled: bool
+) -> Tuple[pd.DataFrame, Optional[pd.DataFrame], Dict[str, Any]]:
+    """Read, quarantine and validate one raw file (runs in worker processes)."""
+    timer = StageTimer()
+    with timer.stage("read") as stage:
+        df = read_transactions_csv(file_path)
+        stage["rows"] = len(df)
+
+    metrics = _new_metrics(quarantine_enabled)
+    metrics["input_rows"] = int(len(df))
+
+    with timer.stage("quarantine", len(df)):
+        result = _evaluate(df, metrics)
+        quarantine_df = None
+        clean_rows = None
+        if quarantine_enabled:
+            clean_df, quarantine_df, counts = _quarantine(df, result)
+            clean_rows = ~result.violations(result.mask_for(reasons=QUARANTINE_REASONS))
+        else:
+            clean_df = _attach_parsed_dates(df, result)
+    with timer.stage("profile", len(df)):
+        profile = BatchProfile()
+        profile.update(df, result.context)
+        metrics["profile"] = profile.to_dict()
+    df = clean_df
+    if quarantine_enabled:
+        metrics.update(counts)
+        _log_quarantine(metrics)
+
+    # Validate clean data
+    with timer.stage("validate", len(df)):
+        _validate_clean(df, result, clean_rows)
+    logging.info(f"Schema & business validation passed: {file_path}")
+
+    metrics["clean_rows"] = int(len(df))
+    metrics["timings"] = timer.to_dict()
+    _finalize_metrics(metrics)
+    return df, quarantine_df, metrics
+
+
+def _write_processed(
+    df: pd.DataFrame,
+    quarantine_df: Optional[pd.DataFrame],
+    processed_dir: Path,
+    output: OutputSpec,
+    write_clean: bool,
+    append: bool,
+    part_prefix: str | None,
+    timer: StageTimer,
+) -> None:
+    if quarantine_df is not None:
+        with timer.stage("write.transactions_quarantine", len(quarantine_df)):
+            quarantine_path = write_dataset(
+                quarantine_df, processed_dir, "transactions_quarantine", output.unpartitioned(),
+                append=append, part_prefix=part_prefix,
+            )
+        logging.info(f"Wrote quarantined rows to: {quarantine_path}")
+
+    if write_clean:
+        with timer.stage("write.transactions_clean", len(df)):
+            clean_path = write_dataset(
+                df, processed_dir, "transactions_clean", output,
+                append=append, part_prefix=part_prefix,
+            )
+        logging.info(f"Wrote cleaned data to: {clean_path}")
+
+
+def resolve_raw_files(raw: str | Path | Sequence[str | Path]) -> List[Path]:
+    """
+    Expand ``paths.raw`` into a sorted list of CSV files.
+
+    Accepts a single file, a directory (every ``*.csv`` inside it), a glob
+    pattern such as ``data/raw/*_ledger.csv``, or a list of any of these
+    (e.g. the files of one scheduler micro-batch).
+    """
+    if not isinstance(raw, (str, Path)):
+        files = sorted({p for item in raw for p in resolve_raw_files(item)})
+        if not files:
+            raise FileNotFoundError("No raw CSV files given")
+        return files
+    raw_path = Path(raw)
+    if raw_path.is_dir():
+        files = sorted(raw_path.glob("*.csv"))
+    elif glob.has_magic(str(raw)):
+        files = sorted(Path(p) for p in glob.glob(str(raw)) if Path(p).is_file())
+    else:
+        if not raw_path.exists():
+            raise FileNotFoundError(f"File not found: {raw_path}")
+        return [raw_path]
+
+    if not files:
+        raise FileNotFoundError(f"No raw CSV files found for: {raw}")
+    return files
+
+
+def concat_transaction_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames, ignore_index=True)
+    # Files infer their own categories; concatenating different category
+    # sets falls back to plain values, so restore the contract dtype.
+    for c in transactions_schema_spec().categorical_columns:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+    return df
+
+
+def _without_sketches(per_file: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    # The merged profile keeps the sketches; per file the summary is enough.
+    for m in per_file.values():
+        if "profile" in m:
+            m["profile"] = {"summary": m["profile"]["summary"]}
+    return per_file
+
+
+def load_transactions_files(
+    raw_files: List[Path],
+    processed_dir: Path | None = None,
+    quarantine_enabled: bool = True,
+    chunk_size: int | None = None,
+    write_clean: bool = True,
+    output: OutputSpec | None = None,
+    append: bool = False,
+    part_prefix: str | None = None,
+    workers: int | None = None,
+) -> Tuple[Optional[pd.DataFrame], Dict[str, Any]]:
+    """
+    Ingest several raw files as one batch.
+
+    Files are read, quarantined and validated in a process pool of
+    ``workers`` processes (all cores by default), then merged in sorted file
+    order and written once, so the output does not depend on which worker
+    finished first. Streaming mode (``chunk_size``) processes files one at a
+    time to keep memory bounded, staging every file's rows behind the same
+    writers. Either way any validation failure fails the whole batch before
+    anything is written.
+
+    Returns the clean frame (``None`` in streaming mode) and the merged
+    metrics, with per-file metrics under ``"per_file"``.
+    """
+    processed_dir = processed_dir or Path("data/processed")
+    output = output or OutputSpec()
+    raw_files = sorted(raw_files)
+    processed_dir.mkdir(parents=True, exist_ok=True)
+
+    per_file: Dict[str, Dict[str, Any]] = {}
+
+    if chunk_size:
+        for path in raw_files:
+            if not path.exists():
+                raise FileNotFoundError(f"File not found: {path}")
+        file_metrics = _load_streaming(
+            raw_files, processed_dir, quarantine_enabled, chunk_size, output,
+            append, part_prefix,
+        )
+        per_file.update(zip(map(str, raw_files), file_metrics))
+        metrics = merge_ingest_metrics(list(per_file.values()))
+        metrics["per_file"] = _without_sketches(per_file)
+        return None, metrics
+
+    max_workers = min(workers or os.cpu_count() or 1, len(raw_files)) or 1
+    if max_workers == 1:
+        results = [_process_file(p, quarantine_enabled) for p in raw_files]
+    else:
+        logging.info(f"Ingesting {len(raw_files)} files with {max_workers} workers")
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(
+                pool.map(_process_file, raw_files, [quarantine_enabled] * len(raw_files))
+            )
+
+    timer = StageTimer()
+    with timer.stage("concat"):
+        df = concat_transaction_frames([r[0] for r in results])
+        quarantine_df = None
+        if quarantine_enabled:
+            quarantine_df = concat_transaction_frames([r[1] for r in results])
+
+    _write_processed(
+        df, quarantine_df, processed_dir, output, write_clean, append, part_prefix, timer
+    )
+
+    for path, (_, _, file_metrics) in zip(raw_files, results):
+        per_file[str(path)] = file_metrics
+    metrics = merge_ingest_metrics(list(per_file.values()))
+    # Batch-level stages; the per-file ones are in the merged timings
+    metrics["timings"] = merge_timings([metrics["timings"], timer.to_dict()])
+    metrics["per_file"] = _without_sketches(per_file)
+
+    logging.info(f"Clean rows: {len(df)} | Files: {len(raw_files)}")
+    return df, metrics
+
+
 if __name__ == "__main__":
     logging.basicConfig(
         level=logging.INFO,
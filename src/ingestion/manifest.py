@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+
+
+MANIFEST_NAME = "_raw_manifest.json"
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    path: str
+    size: int
+    mtime: float
+    sha256: str
+    rows: int | None
+    run_id: str
+
+
+def hash_file(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RawFileManifest:
+    """
+    Record of the raw files already ingested into a layer.
+
+    A file counts as unchanged when its size and mtime match the entry, or,
+    if only the mtime moved (e.g. a re-copy), when its content hash still
+    matches. ``transform_pending`` stays set from the moment a file lands in
+    the processed layer until the downstream transform has consumed it, so a
+    run that failed after ingestion is not skipped on rerun.
+    ``gold_incremental_runs`` counts gold refreshes merged incrementally
+    since the last full rebuild.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        entries: dict[str, ManifestEntry] | None = None,
+        transform_pending: bool = False,
+        gold_incremental_runs: int = 0,
+    ):
+        self.path = path
+        self.entries: dict[str, ManifestEntry] = entries or {}
+        self.transform_pending = transform_pending
+        self.gold_incremental_runs = gold_incremental_runs
+
+    @classmethod
+    def load(cls, path: Path) -> "RawFileManifest":
+        if not path.exists():
+            return cls(path)
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        entries = {e["path"]: ManifestEntry(**e) for e in data.get("files", [])}
+        return cls(
+            path,
+            entries,
+            bool(data.get("transform_pending", False)),
+            int(data.get("gold_incremental_runs", 0)),
+        )
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        payload = {
+            "transform_pending": self.transform_pending,
+            "gold_incremental_runs": self.gold_incremental_runs,
+            "files": [asdict(e) for e in sorted(self.entries.values(), key=lambda e: e.path)],
+        }
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        tmp.replace(self.path)
+
+    @staticmethod
+    def key(path: Path) -> str:
+        return path.as_posix()
+
+    def status(self, path: Path) -> str:
+        """Return ``"new"``, ``"modified"`` or ``"unchanged"`` for a raw file."""
+        entry = self.entries.get(self.key(path))
+        if entry is None:
+            return "new"
+
+        stat = path.stat()
+        if stat.st_size != entry.size:
+            return "modified"
+        if stat.st_mtime == entry.mtime:
+            return "unchanged"
+        if hash_file(path) != entry.sha256:
+            return "modified"
+        # Same content; remember the new mtime so the next check is cheap.
+        self.entries[entry.path] = replace(entry, mtime=stat.st_mtime)
+        return "unchanged"
+
+    def record(self, path: Path, rows: int | None, run_id: str) -> None:
+        stat = path.stat()
+        self.entries[self.key(path)] = ManifestEntry(
+            path=self.key(path),
+            size=int(stat.st_size),
+            mtime=stat.st_mtime,
+            sha256=hash_file(path),
+            rows=rows,
+            run_id=run_id,
+        )
+        self.transform_pending = True
+
+    def reset(self) -> None:
+        self.entries = {}
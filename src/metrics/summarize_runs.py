@@ -1,5 +1,6 @@
 import argparse
 import json
+import statistics
 from pathlib import Path
 from typing import Any, Dict, List
 
@@ -8,6 +9,18 @@ def parse_args():
     p = argparse.ArgumentParser(description="Summarize recent pipeline run metrics JSON files.")
     p.add_argument("--metrics-dir", default="metrics", help="Directory containing run_*.json files")
     p.add_argument("--n", type=int, default=10, help="How many recent runs to summarize")
+    p.add_argument(
+        "--kind",
+        choices=["run", "build", "batch"],
+        default="run",
+        help="run_*.json (pipeline runs), build_*.json (warehouse SQL builds) or "
+        "batch_*.json (scheduler micro-batches)",
+    )
+    p.add_argument(
+        "--merge-profiles",
+        action="store_true",
+        help="Merge the data profiles of the selected runs into one history-wide profile",
+    )
     return p.parse_args()
 
 
@@ -16,22 +29,98 @@ def load_json(path: Path) -> Dict[str, Any]:
         return json.load(f)
 
 
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    headers = list(rows[0].keys())
+    col_widths = {h: max(len(h), max(len(str(r.get(h))) for r in rows)) for h in headers}
+
+    def fmt_row(r: Dict[str, Any]) -> str:
+        return " | ".join(str(r.get(h, "")).ljust(col_widths[h]) for h in headers)
+
+    print(fmt_row({h: h for h in headers}))
+    print("-+-".join("-" * col_widths[h] for h in headers))
+    for r in rows:
+        print(fmt_row(r))
+
+
+def stage_trends(runs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    One row per stage of the ``timings`` sections of ``runs`` (newest
+    first): the latest run's figures and its wall time against the median
+    of the earlier runs.
+    """
+    stages: Dict[str, List[Dict[str, Any]]] = {}
+    for d in runs:
+        for name, record in d.get("timings", {}).items():
+            stages.setdefault(name, []).append(record)
+
+    rows = []
+    for name, records in stages.items():
+        latest, earlier = records[0], [r["wall_s"] for r in records[1:]]
+        baseline = statistics.median(earlier) if earlier else None
+        change = None
+        if baseline:
+            change = f"{(latest['wall_s'] - baseline) / baseline:+.0%}"
+        rows.append(
+            {
+                "stage": name,
+                "runs": len(records),
+                "wall_s": latest["wall_s"],
+                "median_wall_s": round(baseline, 4) if baseline is not None else None,
+                "change": change,
+                "cpu_s": latest["cpu_s"],
+                "rows_per_s": latest.get("rows_per_s"),
+                "peak_rss_mb": latest.get("peak_rss_mb"),
+            }
+        )
+    # Where the time goes: slowest stage of the latest run first
+    return sorted(rows, key=lambda r: r["wall_s"], reverse=True)
+
+
+def batch_rows(batches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One row per scheduler micro-batch: file arrival -> warehouse latency."""
+    rows = []
+    for d in batches:
+        latency = d.get("latency", {})
+        rows.append(
+            {
+                "batch": d.get("batch", {}).get("id"),
+                "files": len(d.get("batch", {}).get("files", [])),
+                "exit_code": d.get("batch", {}).get("exit_code"),
+                "batching_s": latency.get("batching_s"),
+                "queued_s": latency.get("queued_s"),
+                "run_s": latency.get("run_s"),
+                "latency_max_s": latency.get("max_s"),
+            }
+        )
+    return rows
+
+
 def main():
     args = parse_args()
     metrics_dir = Path(args.metrics_dir)
 
-    files = sorted(metrics_dir.glob("run_*.json"), reverse=True)[: args.n]
+    pattern = f"{args.kind}_*.json"
+    files = sorted(metrics_dir.glob(pattern), reverse=True)[: args.n]
 
     if not files:
-        print(f"No run_*.json files found in: {metrics_dir.resolve()}")
+        print(f"No {pattern} files found in: {metrics_dir.resolve()}")
+        return
+
+    runs = [load_json(fp) for fp in files]
+    if args.kind == "batch":
+        print_table(batch_rows(runs))
+        return
+    trends = stage_trends(runs)
+    if args.kind == "build":
+        print_table(trends)
         return
 
     rows: List[Dict[str, Any]] = []
-    for fp in files:
-        d = load_json(fp)
+    for fp, d in zip(files, runs):
         run_ts = d.get("run", {}).get("timestamp")
         ingest = d.get("ingestion", {})
         transform = d.get("transform", {})
+        profile = ingest.get("profile", {}).get("summary", {})
 
         rows.append(
             {
@@ -43,21 +132,32 @@ def main():
 "income_total": transform.get("income_total", 0.0),
 "expense_total": transform.get("expense_total", 0.0),
 "net_total": transform.get("net_total", 0.0),
+                "distinct_depts": profile.get("distinct_departments"),
+                "amount_p50": profile.get("amount_quantiles", {}).get("p50"),
+                "wall_s": d.get("run", {}).get("wall_s"),
 
 
             }
         )
 
-    headers = list(rows[0].keys())
-    col_widths = {h: max(len(h), max(len(str(r.get(h))) for r in rows)) for h in headers}
+    print_table(rows)
 
-    def fmt_row(r: Dict[str, Any]) -> str:
-        return " | ".join(str(r.get(h, "")).ljust(col_widths[h]) for h in headers)
+    if trends:
+        print(f"\nStage timings (latest run vs median of the {len(files) - 1} before it):")
+        print_table(trends)
 
-    print(fmt_row({h: h for h in headers}))
-    print("-+-".join("-" * col_widths[h] for h in headers))
-    for r in rows:
-        print(fmt_row(r))
+    if args.merge_profiles:
+        # numpy/pandas only load when profiles are merged
+        from src.metrics.profile import merge_profiles
+
+        # Sketches merge without rescanning data; skipped runs have no profile
+        profiles = [
+            p for p in (d.get("ingestion", {}).get("profile") for d in runs)
+            if p and "sketches" in p
+        ]
+        merged = merge_profiles(profiles)
+        print(f"\nMerged profile of {len(profiles)} runs:")
+        print(json.dumps(merged["summary"] if merged else None, indent=2))
 
 
 if __name__ == "__main__":
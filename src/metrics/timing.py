@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+T = TypeVar("T")
+
+SUMMED = ("calls", "wall_s", "cpu_s", "rows")
+PEAKS = ("peak_rss_mb", "peak_rss_growth_mb", "py_peak_mb")
+
+
+def _windows_peak_rss_mb() -> Optional[float]:
+    """Peak working set via GetProcessMemoryInfo, ``resource``'s Windows counterpart."""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    try:
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.WinDLL("kernel32")
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        get_info = ctypes.WinDLL("psapi").GetProcessMemoryInfo
+        get_info.argtypes = [wintypes.HANDLE, ctypes.c_void_p, wintypes.DWORD]
+        if not get_info(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return None
+    except (AttributeError, OSError):
+        return None
+    return round(counters.PeakWorkingSetSize / (1024 * 1024), 1)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """High-water mark of this process's resident memory, in MB."""
+    if resource is None:
+        return _windows_peak_rss_mb() if sys.platform == "win32" else None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def _throughput(record: Dict[str, Any]) -> None:
+    rows, wall = record.get("rows"), record["wall_s"]
+    if rows is not None and wall > 0:
+        record["rows_per_s"] = round(rows / wall, 1)
+
+
+class StageTimer:
+    """
+    Wall time, CPU time, memory and rows/second per pipeline stage.
+
+    A stage entered several times (per chunk, per file) accumulates: times
+    and rows are summed, memory figures keep the maximum. CPU time is the
+    process's, so it includes helper threads (DuckDB, Arrow). Memory is the
+    process's peak RSS when the stage ended and how much the stage raised
+    it; when ``tracemalloc`` is tracing (``pipeline.trace_memory`` or
+    ``PYTHONTRACEMALLOC``), ``py_peak_mb`` is the peak Python allocation
+    inside the stage.
+    """
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Time the ``with`` block as ``name``. Yields a dict; set ``rows`` on
+        it when the row count is only known at the end.
+        """
+        info: Dict[str, Any] = {"rows": rows}
+        stack = self._stack()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # Nested stages reset the peak, so fold it into the outer one first
+            if stack:
+                stack[-1]["py_peak"] = max(stack[-1]["py_peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            info["py_peak"] = 0
+        stack.append(info)
+        rss_before = peak_rss_mb()
+        cpu, wall = time.process_time(), time.perf_counter()
+        try:
+            yield info
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            stack.pop()
+            sample: Dict[str, Any] = {"calls": 1, "wall_s": wall, "cpu_s": cpu}
+            if info.get("rows") is not None:
+                sample["rows"] = int(info["rows"])
+            rss_after = peak_rss_mb()
+            if rss_after is not None:
+                sample["peak_rss_mb"] = rss_after
+                sample["peak_rss_growth_mb"] = rss_after - rss_before
+            if tracing and tracemalloc.is_tracing():
+                py_peak = max(info["py_peak"], tracemalloc.get_traced_memory()[1])
+                sample["py_peak_mb"] = py_peak / (1024 * 1024)
+                if stack:
+                    stack[-1]["py_peak"] = max(stack[-1]["py_peak"], py_peak)
+            with self._lock:
+                self.stages[name] = _combine(self.stages.get(name), sample)
+
+    def iterate(
+        self, name: str, items: Iterable[T], rows: Callable[[T], int] = len
+    ) -> Iterator[T]:
+        """Yield from ``items``, timing each fetch (e.g. a chunked reader) as ``name``."""
+        it = iter(items)
+        while True:
+            with self.stage(name) as info:
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                info["rows"] = rows(item)
+            yield item
+
+    def merge(self, timings: Dict[str, Dict[str, Any]]) -> None:
+        """Fold in ``to_dict()`` output of another timer (e.g. a worker process)."""
+        with self._lock:
+            for name, record in timings.items():
+                self.stages[name] = _combine(self.stages.get(name), record)
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for name, record in self.stages.items():
+            record = {
+                k: round(v, 4) if isinstance(v, float) else v for k, v in record.items()
+            }
+            _throughput(record)
+            out[name] = record
+        return out
+
+    def _stack(self) -> List[Dict[str, Any]]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+
+def _combine(
+    record: Optional[Dict[str, Any]], sample: Dict[str, Any]
+) -> Dict[str, Any]:
+    if record is None:
+        return {k: v for k, v in sample.items() if k != "rows_per_s"}
+    record = dict(record)
+    for key in SUMMED:
+        if key in sample:
+            record[key] = record.get(key, 0) + sample[key]
+    for key in PEAKS:
+        if key in sample:
+            record[key] = max(record.get(key, sample[key]), sample[key])
+    return record
+
+
+def merge_timings(parts: Iterable[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    """Combine several ``timings`` dicts (per file, per run part) into one."""
+    timer = StageTimer()
+    for part in parts:
+        timer.merge(part)
+    return timer.to_dict()
@@ -1,38 +1,53 @@
 import argparse
+import copy
 import json
 import logging
+import time
+import tracemalloc
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
-import yaml
+from src.metrics.timing import StageTimer, peak_rss_mb
 
-from src.ingestion.load_csv import load_transactions_csv
-from src.transforms.transform_transactions import transform_transactions
+# Parsed configs by (path, mtime); a warm worker re-reads a config only when it changes
+_CONFIG_CACHE: Dict[tuple, dict] = {}
 
 
 def load_config(path: Path) -> dict:
     if not path.exists():
         raise FileNotFoundError(f"Config file not found: {path}")
-    with path.open("r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    key = (str(path.resolve()), path.stat().st_mtime_ns)
+    if key not in _CONFIG_CACHE:
+        import yaml
+
+        with path.open("r", encoding="utf-8") as f:
+            _CONFIG_CACHE[key] = yaml.safe_load(f)
+    return copy.deepcopy(_CONFIG_CACHE[key])
 
 
 def setup_logging(level: str):
+    # force: in a warm worker an earlier run may already have configured logging
     logging.basicConfig(
         level=getattr(logging, level),
         format="%(asctime)s | %(levelname)s | %(message)s",
+        force=True,
     )
 
 
-def parse_args():
+def parse_args(argv: Optional[List[str]] = None):
     parser = argparse.ArgumentParser(description="Run the finance data pipeline.")
     parser.add_argument(
         "--config",
         default="config/dev.yml",
         help="Path to YAML config file",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--rebuild-gold",
+        action="store_true",
+        help="Rebuild the gold summary from the processed layer instead of merging the new batch",
+    )
+    return parser.parse_args(argv)
 
 
 def write_run_metrics(metrics_dir: Path, payload: Dict[str, Any]) -> Path:
@@ -47,8 +62,42 @@ def write_run_metrics(metrics_dir: Path, payload: Dict[str, Any]) -> Path:
     return out_path
 
 
-def run():
-    args = parse_args()
+def run(argv: Optional[List[str]] = None):
+    # pipeline.trace_memory starts tracing for this run only: a warm worker
+    # must not keep paying for it (or report cumulative peaks) afterwards
+    was_tracing = tracemalloc.is_tracing()
+    try:
+        _run(argv)
+    finally:
+        if not was_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def _run(argv: Optional[List[str]] = None):
+    started_wall, started_cpu = time.perf_counter(), time.process_time()
+    args = parse_args(argv)
+
+    # Imported here so --help answers without loading pandas/pyarrow/duckdb;
+    # a warm worker (orchestration/worker.py) has them loaded already
+    import numpy as np
+
+    from src.ingestion.load_csv import load_transactions_files, resolve_raw_files
+    from src.ingestion.manifest import MANIFEST_NAME, RawFileManifest
+    from src.storage.datasets import dataset_path, output_spec_from_config, read_dataset
+    from src.transforms.duckdb_backend import (
+        BACKENDS,
+        duckdb_settings_from_config,
+        transform_transactions_duckdb,
+    )
+    from src.transforms.transform_transactions import (
+        department_month_totals,
+        merge_summary,
+        prepare_analytics,
+        summary_drift,
+        transform_transactions,
+    )
+    from src.validation.money import CENTS_PER_UNIT, to_cents
+
     config_path = Path(args.config)
 
     config = load_config(config_path)
@@ -57,66 +106,219 @@ def run():
     logging.info("Starting pipeline")
     logging.info(f"Using config: {config_path}")
 
-    raw_path = Path(config["paths"]["raw"])
+    raw_path = config["paths"]["raw"]
     processed_dir = Path(config["paths"]["processed_dir"])
     gold_dir = Path(config["paths"]["gold_dir"])
     metrics_dir = Path(config["paths"].get("metrics_dir", "metrics"))
 
     quarantine_enabled = bool(config.get("pipeline", {}).get("quarantine_enabled", True))
+    chunk_size = config.get("pipeline", {}).get("chunk_size") or None
+    write_processed_clean = bool(
+        config.get("pipeline", {}).get("write_processed_clean", True)
+    )
+    output = output_spec_from_config(config)
+
+    incremental = bool(config.get("pipeline", {}).get("incremental", False))
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    raw_files = resolve_raw_files(raw_path)
+    workers = config.get("pipeline", {}).get("workers")
+    gold_rebuild_every = config.get("pipeline", {}).get("gold_rebuild_every") or None
+    fiscal_year_start_month = int(config.get("pipeline", {}).get("fiscal_year_start_month", 8))
+    transform_backend = str(config.get("pipeline", {}).get("transform_backend", "pandas")).lower()
+    if config.get("pipeline", {}).get("trace_memory") and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    timer = StageTimer()
+    if transform_backend not in BACKENDS:
+        raise ValueError(
+            f"Unsupported transform backend: {transform_backend} (expected one of {BACKENDS})"
+        )
+
+    # --- Incremental: only ingest raw files the manifest has not seen ---
+    manifest = RawFileManifest.load(processed_dir / MANIFEST_NAME) if incremental else None
+    append = False
+    to_ingest = raw_files
+    file_status: Dict[str, str] = {}
+
+    if manifest is not None:
+        file_status = {str(p): manifest.status(p) for p in raw_files}
+        if "modified" in file_status.values():
+            # Rows from the old version are already in the processed layer;
+            # rebuild it from every raw file rather than append duplicates.
+            logging.warning("Modified raw file(s) detected; rebuilding processed layer")
+            manifest.reset()
+        else:
+            to_ingest = [p for p in raw_files if file_status[str(p)] == "new"]
+            append = True
+
+        if not to_ingest and not manifest.transform_pending and not args.rebuild_gold:
+            logging.info("No new or modified raw files; nothing to do")
+            write_run_metrics(
+                metrics_dir,
+                {
+                    "run": {
+                        "run_id": run_id,
+                        "timestamp": datetime.now().isoformat(timespec="seconds"),
+                        "config_path": str(config_path),
+                        "skipped": True,
+                    },
+                    "ingestion": {"files": file_status},
+                },
+            )
+            return
 
     # --- Ingestion (df_clean + metrics) ---
-    df_clean, ingest_metrics = load_transactions_csv(
-        raw_path=raw_path,
-        processed_dir=processed_dir,
-        quarantine_enabled=quarantine_enabled,
-        return_metrics=True,
-    )
+    df_clean = None
+    ingest_metrics: Dict[str, Any] = {"files": 0}
+    if to_ingest:
+        df_clean, ingest_metrics = load_transactions_files(
+            to_ingest,
+            processed_dir=processed_dir,
+            quarantine_enabled=quarantine_enabled,
+            chunk_size=chunk_size,
+            # Incremental runs append to the processed layer, so it is needed
+            # on disk even when the transform reads from memory.
+            write_clean=write_processed_clean or incremental,
+            output=output,
+            append=append,
+            part_prefix=run_id,
+            workers=workers,
+        )
+        if manifest is not None:
+            for path in to_ingest:
+                rows = ingest_metrics["per_file"][str(path)]["input_rows"]
+                manifest.record(path, rows, run_id)
+            manifest.save()
+
+    # Ingestion stages (summed over files and chunks) go in the run's timings
+    timer.merge(ingest_metrics.pop("timings", {}))
+    if manifest is not None:
+        ingest_metrics["incremental"] = {"append": append, "files": file_status}
     logging.info("Ingestion complete")
 
     # --- Transform (df_analytics) ---
-    df_analytics = transform_transactions(
+    # Hand the clean frame over in memory. An appended batch is merged into
+    # the existing gold outputs, except every ``gold_rebuild_every`` runs (or
+    # with --rebuild-gold) when gold is rebuilt from the processed layer and
+    # compared with the incrementally maintained summary. Streaming ingestion
+    # keeps no frame, so those runs also read the processed layer back.
+    rebuild_due = bool(
+        manifest is not None
+        and gold_rebuild_every
+        and manifest.gold_incremental_runs >= int(gold_rebuild_every)
+    )
+    summary_path = dataset_path(gold_dir, "department_monthly_summary", output)
+    incremental_gold = (
+        append
+        and df_clean is not None
+        and summary_path.exists()
+        and dataset_path(gold_dir, "department_month_type_totals", output).exists()
+        and not args.rebuild_gold
+        and not rebuild_due
+    )
+    gold_metrics: Dict[str, Any] = {"mode": "incremental" if incremental_gold else "full"}
+
+    # What the incremental path would have produced, to verify the rebuild
+    expected_summary = None
+    if append and not incremental_gold and manifest.gold_incremental_runs and summary_path.exists():
+        with timer.stage("verify"):
+            expected_summary = read_dataset(gold_dir, "department_monthly_summary", output)
+            if df_clean is not None:
+                batch = prepare_analytics(df_clean.copy(deep=False))
+                expected_summary = merge_summary(expected_summary, department_month_totals(batch))
+
+    transform_args = dict(
         processed_dir=processed_dir,
         gold_dir=gold_dir,
+        df=df_clean if incremental_gold or not append else None,
+        output=output,
+        incremental=incremental_gold,
+        fiscal_year_start_month=fiscal_year_start_month,
+        timer=timer,
     )
-    logging.info("Transform complete")
-
-        # --- Trend-friendly totals (compute from clean transactions) ---
-    df_calc = df_clean.copy()
-
-    if "transaction_type" in df_calc.columns and "amount" in df_calc.columns:
-        t = df_calc["transaction_type"].astype(str).str.strip().str.lower()
-
-        income_total = float(df_calc.loc[t.isin(["income", "refund"]), "amount"].sum())
-        expense_total = float(df_calc.loc[t == "expense", "amount"].sum())
+    if transform_backend == "duckdb":
+        # SQL over the clean frame, or out of core over the processed files
+        # when ingestion kept none; no analytics frame comes back
+        df_analytics = None
+        transform_result = transform_transactions_duckdb(
+            **transform_args, settings=duckdb_settings_from_config(config)
+        )
+        analytics_rows, analytics_columns = transform_result.rows, transform_result.columns
     else:
-        income_total = 0.0
-        expense_total = 0.0
-
-    net_total = income_total - expense_total
-
+        df_analytics = transform_transactions(**transform_args)
+        analytics_rows, analytics_columns = len(df_analytics), list(df_analytics.columns)
+    gold_metrics["backend"] = transform_backend
+    logging.info("Transform complete")
 
-    net_total = income_total - expense_total
+    if expected_summary is not None:
+        with timer.stage("verify"):
+            drift = summary_drift(
+                expected_summary, read_dataset(gold_dir, "department_monthly_summary", output)
+            )
+        gold_metrics["verified_cells_mismatched"] = drift
+        if drift:
+            logging.warning(f"Incremental gold summary drifted in {drift} cells; rebuilt")
+        else:
+            logging.info("Incremental gold summary matches the full rebuild")
+
+    if manifest is not None:
+        manifest.transform_pending = False
+        manifest.gold_incremental_runs = (
+            manifest.gold_incremental_runs + 1 if incremental_gold else 0
+        )
+        gold_metrics["incremental_runs_since_rebuild"] = manifest.gold_incremental_runs
+        manifest.save()
+
+    # --- Trend-friendly totals (compute from clean transactions) ---
+    # Totals cover this run's batch only; an incremental run with no new
+    # files (rerun of a failed transform) has none. Summed in cents (exact),
+    # converted to amounts for the metrics.
+    income_cents = 0
+    expense_cents = 0
+    if to_ingest and df_clean is not None:
+        t = df_clean["transaction_type"].astype(str).str.strip().str.lower().to_numpy()
+        cents = to_cents(df_clean["amount"])
+
+        income_cents = int(cents[np.isin(t, ["income", "refund"])].sum())
+        expense_cents = int(cents[t == "expense"].sum())
+    elif to_ingest:
+        # Streaming ingestion keeps no clean frame (and the processed and
+        # gold layers may hold earlier batches); it sums the batch per type.
+        by_type = ingest_metrics["cents_by_type"]
+        income_cents = by_type.get("income", 0) + by_type.get("refund", 0)
+        expense_cents = by_type.get("expense", 0)
+
+    income_total = income_cents / CENTS_PER_UNIT
+    expense_total = expense_cents / CENTS_PER_UNIT
+    net_total = (income_cents - expense_cents) / CENTS_PER_UNIT
 
     # --- Run metrics payload ---
     run_metrics: Dict[str, Any] = {
         "run": {
+            "run_id": run_id,
             "timestamp": datetime.now().isoformat(timespec="seconds"),
             "config_path": str(config_path),
+            "wall_s": round(time.perf_counter() - started_wall, 4),
+            "cpu_s": round(time.process_time() - started_cpu, 4),
+            "peak_rss_mb": peak_rss_mb(),
         },
         "paths": {
             "raw": str(raw_path),
             "processed_dir": str(processed_dir),
             "gold_dir": str(gold_dir),
             "metrics_dir": str(metrics_dir),
+            "output_format": output.format,
         },
         "ingestion": ingest_metrics,
         "transform": {
-            "analytics_rows": int(len(df_analytics)),
-            "analytics_columns": list(df_analytics.columns),
+            "analytics_rows": int(analytics_rows),
+            "analytics_columns": analytics_columns,
             "income_total": round(income_total, 2),
             "expense_total": round(expense_total, 2),
             "net_total": round(net_total, 2),
+            "gold": gold_metrics,
         },
+        "timings": timer.to_dict(),
     }
 
     metrics_path = write_run_metrics(metrics_dir, run_metrics)
@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import logging
+import shutil
+import uuid
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Iterable
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+FORMATS = ("csv", "parquet")
+
+
+@dataclass(frozen=True)
+class OutputSpec:
+    """How processed and gold datasets are written to disk."""
+
+    format: str = "csv"
+    compression: str | None = "snappy"
+    row_group_size: int | None = None
+    partition_by: tuple[str, ...] = ()
+
+    def unpartitioned(self) -> "OutputSpec":
+        return replace(self, partition_by=())
+
+
+def output_spec_from_config(config: dict) -> OutputSpec:
+    """Build an OutputSpec from the optional ``output`` block of the config."""
+    out = config.get("output") or {}
+    fmt = str(out.get("format", "csv")).lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt} (expected one of {FORMATS})")
+
+    partition_by = tuple(out.get("partition_by") or ())
+    if partition_by and fmt != "parquet":
+        raise ValueError("output.partition_by is only supported for parquet output")
+
+    return OutputSpec(
+        format=fmt,
+        compression=out.get("compression", "snappy"),
+        row_group_size=out.get("row_group_size"),
+        partition_by=partition_by,
+    )
+
+
+def dataset_path(base_dir: Path, name: str, spec: OutputSpec) -> Path:
+    """
+    Location of a dataset: ``name.csv``, or a ``name/`` directory of
+    ``part-*.parquet`` files (under hive partitions such as
+    ``year_month=2025-10/`` when partitioned).
+    """
+    if spec.format == "csv":
+        return base_dir / f"{name}.csv"
+    return base_dir / name
+
+
+def _with_partition_columns(df: pd.DataFrame, spec: OutputSpec) -> pd.DataFrame:
+    # Clean transactions carry a parsed date but no year_month column yet.
+    if "year_month" in spec.partition_by and "year_month" not in df.columns:
+        df = df.assign(year_month=_month_labels(df["transaction_date"]))
+    missing = [c for c in spec.partition_by if c not in df.columns]
+    if missing:
+        raise ValueError(f"Cannot partition by missing columns: {missing}")
+    return df
+
+
+def _normalize_schema(table: pa.Table) -> pa.Table:
+    # Chunks of the same dataset must share one schema: categorical index
+    # widths vary with cardinality, and all-null columns infer as null.
+    schema = table.schema
+    for i, field in enumerate(schema):
+        if pa.types.is_dictionary(field.type):
+            schema = schema.set(
+                i, field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+            )
+        elif pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return table.cast(schema)
+
+
+class DatasetWriter:
+    """
+    Write a dataset in one or more chunks.
+
+    Everything goes to a temporary path first. On ``close()`` it replaces the
+    final dataset, or with ``append=True`` is added to it (new part files for
+    parquet, extra rows for CSV), so readers never see a partially written
+    batch and a failed run leaves the previous output in place. Use as a
+    context manager.
+    """
+
+    def __init__(
+        self,
+        base_dir: Path,
+        name: str,
+        spec: OutputSpec,
+        append: bool = False,
+        part_prefix: str | None = None,
+    ):
+        self.spec = spec
+        self.append = append
+        self.path = dataset_path(base_dir, name, spec)
+        self.part_prefix = part_prefix or uuid.uuid4().hex[:12]
+        suffix = f".{self.part_prefix}.tmp" if append else ".tmp"
+        self.tmp_path = self.path.with_name(self.path.name + suffix)
+        self.rows = 0
+        self._chunks = 0
+        self._csv_file: Any = None
+        self._parquet_writer: pq.ParquetWriter | None = None
+
+        base_dir.mkdir(parents=True, exist_ok=True)
+        self._remove(self.tmp_path)
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.spec.format == "csv":
+            if self._csv_file is None:
+                self._csv_file = self.tmp_path.open("w", encoding="utf-8", newline="")
+            header = self._chunks == 0 and not (self.append and self.path.exists())
+            df.to_csv(self._csv_file, index=False, header=header)
+        elif self.spec.partition_by:
+            self.tmp_path.mkdir(exist_ok=True)
+            df = _with_partition_columns(df, self.spec)
+            table = _normalize_schema(pa.Table.from_pandas(df, preserve_index=False))
+            ds.write_dataset(
+                table,
+                self.tmp_path,
+                format="parquet",
+                partitioning=list(self.spec.partition_by),
+                partitioning_flavor="hive",
+                basename_template=f"part-{self.part_prefix}-{self._chunks:05d}-{{i}}.parquet",
+                file_options=ds.ParquetFileFormat().make_write_options(
+                    compression=self.spec.compression
+                ),
+                max_rows_per_group=self.spec.row_group_size or 1024 * 1024,
+                min_rows_per_group=0,
+                existing_data_behavior="overwrite_or_ignore",
+            )
+        else:
+            table = _normalize_schema(pa.Table.from_pandas(df, preserve_index=False))
+            if self._parquet_writer is None:
+                self.tmp_path.mkdir(exist_ok=True)
+                self._parquet_writer = pq.ParquetWriter(
+                    self.tmp_path / f"part-{self.part_prefix}-00000.parquet",
+                    table.schema,
+                    compression=self.spec.compression,
+                )
+            else:
+                table = table.cast(self._parquet_writer.schema)
+            self._parquet_writer.write_table(table, row_group_size=self.spec.row_group_size)
+
+        self._chunks += 1
+        self.rows += int(len(df))
+
+    def close(self) -> Path:
+        self._close_handles()
+        if self._chunks == 0:
+            raise ValueError(f"Nothing was written to {self.path}")
+
+        if not self.append or not self.path.exists():
+            self._remove(self.path)
+            self.tmp_path.replace(self.path)
+        elif self.spec.format == "csv":
+            with self.path.open("ab") as dst, self.tmp_path.open("rb") as src:
+                shutil.copyfileobj(src, dst)
+            self._remove(self.tmp_path)
+        else:
+            for part in sorted(self.tmp_path.rglob("*.parquet")):
+                target = self.path / part.relative_to(self.tmp_path)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                part.replace(target)
+            self._remove(self.tmp_path)
+        return self.path
+
+    def abort(self) -> None:
+        self._close_handles()
+        self._remove(self.tmp_path)
+
+    def _close_handles(self) -> None:
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        if path.is_dir():
+            shutil.rmtree(path)
+        elif path.exists():
+            path.unlink()
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_dataset(
+    df: pd.DataFrame,
+    base_dir: Path,
+    name: str,
+    spec: OutputSpec,
+    append: bool = False,
+    part_prefix: str | None = None,
+) -> Path:
+    """Write (or append) a whole DataFrame as a dataset and return its path."""
+    with DatasetWriter(base_dir, name, spec, append=append, part_prefix=part_prefix) as writer:
+        writer.write(df)
+    return writer.path
+
+
+def _month_labels(dates: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates.dt.strftime("%Y-%m")
+    # ISO text as written by ingestion
+    return dates.astype(str).str[:7]
+
+
+def _month_mask(df: pd.DataFrame, year_months: list[str]) -> pd.Series:
+    if "year_month" in df.columns:
+        return df["year_month"].astype(str).isin(year_months)
+    return _month_labels(df["transaction_date"]).isin(year_months)
+
+
+def _month_filter(schema: pa.Schema, year_months: list[str]) -> ds.Expression:
+    if "year_month" in schema.names:
+        return ds.field("year_month").isin(year_months)
+
+    # No partition column: select each month as a date range so parquet
+    # row-group statistics can still skip data.
+    expr = None
+    for label in year_months:
+        start = pd.Period(label, freq="M").start_time
+        end = (pd.Period(label, freq="M") + 1).start_time
+        field = ds.field("transaction_date")
+        month = (field >= pa.scalar(start, type=schema.field("transaction_date").type)) & (
+            field < pa.scalar(end, type=schema.field("transaction_date").type)
+        )
+        expr = month if expr is None else expr | month
+    return expr
+
+
+def read_dataset(
+    base_dir: Path,
+    name: str,
+    spec: OutputSpec,
+    year_months: Iterable[str] | None = None,
+    read_csv: Any = None,
+) -> pd.DataFrame:
+    """
+    Read a dataset written with ``spec``.
+
+    ``year_months`` (``"YYYY-MM"`` labels) restricts the read to those months:
+    hive partitions outside them are never opened, and plain parquet files
+    skip row groups by their date statistics. ``read_csv`` overrides how CSV
+    datasets are parsed (defaults to ``pd.read_csv``).
+    """
+    path = dataset_path(base_dir, name, spec)
+    if not path.exists():
+        raise FileNotFoundError(f"Missing dataset: {path}")
+
+    months = sorted(set(year_months)) if year_months is not None else None
+
+    if spec.format == "csv":
+        df = (read_csv or pd.read_csv)(path)
+        if months is not None:
+            df = df[_month_mask(df, months)].reset_index(drop=True)
+        return df
+
+    dataset = ds.dataset(
+        path, format="parquet", partitioning="hive" if spec.partition_by else None
+    )
+    if months == []:
+        return dataset.schema.empty_table().to_pandas()
+    month_filter = _month_filter(dataset.schema, months) if months else None
+
+    table = dataset.to_table(filter=month_filter)
+    logging.debug(f"Read {table.num_rows} rows from {path}")
+    return table.to_pandas()
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+
+# Hashed ids of fact_transactions: rebuilt by transformations/run_build.py,
+# probed by ingestion/validate_raw_data.py. Kept in the project root (where
+# the orchestration pipeline runs) whatever the current directory.
+ID_INDEX_PATH = Path(__file__).resolve().parents[2] / "warehouse_transaction_ids.npy"
+
+
+def hash_ids(values: Iterable) -> np.ndarray:
+    """
+    Hash transaction ids to uint64 keys.
+
+    Ids are hashed as text so ``T001`` read from CSV, parquet or DuckDB maps
+    to the same key. Nulls hash like the string ``"None"``/``"nan"`` and
+    should be masked out by the caller.
+    """
+    arr = np.asarray(pd.Series(values, dtype=object).astype(str), dtype=object)
+    return pd.util.hash_array(arr, categorize=False)
+
+
+class TransactionIdIndex:
+    """
+    Sorted uint64 hashes of every transaction id already loaded.
+
+    The array is stored as a ``.npy`` file and opened memory-mapped, so a
+    probe touches only the pages binary search visits (O(log n) per id)
+    instead of loading the warehouse history. Distinct ids can collide in
+    64 bits with negligible probability; a hit is a duplicate *warning*,
+    never a rejection, so that is acceptable. Without a ``path`` the index
+    lives in memory only (e.g. ids seen so far in a chunked batch).
+    """
+
+    def __init__(self, path: Path | None = None, hashes: np.ndarray | None = None):
+        self.path = path
+        self.hashes = hashes if hashes is not None else np.empty(0, dtype=np.uint64)
+
+    @classmethod
+    def load(cls, path: Path) -> "TransactionIdIndex":
+        if not path.exists():
+            return cls(path)
+        return cls(path, np.load(path, mmap_mode="r"))
+
+    def __len__(self) -> int:
+        return int(self.hashes.shape[0])
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Boolean array: which of ``hashes`` are already in the index."""
+        if len(self) == 0 or len(hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        pos = np.searchsorted(self.hashes, hashes)
+        pos[pos == len(self)] = len(self) - 1
+        return np.asarray(self.hashes[pos] == hashes)
+
+    def add(self, hashes: np.ndarray) -> int:
+        """Merge new hashes in (kept sorted and unique); returns how many were new."""
+        new = np.unique(hashes[~self.contains(hashes)])
+        if len(new):
+            self.hashes = np.union1d(self.hashes, new)
+        return int(len(new))
+
+    def save(self) -> None:
+        if self.path is None:
+            raise ValueError("In-memory id index has no path to save to")
+        # Write next to the target and swap in, so a concurrent reader always
+        # maps a complete file.
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp.npy")
+        np.save(tmp, np.ascontiguousarray(self.hashes, dtype=np.uint64))
+        os.replace(tmp, self.path)
+        logging.debug(f"Saved {len(self)} transaction id hashes to {self.path}")
+
+    @classmethod
+    def rebuild(
+        cls, path: Path, batches: Iterable[Iterable], save: bool = True
+    ) -> "TransactionIdIndex":
+        """
+        Build the index from batches of ids (e.g. Arrow record batches of a
+        warehouse table), holding only the hashes in memory.
+        """
+        parts = [np.unique(hash_ids(batch)) for batch in batches]
+        hashes = np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.uint64)
+        index = cls(path, hashes.astype(np.uint64))
+        if save:
+            index.save()
+        return index
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from src.metrics.timing import StageTimer
+from src.storage.datasets import DatasetWriter, OutputSpec, dataset_path
+from src.transforms.transform_transactions import write_gold_aggregates
+from src.validation.validate_schema import DATE_DTYPE, column_dtypes, transactions_schema_spec
+
+
+BACKENDS = ("pandas", "duckdb")
+
+# Amounts to cents as money.to_cents does (rint, i.e. half to even)
+CENTS_SQL = "CAST(round_even(CAST({} AS DOUBLE) * 100, 0) AS BIGINT)"
+
+# Same signs as prepare_analytics, which also rejects any other type
+AMOUNT_NORMALIZED_SQL = (
+    f"abs({CENTS_SQL.format('amount')}) * CASE transaction_type"
+    " WHEN 'INCOME' THEN 1 WHEN 'EXPENSE' THEN -1 WHEN 'REFUND' THEN -1"
+    " ELSE error('Unknown transaction_type value: ' || coalesce(transaction_type, 'NULL'))"
+    " END / 100"
+)
+
+# Columns the transform derives, with the dtypes prepare_analytics gives them
+ANALYTICS_DTYPES: Dict[str, Any] = {
+    "transaction_date": DATE_DTYPE,
+    "year": "int32",
+    "month": "int32",
+    "year_month": "category",
+    "amount_normalized": "float64",
+}
+
+
+@dataclass(frozen=True)
+class DuckDBSettings:
+    """
+    Resources for the DuckDB backend. ``memory_limit`` (e.g. ``"2GB"``)
+    caps DuckDB's buffer pool; larger intermediates spill to
+    ``temp_directory``. ``threads`` defaults to every core.
+    """
+
+    threads: int | None = None
+    memory_limit: str | None = None
+    temp_directory: str | None = None
+    batch_rows: int = 100_000
+
+
+def duckdb_settings_from_config(config: dict) -> DuckDBSettings:
+    """Build DuckDBSettings from the optional ``duckdb`` block of the config."""
+    block = config.get("duckdb") or {}
+    return DuckDBSettings(
+        threads=block.get("threads"),
+        memory_limit=block.get("memory_limit"),
+        temp_directory=block.get("temp_directory"),
+        batch_rows=int(block.get("batch_rows") or 100_000),
+    )
+
+
+@dataclass
+class TransformResult:
+    """What the DuckDB backend reports instead of an in-memory analytics frame."""
+
+    rows: int = 0
+    columns: List[str] = field(default_factory=list)
+
+
+def connect(settings: DuckDBSettings) -> duckdb.DuckDBPyConnection:
+    config: Dict[str, Any] = {"preserve_insertion_order": True}
+    if settings.threads:
+        config["threads"] = int(settings.threads)
+    if settings.memory_limit:
+        config["memory_limit"] = str(settings.memory_limit)
+    if settings.temp_directory:
+        Path(settings.temp_directory).mkdir(parents=True, exist_ok=True)
+        config["temp_directory"] = str(settings.temp_directory)
+    return duckdb.connect(config=config)
+
+
+def _quote(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _register_source(
+    con: duckdb.DuckDBPyConnection,
+    processed_dir: Path,
+    output: OutputSpec,
+    df: pd.DataFrame | pa.Table | None,
+) -> None:
+    """Expose the cleaned transactions as the ``clean_input`` view."""
+    if df is not None:
+        table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+        con.register("clean_input_table", table)
+        con.execute("CREATE VIEW clean_input AS SELECT * FROM clean_input_table")
+        return
+
+    path = dataset_path(processed_dir, "transactions_clean", output)
+    if not path.exists():
+        raise FileNotFoundError(f"Missing cleaned input file: {path}")
+
+    if output.format == "csv":
+        # Text columns stay text; amount is cast below like the pandas reader
+        scan = f"read_csv({_quote(path.as_posix())}, header = true, all_varchar = true)"
+    else:
+        scan = (
+            f"read_parquet({_quote((path / '**' / '*.parquet').as_posix())}, "
+            f"hive_partitioning = {str(bool(output.partition_by)).lower()}, "
+            "hive_types_autocast = false, union_by_name = true)"
+        )
+    con.execute(f"CREATE VIEW clean_input AS SELECT * FROM {scan}")
+
+
+def _month_filter_sql(columns: List[str], year_months: List[str] | None) -> str:
+    if year_months is None:
+        return ""
+    months = sorted({pd.Period(m, freq="M").strftime("%Y-%m") for m in year_months})
+    if not months:
+        return "WHERE false"
+    if "year_month" in columns:
+        # Hive partition column: whole partitions are pruned
+        return f"WHERE year_month IN ({', '.join(_quote(m) for m in months)})"
+    ranges = [
+        f"(transaction_date >= {_quote(pd.Period(m, freq='M').start_time.date())} "
+        f"AND transaction_date < {_quote((pd.Period(m, freq='M') + 1).start_time.date())})"
+        for m in months
+    ]
+    return "WHERE " + " OR ".join(ranges)
+
+
+def _analytics_sql(columns: List[str], year_months: List[str] | None) -> str:
+    """
+    The pandas transform as one projection: parsed date, date parts and
+    ``amount_normalized``. Columns that already exist are replaced in
+    place, new ones appended in the order ``prepare_analytics`` adds them.
+    """
+    derived = {
+        "transaction_date": "CAST(transaction_date AS TIMESTAMP)",
+        "amount": "CAST(amount AS DOUBLE)",
+    }
+    added = {
+        "year": "CAST(year(CAST(transaction_date AS TIMESTAMP)) AS INTEGER)",
+        "month": "CAST(month(CAST(transaction_date AS TIMESTAMP)) AS INTEGER)",
+        "year_month": "strftime(CAST(transaction_date AS TIMESTAMP), '%Y-%m')",
+        "amount_normalized": AMOUNT_NORMALIZED_SQL,
+    }
+
+    select = []
+    for c in columns:
+        expr = added.get(c) or derived.get(c)
+        select.append(f"{expr} AS {c}" if expr else c)
+    select += [f"{expr} AS {c}" for c, expr in added.items() if c not in columns]
+
+    return f"SELECT {', '.join(select)} FROM clean_input {_month_filter_sql(columns, year_months)}"
+
+
+def _source_dtypes(
+    processed_dir: Path, output: OutputSpec, df: pd.DataFrame | pa.Table | None
+) -> Dict[str, Any]:
+    """The dtypes the pandas backend would have read the input columns with."""
+    if isinstance(df, pd.DataFrame):
+        return dict(df.dtypes)
+    if isinstance(df, pa.Table):
+        return dict(df.schema.empty_table().to_pandas().dtypes)
+    if output.format == "csv":
+        return column_dtypes(transactions_schema_spec())
+    path = dataset_path(processed_dir, "transactions_clean", output)
+    partitioning = "hive" if output.partition_by else None
+    return dict(ds.dataset(path, partitioning=partitioning).schema.empty_table().to_pandas().dtypes)
+
+
+def _as_analytics_frame(batch: pa.RecordBatch, source_dtypes: Dict[str, Any]) -> pd.DataFrame:
+    """Give a batch the dtypes of the pandas backend's analytics frame."""
+    df = batch.to_pandas()
+    for c in df.columns:
+        dtype = ANALYTICS_DTYPES.get(c, source_dtypes.get(c))
+        if isinstance(dtype, pd.CategoricalDtype):
+            # Categories differ per batch; the writer unifies them
+            dtype = "category"
+        if dtype is not None:
+            df[c] = df[c].astype(dtype)
+    return df
+
+
+def transform_transactions_duckdb(
+    processed_dir: Path | None = None,
+    gold_dir: Path | None = None,
+    df: pd.DataFrame | pa.Table | None = None,
+    output: OutputSpec | None = None,
+    year_months: list[str] | None = None,
+    incremental: bool = False,
+    fiscal_year_start_month: int = 8,
+    settings: DuckDBSettings | None = None,
+    timer: StageTimer | None = None,
+) -> TransformResult:
+    """
+    Run ``transform_transactions`` as DuckDB SQL over the processed files.
+
+    The analytics rows are streamed to the gold dataset in Arrow batches
+    and the (department, month, type) totals are aggregated in SQL, so
+    nothing proportional to the input is held in Python; DuckDB runs both
+    scans multi-threaded and spills to ``settings.temp_directory`` under
+    its memory limit. The small cell totals then go through the same
+    ``write_gold_aggregates`` as the pandas backend, so outputs match.
+
+    Arguments are those of ``transform_transactions``; ``df`` (an in-memory
+    batch, e.g. for ``incremental``) is queried in place of the files.
+    """
+    processed_dir = processed_dir or Path("data/processed")
+    gold_dir = gold_dir or Path("data/gold")
+    output = output or OutputSpec()
+    settings = settings or DuckDBSettings()
+    timer = timer or StageTimer()
+    if incremental and df is None:
+        raise ValueError("An incremental transform needs the new rows passed as df")
+
+    con = connect(settings)
+    try:
+        _register_source(con, processed_dir, output, df)
+        columns = [row[0] for row in con.execute("DESCRIBE clean_input").fetchall()]
+        con.execute(f"CREATE VIEW analytics AS {_analytics_sql(columns, year_months)}")
+
+        gold_dir.mkdir(parents=True, exist_ok=True)
+        result = TransformResult()
+
+        # --- Output: analytics dataset ---
+        source_dtypes = _source_dtypes(processed_dir, output, df)
+        try:
+            reader = con.execute("SELECT * FROM analytics").to_arrow_reader(settings.batch_rows)
+            with DatasetWriter(
+                gold_dir, "transactions_analytics", output, append=incremental
+            ) as writer:
+                result.columns = list(reader.schema.names)
+                # Fetching a batch runs the SQL; writing it is the analytics write
+                for batch in timer.iterate("transform", reader, rows=lambda b: b.num_rows):
+                    if batch.num_rows:
+                        with timer.stage("write.transactions_analytics", batch.num_rows):
+                            writer.write(_as_analytics_frame(batch, source_dtypes))
+                        result.rows += batch.num_rows
+                if result.rows == 0:
+                    empty = pa.RecordBatch.from_pylist([], schema=reader.schema)
+                    writer.write(_as_analytics_frame(empty, source_dtypes))
+        except (duckdb.ConversionException, duckdb.InvalidInputException) as e:
+            raise ValueError(f"Invalid processed transactions: {e}") from e
+        logging.info(f"Wrote analytics dataset to: {writer.path}")
+
+        # --- Aggregate: (department, month, type) cells ---
+        with timer.stage("aggregate", result.rows):
+            cells = con.execute(
+                f"""
+                SELECT
+                    CAST(department_id AS VARCHAR) AS department_id,
+                    year_month,
+                    CAST(transaction_type AS VARCHAR) AS transaction_type,
+                    CAST(sum({CENTS_SQL.format("amount_normalized")}) AS BIGINT) AS amount_cents,
+                    count(*) AS transactions
+                FROM analytics
+                WHERE department_id IS NOT NULL
+                  AND year_month IS NOT NULL
+                  AND transaction_type IS NOT NULL
+                GROUP BY ALL
+                ORDER BY department_id, year_month, transaction_type
+                """
+            ).df()
+    finally:
+        con.close()
+
+    write_gold_aggregates(
+        cells,
+        gold_dir,
+        output,
+        incremental=incremental,
+        fiscal_year_start_month=fiscal_year_start_month,
+        timer=timer,
+    )
+
+    logging.info(
+        f"Transform rows: {result.rows} | "
+        f"Departments: {cells['department_id'].nunique()} | "
+        f"Months: {cells['year_month'].nunique()}"
+    )
+    return result
@@ -1,91 +1,407 @@
 import logging
 from pathlib import Path
+from typing import Any
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 
+from src.metrics.timing import StageTimer
+from src.storage.datasets import OutputSpec, dataset_path, read_dataset, write_dataset
+from src.validation.money import CENTS_DTYPE, from_cents, to_cents
+from src.validation.validate_schema import parse_transaction_dates, read_transactions_csv
 
-def transform_transactions(
-    processed_dir: Path | None = None,
-    gold_dir: Path | None = None,
-) -> pd.DataFrame:
-    """
-    Transform cleaned transactions into analytics and gold aggregates.
-
-    Args:
-        processed_dir: Directory containing cleaned input data.
-        gold_dir: Directory for gold outputs.
 
-    Returns:
-        Transformed analytics DataFrame.
-    """
-    processed_dir = processed_dir or Path("data/processed")
-    gold_dir = gold_dir or Path("data/gold")
+# Summary columns for types with no rows are added in this order.
+SUMMARY_TYPES = ["INCOME", "EXPENSE", "REFUND"]
+TOTAL_COLUMNS = {
+    "INCOME": "total_income",
+    "EXPENSE": "total_expense",
+    "REFUND": "total_refund",
+}
+MONEY_COLUMNS = ["total_income", "total_expense", "total_refund", "net"]
+SUMMARY_KEYS = ["department_id", "year_month"]
+AMOUNT_SIGNS = {"INCOME": 1, "EXPENSE": -1, "REFUND": -1}
 
-    processed_path = processed_dir / "transactions_clean.csv"
+CUBE_GRAINS = ["month", "quarter", "fiscal_year", "all"]
+CUBE_COLUMNS = [
+    "grain",
+    "period",
+    "department_id",
+    "transaction_type",
+    "total_amount",
+    "transaction_count",
+]
+GROUPING_SETS = [["department_id", "transaction_type"], ["department_id"], ["transaction_type"], []]
+ALL = "ALL"
 
-    if not processed_path.exists():
-        raise FileNotFoundError(f"Missing cleaned input file: {processed_path}")
 
-    gold_dir.mkdir(parents=True, exist_ok=True)
+def month_labels(keys: np.ndarray) -> np.ndarray:
+    """Format integer month keys (``year * 12 + month - 1``) as ``YYYY-MM``."""
+    return np.array([f"{k // 12:04d}-{k % 12 + 1:02d}" for k in keys.tolist()], dtype=object)
 
-    # --- Load ---
-    df = pd.read_csv(processed_path)
 
-    # --- Transform 1: parse dates ---
-    df["transaction_date"] = pd.to_datetime(df["transaction_date"], errors="raise")
+def add_month_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add ``year``, ``month`` and a categorical ``year_month``.
 
-    # --- Transform 2: add date parts ---
+    Months are keyed as integers and only the distinct keys are formatted,
+    instead of building a ``YYYY-MM`` string per row.
+    """
     df["year"] = df["transaction_date"].dt.year
     df["month"] = df["transaction_date"].dt.month
-    df["year_month"] = df["transaction_date"].dt.to_period("M").astype(str)
+    month_key = df["year"].to_numpy(dtype=np.int64) * 12 + df["month"].to_numpy(dtype=np.int64) - 1
+    codes, keys = pd.factorize(month_key, sort=True)
+    df["year_month"] = pd.Categorical.from_codes(codes, categories=month_labels(keys))
+    return df
 
-    # --- Transform 3: normalize amounts ---
-    sign_map = {"INCOME": 1, "EXPENSE": -1, "REFUND": -1}
-    df["amount_normalized"] = df["amount"].abs() * df["transaction_type"].map(sign_map)
-    df["amount_normalized"] = df["amount_normalized"].round(2)
 
-    # --- Output: analytics dataset ---
-    analytics_path = gold_dir / "transactions_analytics.csv"
-    df.to_csv(analytics_path, index=False)
-    logging.info(f"Wrote analytics dataset to: {analytics_path}")
+def _cell_totals(df: pd.DataFrame) -> tuple[pd.DataFrame, Any, Any, Any]:
+    """
+    Sum ``amount_normalized`` in cents and count rows per (department,
+    month, type) cell.
 
-    # --- Aggregate: department x month ---
-    summary = (
-        df.pivot_table(
-            index=["department_id", "year_month"],
-            columns="transaction_type",
-            values="amount_normalized",
-            aggfunc="sum",
-            fill_value=0.0,
-        )
-        .reset_index()
+    Each cell gets one integer key from the factorized codes and a single
+    grouped aggregation runs over those keys. Returns the per-cell frame
+    (``dept``, ``month`` and ``type`` codes, ``cents``, ``transactions``)
+    sorted by department, month, type, plus the label arrays for the codes.
+    """
+    dept_codes, depts = pd.factorize(df["department_id"], sort=True)
+    month_codes, months = pd.factorize(df["year_month"], sort=True)
+    type_codes, types = pd.factorize(df["transaction_type"], sort=True)
+
+    keep = (dept_codes >= 0) & (month_codes >= 0) & (type_codes >= 0)
+    n_months, n_types = max(len(months), 1), max(len(types), 1)
+    keys = (dept_codes.astype(np.int64) * n_months + month_codes) * n_types + type_codes
+
+    cents = to_cents(df["amount_normalized"])
+    grouped = pd.Series(cents[keep]).groupby(keys[keep], sort=True).agg(["sum", "size"])
+
+    group_keys = grouped.index.to_numpy()
+    cells = pd.DataFrame(
+        {
+            "dept": group_keys // n_types // n_months,
+            "month": group_keys // n_types % n_months,
+            "type": group_keys % n_types,
+            "cents": grouped["sum"].to_numpy(dtype=CENTS_DTYPE),
+            "transactions": grouped["size"].to_numpy(dtype=np.int64),
+        }
     )
+    return cells, depts, np.asarray(months.astype(str), dtype=object), types
 
-    for col in ["INCOME", "EXPENSE", "REFUND"]:
-        if col not in summary.columns:
-            summary[col] = 0.0
 
-    summary = summary.rename(
-        columns={
-            "INCOME": "total_income",
-            "EXPENSE": "total_expense",
-            "REFUND": "total_refund",
+def department_month_type_totals(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The finest aggregate, one row per (department, month, type) cell with
+    the exact ``amount_cents`` and the number of ``transactions``. Coarser
+    grains are rolled up from this table without rescanning rows.
+    """
+    cells, depts, months, types = _cell_totals(df)
+    return pd.DataFrame(
+        {
+            "department_id": np.asarray(depts.astype(str), dtype=object)[cells["dept"]],
+            "year_month": months[cells["month"]],
+            "transaction_type": np.asarray(types.astype(str), dtype=object)[cells["type"]],
+            "amount_cents": cells["cents"],
+            "transactions": cells["transactions"],
         }
     )
 
+
+def merge_cell_totals(existing: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """Add a batch's cell totals to the stored ones (both are additive)."""
+    keys = ["department_id", "year_month", "transaction_type"]
+    if "amount_cents" not in existing.columns:
+        # Written before totals were kept in cents
+        existing = existing.assign(amount_cents=to_cents(existing["amount"]))
+    merged = pd.concat(
+        [existing.astype({k: str for k in keys}), delta.astype({k: str for k in keys})]
+    )
+    return merged.groupby(keys, sort=True, as_index=False)[["amount_cents", "transactions"]].sum()
+
+
+def _period_labels(year_months: np.ndarray, grain: str, fiscal_year_start_month: int) -> list[str]:
+    labels = []
+    for label in year_months:
+        year, month = int(label[:4]), int(label[5:7])
+        if grain == "month":
+            labels.append(label)
+        elif grain == "quarter":
+            labels.append(f"{year}-Q{(month - 1) // 3 + 1}")
+        elif grain == "fiscal_year":
+            # Named by the calendar year the fiscal year ends in
+            ends_next_year = fiscal_year_start_month > 1 and month >= fiscal_year_start_month
+            labels.append(f"FY{year + 1 if ends_next_year else year}")
+        else:
+            labels.append(ALL)
+    return labels
+
+
+def build_rollup_cube(totals: pd.DataFrame, fiscal_year_start_month: int = 8) -> pd.DataFrame:
+    """
+    Roll the (department, month, type) totals up to every grain in
+    ``CUBE_GRAINS`` and every grouping set of department and type.
+
+    Periods are labelled ``2025-10``, ``2025-Q4``, ``FY2026`` (fiscal years
+    named by the year they end in) and ``ALL``; a dimension that is rolled
+    up holds ``ALL``. Only the distinct months are relabelled, so the cost
+    depends on the number of cells, not transactions.
+    """
+    if not 1 <= fiscal_year_start_month <= 12:
+        raise ValueError(f"fiscal_year_start_month must be 1-12, got {fiscal_year_start_month}")
+
+    base = totals.astype(
+        {"department_id": str, "year_month": str, "transaction_type": str}
+    )
+    months = base["year_month"].unique()
+    measures = ["amount_cents", "transactions"]
+
+    frames = []
+    for grain in CUBE_GRAINS:
+        periods = dict(zip(months, _period_labels(months, grain, fiscal_year_start_month)))
+        finest = base.assign(period=base["year_month"].map(periods)).groupby(
+            ["period", "department_id", "transaction_type"], sort=True, as_index=False
+        )[measures].sum()
+        for dims in GROUPING_SETS:
+            rolled = finest.groupby(["period", *dims], sort=True, as_index=False)[measures].sum()
+            for dim in ("department_id", "transaction_type"):
+                if dim not in dims:
+                    rolled[dim] = ALL
+            rolled["grain"] = grain
+            frames.append(rolled)
+
+    cube = pd.concat(frames, ignore_index=True).rename(
+        columns={"transactions": "transaction_count"}
+    )
+    cube["total_amount"] = from_cents(cube["amount_cents"])
+    return cube[CUBE_COLUMNS]
+
+
+def prepare_analytics(df: pd.DataFrame) -> pd.DataFrame:
+    """Parse dates, add month columns and ``amount_normalized`` (in place)."""
+    # --- Transform 1: parse dates (no-op for frames from ingestion) ---
+    parsed_dates = parse_transaction_dates(df["transaction_date"])
+    if parsed_dates.isna().any():
+        bad_values = df.loc[parsed_dates.isna(), "transaction_date"].unique().tolist()
+        raise ValueError(f"Unparseable transaction_date values: {bad_values}")
+    df["transaction_date"] = parsed_dates
+
+    # --- Transform 2: add date parts ---
+    df = add_month_columns(df)
+
+    # --- Transform 3: normalize amounts (in cents, output as decimals) ---
+    sign = df["transaction_type"].map(AMOUNT_SIGNS)
+    if sign.isna().any():
+        bad_values = df.loc[sign.isna(), "transaction_type"].unique().tolist()
+        raise ValueError(f"Unknown transaction_type values: {bad_values}")
+    cents = np.abs(to_cents(df["amount"])) * sign.to_numpy(dtype=CENTS_DTYPE)
+    df["amount_normalized"] = from_cents(cents)
+    return df
+
+
+def department_month_totals(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-type totals in cents by department and month, without ``net``."""
+    return pivot_cell_totals(department_month_type_totals(df)).rename(columns=TOTAL_COLUMNS)
+
+
+def finalize_summary(summary: pd.DataFrame) -> pd.DataFrame:
+    """Add ``net`` to per-type totals in cents and convert them to amounts."""
     summary["net"] = (
         summary["total_income"]
         + summary["total_expense"]
         + summary["total_refund"]
     )
+    for col in MONEY_COLUMNS:
+        summary[col] = from_cents(summary[col])
+    return summary
+
+
+def merge_summary(existing: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the totals of a new batch (in cents) to an existing summary.
+
+    Only the cells present in ``delta`` are recomputed; every other row is
+    carried over unchanged. Rows stay sorted by department then month and
+    the existing column order is kept.
+    """
+    totals = list(TOTAL_COLUMNS.values())
+    columns = list(existing.columns)
+    existing = existing.astype({k: str for k in SUMMARY_KEYS}).set_index(SUMMARY_KEYS)
+    delta = delta.astype({k: str for k in SUMMARY_KEYS}).set_index(SUMMARY_KEYS)[totals]
+
+    touched = delta.index.intersection(existing.index)
+    stored = existing.loc[touched, totals].apply(to_cents)
+    cells = pd.concat([stored + delta.loc[touched], delta.drop(touched)])
+    cells = finalize_summary(cells)
+
+    merged = pd.concat([existing.drop(touched), cells]).sort_index()
+    return merged.reset_index()[columns]
+
+
+def summary_drift(maintained: pd.DataFrame, rebuilt: pd.DataFrame) -> int:
+    """
+    Count department-month cells where an incrementally maintained summary
+    disagrees with a full rebuild (missing on either side, or any money
+    column off by a cent or more).
+    """
+    keyed = [
+        df.astype({k: str for k in SUMMARY_KEYS}).set_index(SUMMARY_KEYS)[MONEY_COLUMNS]
+        for df in (maintained, rebuilt)
+    ]
+    left, right = keyed[0].align(keyed[1], join="outer")
+    differs = (left - right).abs().ge(0.005) | left.isna() | right.isna()
+    return int(differs.any(axis=1).sum())
+
 
-    money_cols = ["total_income", "total_expense", "total_refund", "net"]
-    summary[money_cols] = summary[money_cols].round(2)
+def pivot_cell_totals(totals: pd.DataFrame) -> pd.DataFrame:
+    """
+    Spread (department, month, type) cell totals into one column of cents
+    per type: rows by department then month, type columns sorted, then any
+    missing ``SUMMARY_TYPES`` (the layout ``pivot_table`` produced).
+    """
+    wide = totals.astype(
+        {"department_id": str, "year_month": str, "transaction_type": str}
+    ).pivot(index=SUMMARY_KEYS, columns="transaction_type", values="amount_cents")
+    wide = wide.sort_index().sort_index(axis=1).fillna(0).astype(CENTS_DTYPE)
+    summary = wide.reset_index()
+    summary.columns.name = None
+    for col in SUMMARY_TYPES:
+        if col not in summary.columns:
+            summary[col] = CENTS_DTYPE(0)
+    return summary
+
+
+def write_gold_aggregates(
+    cell_totals: pd.DataFrame,
+    gold_dir: Path,
+    output: OutputSpec,
+    incremental: bool = False,
+    fiscal_year_start_month: int = 8,
+    timer: StageTimer | None = None,
+) -> None:
+    """
+    Write the summary, cell totals and rollup cube from the (department,
+    month, type) totals of the transformed rows. With ``incremental`` the
+    totals are a new batch and are merged into the existing datasets.
+    Shared by the pandas and DuckDB backends.
+    """
+    timer = timer or StageTimer()
 
-    summary_path = gold_dir / "department_monthly_summary.csv"
-    summary.to_csv(summary_path, index=False)
+    # --- Aggregate: department x month ---
+    # Rows are counted where the transformed rows are aggregated into cells
+    with timer.stage("aggregate"):
+        totals = pivot_cell_totals(cell_totals).rename(columns=TOTAL_COLUMNS)
+        if incremental and dataset_path(gold_dir, "department_monthly_summary", output).exists():
+            existing = read_dataset(gold_dir, "department_monthly_summary", output)
+            summary = merge_summary(existing, totals)
+            logging.info(f"Merged {len(totals)} touched department-month cells into the summary")
+        else:
+            summary = finalize_summary(totals)
+
+    with timer.stage("write.department_monthly_summary", len(summary)):
+        summary_path = write_dataset(summary, gold_dir, "department_monthly_summary", output)
     logging.info(f"Wrote department summary to: {summary_path}")
 
+    # --- Aggregate: rollup cube from the finest (department, month, type) cells ---
+    with timer.stage("aggregate"):
+        if incremental and dataset_path(gold_dir, "department_month_type_totals", output).exists():
+            existing = read_dataset(gold_dir, "department_month_type_totals", output)
+            cell_totals = merge_cell_totals(existing, cell_totals)
+    with timer.stage("write.department_month_type_totals", len(cell_totals)):
+        write_dataset(cell_totals, gold_dir, "department_month_type_totals", output)
+
+    with timer.stage("aggregate"):
+        cube = build_rollup_cube(cell_totals, fiscal_year_start_month)
+    with timer.stage("write.rollup_cube", len(cube)):
+        cube_path = write_dataset(cube, gold_dir, "rollup_cube", output.unpartitioned())
+    logging.info(f"Wrote rollup cube ({len(cube)} rows) to: {cube_path}")
+
+
+def transform_transactions(
+    processed_dir: Path | None = None,
+    gold_dir: Path | None = None,
+    df: pd.DataFrame | pa.Table | None = None,
+    output: OutputSpec | None = None,
+    year_months: list[str] | None = None,
+    incremental: bool = False,
+    fiscal_year_start_month: int = 8,
+    timer: StageTimer | None = None,
+) -> pd.DataFrame:
+    """
+    Transform cleaned transactions into analytics and gold aggregates.
+
+    Args:
+        processed_dir: Directory containing cleaned input data.
+        gold_dir: Directory for gold outputs.
+        df: Cleaned transactions already in memory (DataFrame or Arrow
+            table). When given, the cleaned file is not read.
+        output: On-disk format of the processed input and gold outputs
+            (CSV by default).
+        year_months: Only read these ``YYYY-MM`` months of the cleaned
+            input; partitioned parquet input skips the other partitions.
+        incremental: ``df`` holds only newly ingested rows. They are
+            appended to the analytics dataset and their aggregate is merged
+            into the existing summary, touching only their
+            (department_id, year_month) cells.
+        fiscal_year_start_month: First month of the fiscal year used by
+            the rollup cube (8 = August to July).
+        timer: Records the read, transform, aggregate and write stages.
+
+    Returns:
+        Transformed analytics DataFrame.
+    """
+    processed_dir = processed_dir or Path("data/processed")
+    gold_dir = gold_dir or Path("data/gold")
+    output = output or OutputSpec()
+    timer = timer or StageTimer()
+    if incremental and df is None:
+        raise ValueError("An incremental transform needs the new rows passed as df")
+
+    # --- Load ---
+    if df is None:
+        processed_path = dataset_path(processed_dir, "transactions_clean", output)
+
+        if not processed_path.exists():
+            raise FileNotFoundError(f"Missing cleaned input file: {processed_path}")
+
+        with timer.stage("transform.read") as stage:
+            df = read_dataset(
+                processed_dir,
+                "transactions_clean",
+                output,
+                year_months=year_months,
+                read_csv=read_transactions_csv,
+            )
+            stage["rows"] = len(df)
+    elif isinstance(df, pa.Table):
+        df = df.to_pandas()
+    else:
+        # New columns are added below; leave the caller's frame untouched.
+        df = df.copy(deep=False)
+
+    gold_dir.mkdir(parents=True, exist_ok=True)
+
+    with timer.stage("transform", len(df)):
+        df = prepare_analytics(df)
+
+    # --- Output: analytics dataset ---
+    with timer.stage("write.transactions_analytics", len(df)):
+        analytics_path = write_dataset(
+            df, gold_dir, "transactions_analytics", output, append=incremental
+        )
+    logging.info(f"Wrote analytics dataset to: {analytics_path}")
+
+    with timer.stage("aggregate", len(df)):
+        cell_totals = department_month_type_totals(df)
+    write_gold_aggregates(
+        cell_totals,
+        gold_dir,
+        output,
+        incremental=incremental,
+        fiscal_year_start_month=fiscal_year_start_month,
+        timer=timer,
+    )
+
     logging.info(
         f"Transform rows: {len(df)} | "
         f"Departments: {df['department_id'].nunique()} | "
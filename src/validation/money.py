@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+
+# Money is carried as int64 cents between parsing and the output files, so
+# sums are exact integer additions and no rounding pass is needed after
+# them. Decimal amounts exist only where data is read or written.
+CENTS_DTYPE = np.int64
+CENTS_PER_UNIT = 100
+
+
+def _as_float(values: Any) -> np.ndarray:
+    if isinstance(values, (pd.Series, pd.Index)):
+        return values.to_numpy(dtype="float64", na_value=np.nan)
+    return np.asarray(values, dtype="float64")
+
+
+def to_cents(values: Any) -> np.ndarray:
+    """
+    Decimal amounts as int64 cents.
+
+    Sub-cent amounts round half to even, as ``round(2)`` does (numpy rounds
+    ``x`` to 2 places as ``rint(x * 100) / 100``). Raises ``ValueError`` on
+    missing or non-finite amounts.
+    """
+    scaled = np.rint(_as_float(values) * CENTS_PER_UNIT)
+    if not np.isfinite(scaled).all():
+        raise ValueError("Cannot convert missing or non-finite amounts to cents")
+    return scaled.astype(CENTS_DTYPE)
+
+
+def to_nullable_cents(values: pd.Series) -> pd.Series:
+    """Like ``to_cents`` but missing amounts become ``<NA>`` (``Int64``)."""
+    scaled = np.rint(_as_float(values) * CENTS_PER_UNIT)
+    missing = ~np.isfinite(scaled)
+    cents = np.where(missing, 0, scaled).astype(CENTS_DTYPE)
+    return pd.Series(pd.arrays.IntegerArray(cents, missing), index=values.index)
+
+
+def from_cents(cents: Any) -> np.ndarray:
+    """
+    Cents as float64 amounts for output: the double nearest each decimal
+    value, i.e. exactly what ``round(2)`` of the float sum would give.
+    """
+    return np.asarray(cents, dtype=CENTS_DTYPE) / CENTS_PER_UNIT
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from src.storage.id_index import TransactionIdIndex, hash_ids
+from src.validation.money import to_nullable_cents
+from src.validation.validate_schema import parse_transaction_dates
+
+
+CRITICAL = "CRITICAL"
+WARNING = "WARNING"
+
+REQUIRED_COLUMNS = (
+    "transaction_id",
+    "transaction_date",
+    "department_id",
+    "transaction_type",
+    "amount",
+)
+
+ALLOWED_TRANSACTION_TYPES = {"EXPENSE", "INCOME", "REFUND"}
+
+
+class RuleContext:
+    """
+    The frame under validation plus derived columns shared between rules.
+
+    Derived columns (blank masks, parsed dates, numeric amounts) are computed
+    the first time a rule asks for them and reused by every later rule; the
+    time spent is recorded under ``timings``. ``id_index`` holds the ids
+    already loaded by earlier runs, for cross-run duplicate checks;
+    ``seen_ids`` the ids of earlier chunks of the same batch.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        id_index: TransactionIdIndex | None = None,
+        seen_ids: TransactionIdIndex | None = None,
+    ):
+        self.df = df
+        self.id_index = id_index
+        self.seen_ids = seen_ids
+        self.timings: dict[str, float] = {}
+        self._cache: dict[str, pd.Series] = {}
+
+    def _cached(self, key: str, compute: Callable[[], pd.Series]) -> pd.Series:
+        if key not in self._cache:
+            start = time.perf_counter()
+            self._cache[key] = compute()
+            self.timings[key] = time.perf_counter() - start
+        return self._cache[key]
+
+    def blank(self, col: str) -> pd.Series:
+        """Null or whitespace-only values."""
+        return self._cached(f"blank:{col}", lambda: _blank_mask(self.df[col]))
+
+    @property
+    def dates(self) -> pd.Series:
+        return self._cached(
+            "parse:transaction_date",
+            lambda: parse_transaction_dates(self.df["transaction_date"]),
+        )
+
+    @property
+    def amount(self) -> pd.Series:
+        """Amounts as float64; missing and unparseable values are NaN."""
+        return self._cached(
+            "parse:amount",
+            lambda: pd.to_numeric(self.df["amount"], errors="coerce").astype("float64"),
+        )
+
+    @property
+    def cents(self) -> pd.Series:
+        """Amounts as ``Int64`` cents; missing and unparseable values are NA."""
+        return self._cached("parse:amount_cents", lambda: to_nullable_cents(self.amount))
+
+    @property
+    def id_hashes(self) -> np.ndarray:
+        return self._cached("hash:transaction_id", lambda: hash_ids(self.df["transaction_id"]))
+
+    def _probe(self, index: TransactionIdIndex | None) -> pd.Series:
+        if index is None or len(index) == 0:
+            return pd.Series(False, index=self.df.index)
+        hits = index.contains(self.id_hashes)
+        return pd.Series(hits, index=self.df.index) & ~self.blank("transaction_id")
+
+    @property
+    def already_loaded(self) -> pd.Series:
+        """Ids found in ``id_index`` (all False without an index)."""
+        return self._cached("probe:id_index", lambda: self._probe(self.id_index))
+
+    @property
+    def seen_earlier(self) -> pd.Series:
+        """Ids found in ``seen_ids`` (all False without one)."""
+        return self._cached("probe:seen_ids", lambda: self._probe(self.seen_ids))
+
+
+def _blank_mask(s: pd.Series) -> pd.Series:
+    mask = s.isna()
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        blank_categories = [c for c in s.cat.categories if not str(c).strip()]
+        if blank_categories:
+            mask |= s.isin(blank_categories)
+    elif pd.api.types.is_string_dtype(s.dtype):
+        if pd.api.types.is_object_dtype(s.dtype):
+            s = s.astype(str)
+        mask |= s.str.strip().eq("").fillna(False).astype(bool)
+    return mask
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    One row-level data quality rule.
+
+    ``predicate`` returns a boolean Series that is True for violating rows.
+    ``rule_id`` refers to the numbering in architecture/data_quality_rules.md.
+    """
+
+    rule_id: str
+    reason: str
+    severity: str
+    columns: tuple[str, ...]
+    predicate: Callable[[RuleContext], pd.Series]
+
+
+def _missing(col: str) -> Rule:
+    return Rule("R2", f"missing_{col}", CRITICAL, (col,), lambda ctx: ctx.blank(col))
+
+
+TRANSACTION_RULES: tuple[Rule, ...] = tuple(_missing(c) for c in REQUIRED_COLUMNS) + (
+    Rule(
+        "R3",
+        "invalid_transaction_date",
+        CRITICAL,
+        ("transaction_date",),
+        lambda ctx: ctx.dates.isna(),
+    ),
+    Rule(
+        "R4",
+        "non_numeric_amount",
+        CRITICAL,
+        ("amount",),
+        lambda ctx: ~ctx.blank("amount") & ctx.amount.isna(),
+    ),
+    Rule(
+        "R5",
+        "invalid_transaction_type",
+        CRITICAL,
+        ("transaction_type",),
+        lambda ctx: ~ctx.df["transaction_type"].isin(ALLOWED_TRANSACTION_TYPES),
+    ),
+    Rule(
+        "R6",
+        "expense_amount_must_be_positive",
+        CRITICAL,
+        ("transaction_type", "amount"),
+        lambda ctx: (ctx.df["transaction_type"] == "EXPENSE") & (ctx.amount <= 0),
+    ),
+    Rule(
+        "R6",
+        "income_amount_must_be_positive",
+        CRITICAL,
+        ("transaction_type", "amount"),
+        lambda ctx: (ctx.df["transaction_type"] == "INCOME") & (ctx.amount <= 0),
+    ),
+    Rule(
+        "R6",
+        "refund_amount_must_be_negative",
+        CRITICAL,
+        ("transaction_type", "amount"),
+        lambda ctx: (ctx.df["transaction_type"] == "REFUND") & (ctx.amount >= 0),
+    ),
+    Rule(
+        "R7",
+        "duplicate_transaction_id",
+        WARNING,
+        ("transaction_id",),
+        lambda ctx: ctx.df["transaction_id"].notna()
+        & (ctx.df["transaction_id"].duplicated(keep="first") | ctx.seen_earlier),
+    ),
+    Rule(
+        "R7",
+        "transaction_id_already_loaded",
+        WARNING,
+        ("transaction_id",),
+        lambda ctx: ctx.already_loaded,
+    ),
+)
+
+
+@dataclass
+class RuleResult:
+    """
+    Outcome of evaluating a rule set: one int64 code per row with a bit set
+    for every rule the row breaks, plus per-rule counts and timings.
+    """
+
+    rules: tuple[Rule, ...]
+    codes: np.ndarray
+    counts: dict[str, int]
+    timings: dict[str, float]
+    context: RuleContext | None = field(repr=False)
+
+    @classmethod
+    def combine(cls, results: list["RuleResult"]) -> "RuleResult":
+        """Concatenate the results of consecutive chunks (without a context)."""
+        rules = results[0].rules
+        return cls(
+            rules,
+            np.concatenate([r.codes for r in results]),
+            {reason: sum(r.counts[reason] for r in results) for reason in results[0].counts},
+            {reason: sum(r.timings[reason] for r in results) for reason in results[0].timings},
+            None,
+        )
+
+    def bit(self, reason: str) -> int:
+        return 1 << [r.reason for r in self.rules].index(reason)
+
+    def mask_for(self, reasons: Iterable[str] | None = None, severity: str | None = None) -> int:
+        bits = 0
+        for i, rule in enumerate(self.rules):
+            if reasons is not None and rule.reason not in reasons:
+                continue
+            if severity is not None and rule.severity != severity:
+                continue
+            bits |= 1 << i
+        return bits
+
+    def violations(self, mask: int) -> np.ndarray:
+        """Boolean array of rows breaking any rule in ``mask``."""
+        return (self.codes & mask) != 0
+
+    def count(self, mask: int, rows: np.ndarray | None = None) -> dict[str, int]:
+        """Rows per reason within ``mask`` (optionally restricted to ``rows``)."""
+        codes = self.codes if rows is None else self.codes[rows]
+        out = {}
+        for i, rule in enumerate(self.rules):
+            if mask & (1 << i):
+                n = int(np.count_nonzero(codes & (1 << i)))
+                if n:
+                    out[rule.reason] = n
+        return out
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Turn codes into "reason_a; reason_b" strings, once per distinct code."""
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        labels = np.array(
+            [
+                "; ".join(r.reason for i, r in enumerate(self.rules) if code & (1 << i))
+                for code in unique_codes
+            ],
+            dtype=object,
+        )
+        return labels[inverse]
+
+
+def missing_columns(columns: Iterable[str], rules: Iterable[Rule] = TRANSACTION_RULES) -> list[str]:
+    """Rule 1: columns any rule needs that are not among ``columns``."""
+    needed: list[str] = []
+    for rule in rules:
+        for c in rule.columns:
+            if c not in needed:
+                needed.append(c)
+    present = set(columns)
+    return [c for c in needed if c not in present]
+
+
+def evaluate_rules(
+    df: pd.DataFrame,
+    rules: tuple[Rule, ...] = TRANSACTION_RULES,
+    context: RuleContext | None = None,
+    id_index: TransactionIdIndex | None = None,
+    seen_ids: TransactionIdIndex | None = None,
+) -> RuleResult:
+    """
+    Evaluate every rule over ``df`` in a single sweep.
+
+    Each predicate is vectorized and ORs its bit into one shared code array,
+    so all violations are collected (not just the first) and shared parsed
+    columns are computed once. Rule 1 (missing columns) should be checked
+    with ``missing_columns`` first. Pass ``id_index`` to also flag ids loaded
+    by earlier runs, and ``seen_ids`` for ids in earlier chunks.
+    """
+    if len(rules) > 63:
+        raise ValueError("At most 63 rules fit in an int64 reason code")
+
+    ctx = context or RuleContext(df, id_index, seen_ids)
+    codes = np.zeros(len(df), dtype=np.int64)
+    counts: dict[str, int] = {}
+    timings: dict[str, float] = {}
+
+    for i, rule in enumerate(rules):
+        start = time.perf_counter()
+        mask = rule.predicate(ctx)
+        violated = mask.to_numpy(dtype=bool, na_value=False)
+        codes |= violated.astype(np.int64) << i
+        counts[rule.reason] = int(violated.sum())
+        timings[rule.reason] = time.perf_counter() - start
+
+    return RuleResult(rules, codes, counts, timings, ctx)
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import logging
 from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
 import pandas as pd
+import pyarrow as pa
 
 
 @dataclass(frozen=True)
@@ -9,6 +14,16 @@ class SchemaSpec:
     required_columns: tuple[str, ...]
     not_null_columns: tuple[str, ...] = ()
     numeric_columns: tuple[str, ...] = ()
+    categorical_columns: tuple[str, ...] = ()
+    date_columns: tuple[str, ...] = ()
+
+
+# Column-type contract shared by every reader (src/ and ingestion/ paths).
+STRING_DTYPE = pd.ArrowDtype(pa.string())
+NUMERIC_DTYPE = pd.ArrowDtype(pa.float64())
+CATEGORICAL_DTYPE = "category"
+DATE_DTYPE = "datetime64[ns]"
+ISO_DATE_FORMAT = "%Y-%m-%d"
 
 
 class SchemaValidationError(ValueError):
@@ -33,9 +48,105 @@ def transactions_schema_spec() -> SchemaSpec:
             "amount",
         ),
         numeric_columns=("amount",),
+        categorical_columns=("department_id", "transaction_type"),
+        date_columns=("transaction_date",),
     )
 
 
+def column_dtypes(spec: SchemaSpec, numeric_as_string: bool = False) -> dict[str, Any]:
+    """
+    Read dtypes for every column in the spec.
+
+    Low-cardinality columns become categoricals, numeric columns Arrow
+    doubles and everything else Arrow strings. Date columns are read as
+    strings so unparseable values survive long enough to be quarantined;
+    they take ``DATE_DTYPE`` once parsed. ``numeric_as_string`` keeps numeric
+    columns as strings for files whose values do not all parse.
+    """
+    dtypes: dict[str, Any] = {}
+    for c in spec.required_columns:
+        if c in spec.categorical_columns:
+            dtypes[c] = CATEGORICAL_DTYPE
+        elif c in spec.numeric_columns and not numeric_as_string:
+            dtypes[c] = NUMERIC_DTYPE
+        else:
+            dtypes[c] = STRING_DTYPE
+    return dtypes
+
+
+def parse_transaction_dates(values: pd.Series) -> pd.Series:
+    """
+    Parse a date column to ``DATE_DTYPE``; unparseable values become NaT.
+
+    Values already parsed are returned unchanged. ISO ``YYYY-MM-DD`` strings
+    take a format-specific fast path, and only the values it rejects are
+    re-parsed element by element.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    parsed = pd.to_datetime(values, format=ISO_DATE_FORMAT, errors="coerce")
+    fallback = parsed.isna() & values.notna()
+    if fallback.any():
+        parsed = parsed.astype(DATE_DTYPE)
+        parsed[fallback] = pd.to_datetime(
+            values[fallback], format="mixed", errors="coerce"
+        ).astype(DATE_DTYPE)
+    return parsed.astype(DATE_DTYPE)
+
+
+def coerce_numeric(df: pd.DataFrame, spec: SchemaSpec) -> pd.DataFrame:
+    """
+    Convert numeric columns read as strings to ``NUMERIC_DTYPE``.
+
+    Only columns that parse cleanly are converted; anything else stays a
+    string so validation can report the offending values.
+    """
+    for c in spec.numeric_columns:
+        if c not in df.columns:
+            continue
+        coerced = pd.to_numeric(df[c], errors="coerce").astype("float64")
+        if int(coerced.isna().sum()) == int(df[c].isna().sum()):
+            df[c] = coerced.astype(NUMERIC_DTYPE)
+    return df
+
+
+def read_transactions_csv(
+    path: Path,
+    spec: SchemaSpec | None = None,
+    chunk_size: int | None = None,
+) -> pd.DataFrame | Iterator[pd.DataFrame]:
+    """
+    Read a transactions CSV with the column-type contract from ``spec``.
+
+    Whole-file reads use the pyarrow CSV engine; if a numeric column holds
+    unparseable values the file is re-read with that column as a string.
+    Chunked reads (``chunk_size`` set) return an iterator of typed chunks.
+    """
+    spec = spec or transactions_schema_spec()
+
+    if chunk_size:
+        dtypes = column_dtypes(spec, numeric_as_string=True)
+        reader = pd.read_csv(
+            path, dtype=dtypes, dtype_backend="pyarrow", chunksize=chunk_size
+        )
+        return (coerce_numeric(chunk, spec) for chunk in reader)
+
+    try:
+        return pd.read_csv(
+            path, engine="pyarrow", dtype=column_dtypes(spec), dtype_backend="pyarrow"
+        )
+    except (pa.ArrowInvalid, ValueError):
+        logging.warning(f"Non-numeric values in {path}; re-reading numeric columns as text")
+        df = pd.read_csv(
+            path,
+            engine="pyarrow",
+            dtype=column_dtypes(spec, numeric_as_string=True),
+            dtype_backend="pyarrow",
+        )
+        return coerce_numeric(df, spec)
+
+
 def validate_schema(df: pd.DataFrame, spec: SchemaSpec) -> None:
     # 1) Duplicate column names
     if df.columns.duplicated().any():
@@ -67,18 +178,25 @@ def validate_schema(df: pd.DataFrame, spec: SchemaSpec) -> None:
         raise SchemaValidationError(f"Non-numeric values found in numeric fields: {numeric_issues}")
 
 
+def _raise_on_rule(df: pd.DataFrame, reason: str, column: str, message: str) -> None:
+    # rules.py imports this module, so import it here
+    from src.validation.rules import TRANSACTION_RULES, evaluate_rules
+
+    result = evaluate_rules(df, tuple(r for r in TRANSACTION_RULES if r.reason == reason))
+    bad = result.violations(result.bit(reason))
+    if bad.any():
+        raise SchemaValidationError(f"{message}: {df.loc[bad, column].unique().tolist()}")
+
+
 def validate_transaction_types(df: pd.DataFrame) -> None:
-    allowed = {"INCOME", "EXPENSE", "REFUND"}
-    invalid = df.loc[~df["transaction_type"].isin(allowed), "transaction_type"].unique()
-    if len(invalid) > 0:
-        raise SchemaValidationError(
-            f"Invalid transaction_type values: {invalid.tolist()}"
-        )
+    """Raise if any row breaks the ``invalid_transaction_type`` rule."""
+    _raise_on_rule(
+        df, "invalid_transaction_type", "transaction_type", "Invalid transaction_type values"
+    )
 
 
 def validate_transaction_dates(df: pd.DataFrame) -> None:
-    parsed = pd.to_datetime(df["transaction_date"], errors="coerce")
-    bad = parsed.isna()
-    if bad.any():
-        bad_values = df.loc[bad, "transaction_date"].unique().tolist()
-        raise SchemaValidationError(f"Invalid transaction_date values: {bad_values}")
+    """Raise if any row breaks the ``invalid_transaction_date`` rule."""
+    _raise_on_rule(
+        df, "invalid_transaction_date", "transaction_date", "Invalid transaction_date values"
+    )
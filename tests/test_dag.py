@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+from orchestration.dag import Step, StepFailed, run_dag, topological_order
+
+
+def test_results_flow_and_independent_steps_overlap():
+    # Both dims must be running at once to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    def dim(value):
+        barrier.wait()
+        return value + 1
+
+    results = run_dag(
+        [
+            Step("dim_b", dim, deps=("fact",)),
+            Step("dim_a", dim, deps=("fact",)),
+            Step("fact", lambda rows: len(rows), deps=("extract",)),
+            Step("extract", lambda: [1, 2, 3]),
+        ],
+        max_workers=2,
+    )
+
+    assert results == {"extract": [1, 2, 3], "fact": 3, "dim_a": 4, "dim_b": 4}
+
+
+def test_failure_stops_downstream_with_exit_code():
+    ran = []
+
+    def fail():
+        raise SystemExit(3)
+
+    with pytest.raises(StepFailed) as exc:
+        run_dag([Step("validate", fail), Step("fact", lambda _: ran.append("fact"), deps=("validate",))])
+
+    assert exc.value.exit_code == 3
+    assert ran == []
+
+    with pytest.raises(ValueError):
+        topological_order([Step("a", print, deps=("b",)), Step("b", print, deps=("a",))])
+
+
+def test_step_cache_skips_restores_and_evicts(tmp_path):
+    import duckdb
+
+    from orchestration.cache import StepCache, step_key
+
+    out = tmp_path / "valid.txt"
+    con = duckdb.connect()
+    cache = StepCache(tmp_path / "cache")
+    calls = []
+
+    def compute(rows):
+        def run():
+            calls.append(rows)
+            out.write_text(str(rows))
+            con.execute(f"CREATE OR REPLACE TABLE fact AS SELECT range AS id FROM range({rows})")
+            return rows
+
+        return run
+
+    def run(rows):
+        key = step_key("fact", rows=rows)
+        return cache.run("fact", key, compute(rows), files=[out], tables=["fact"], con=con)
+
+    assert run(3) == 3
+    assert run(3) is None  # unchanged: skipped, outputs left in place
+    assert run(5) == 5
+    assert run(3) is None  # seen before: restored from the cache
+    assert calls == [3, 5]
+    assert out.read_text() == "3"
+    assert con.execute("SELECT COUNT(*) FROM fact").fetchone()[0] == 3
+
+    assert StepCache(tmp_path / "cache", force=True).run(
+        "fact", step_key("fact", rows=3), compute(3), files=[out], tables=["fact"], con=con
+    ) == 3
+
+    # The entry whose outputs are in place survives eviction
+    assert cache.evict(max_bytes=0) == 1
+    assert [e["key"] for e in cache.entries()] == [step_key("fact", rows=3)]
+
+    # Outputs changed outside the cache: the next hit restores the entry
+    out.write_text("merged")
+    cache.invalidate("fact")
+    assert run(3) is None
+    assert out.read_text() == "3"
+
+    # A table edited in place with the same row count is restored too
+    con.execute("UPDATE fact SET id = id + 10")
+    assert run(3) is None
+    assert con.execute("SELECT SUM(id) FROM fact").fetchone()[0] == 3
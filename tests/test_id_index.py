@@ -0,0 +1,38 @@
+import pandas as pd
+
+from src.storage.id_index import TransactionIdIndex, hash_ids
+from src.validation.rules import WARNING, evaluate_rules
+
+
+def test_id_index_flags_cross_run_duplicates(tmp_path):
+    index_path = tmp_path / "ids.npy"
+    TransactionIdIndex.rebuild(index_path, [["T001", "T002"], ["T003"]])
+
+    index = TransactionIdIndex.load(index_path)
+    assert len(index) == 3
+    assert index.contains(hash_ids(["T002", "T999"])).tolist() == [True, False]
+
+    assert index.add(hash_ids(["T999", "T001", "T999"])) == 1
+    index.save()
+    assert len(TransactionIdIndex.load(index_path)) == 4
+
+    df = pd.DataFrame(
+        {
+            "transaction_id": ["T001", "T100", "T100", None],
+            "transaction_date": ["2025-10-01"] * 4,
+            "department_id": ["D001"] * 4,
+            "transaction_type": ["EXPENSE"] * 4,
+            "amount": [1.0] * 4,
+        }
+    )
+    result = evaluate_rules(df, id_index=TransactionIdIndex.load(index_path))
+    assert result.count(result.mask_for(severity=WARNING)) == {
+        "duplicate_transaction_id": 1,
+        "transaction_id_already_loaded": 1,
+    }
+
+
+def test_missing_id_index_is_empty(tmp_path):
+    index = TransactionIdIndex.load(tmp_path / "missing.npy")
+    assert len(index) == 0
+    assert not index.contains(hash_ids(["T001"])).any()
@@ -0,0 +1,131 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.ingestion.load_csv import (
+    load_transactions_csv,
+    load_transactions_files,
+    resolve_raw_files,
+)
+from src.validation.validate_schema import (
+    DATE_DTYPE,
+    NUMERIC_DTYPE,
+    STRING_DTYPE,
+    SchemaValidationError,
+    read_transactions_csv,
+)
+
+
+SAMPLE = Path(__file__).resolve().parents[1] / "data/raw/transactions_sample.csv"
+
+
+def test_streaming_matches_full_load(tmp_path):
+    raw = tmp_path / "raw.csv"
+    shutil.copy(SAMPLE, raw)
+
+    full_dir = tmp_path / "full"
+    stream_dir = tmp_path / "stream"
+
+    df_full, full_metrics = load_transactions_csv(
+        raw_path=raw, processed_dir=full_dir, return_metrics=True
+    )
+    df_stream, stream_metrics = load_transactions_csv(
+        raw_path=raw, processed_dir=stream_dir, return_metrics=True, chunk_size=2
+    )
+
+    assert df_stream is None
+    assert df_full["transaction_date"].dtype == DATE_DTYPE
+    assert stream_metrics["chunks"] == 4
+    for key in full_metrics:
+        if key in ("rule_timings_ms", "timings"):
+            continue
+        assert stream_metrics[key] == full_metrics[key]
+    # Batch totals come from the chunks since no clean frame is kept
+    expected = (df_full["amount"] * 100).round().astype(int).groupby(
+        df_full["transaction_type"].astype(str).str.strip().str.lower()
+    ).sum()
+    assert stream_metrics["cents_by_type"] == expected.to_dict()
+    # Stages run per chunk when streaming but see the same rows
+    for stage, record in full_metrics["timings"].items():
+        assert stream_metrics["timings"][stage]["rows"] == record["rows"]
+
+    for name in ["transactions_clean.csv", "transactions_quarantine.csv"]:
+        pd.testing.assert_frame_equal(
+            pd.read_csv(stream_dir / name), pd.read_csv(full_dir / name)
+        )
+    assert not list(stream_dir.glob("*.tmp"))
+
+
+def test_read_applies_column_type_contract(tmp_path):
+    raw = tmp_path / "raw.csv"
+    shutil.copy(SAMPLE, raw)
+
+    df = read_transactions_csv(raw)
+
+    assert isinstance(df["department_id"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["transaction_type"].dtype, pd.CategoricalDtype)
+    assert df["amount"].dtype == NUMERIC_DTYPE
+    assert df["transaction_id"].dtype == STRING_DTYPE
+
+
+def test_read_keeps_non_numeric_amounts_as_text(tmp_path):
+    raw = tmp_path / "raw.csv"
+    raw.write_text(
+        "transaction_id,transaction_date,department_id,transaction_type,amount,description\n"
+        "T001,2025-10-01,D001,EXPENSE,abc,Bad amount\n"
+        "T002,2025-10-02,D001,EXPENSE,10.00,Ok\n",
+        encoding="utf-8",
+    )
+
+    df = read_transactions_csv(raw)
+
+    assert df["amount"].dtype == STRING_DTYPE
+    assert df["amount"].tolist() == ["abc", "10.00"]
+
+
+def test_multi_file_ingestion_matches_single_file(tmp_path):
+    lines = SAMPLE.read_text(encoding="utf-8").splitlines()
+    header, rows = lines[0], lines[1:]
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    # Written out of order on purpose; results follow sorted file names
+    (raw_dir / "b_ledger.csv").write_text("\n".join([header] + rows[4:]) + "\n", encoding="utf-8")
+    (raw_dir / "a_ledger.csv").write_text("\n".join([header] + rows[:4]) + "\n", encoding="utf-8")
+
+    raw = tmp_path / "raw.csv"
+    shutil.copy(SAMPLE, raw)
+    df_single, single_metrics = load_transactions_csv(
+        raw_path=raw, processed_dir=tmp_path / "single", return_metrics=True
+    )
+
+    files = resolve_raw_files(raw_dir)
+    df_multi, multi_metrics = load_transactions_files(
+        files, processed_dir=tmp_path / "multi", workers=2
+    )
+
+    assert [f.name for f in files] == ["a_ledger.csv", "b_ledger.csv"]
+    assert df_multi["transaction_id"].tolist() == df_single["transaction_id"].tolist()
+    assert isinstance(df_multi["department_id"].dtype, pd.CategoricalDtype)
+    for key in ["input_rows", "clean_rows", "quarantined_rows", "quarantine_rate"]:
+        assert multi_metrics[key] == single_metrics[key]
+    assert multi_metrics["per_file"][str(files[1])]["quarantined_rows"] == 3
+
+
+def test_streaming_batch_writes_nothing_if_a_later_file_fails(tmp_path):
+    lines = SAMPLE.read_text(encoding="utf-8").splitlines()
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    (raw_dir / "a_ledger.csv").write_text("\n".join(lines[:5]) + "\n", encoding="utf-8")
+    (raw_dir / "b_ledger.csv").write_text(
+        lines[0] + "\nT100,2025-10-01,D001,EXPENSE,abc,Bad amount\n", encoding="utf-8"
+    )
+    processed_dir = tmp_path / "processed"
+
+    with pytest.raises(SchemaValidationError):
+        load_transactions_files(
+            resolve_raw_files(raw_dir), processed_dir=processed_dir, chunk_size=2
+        )
+
+    assert list(processed_dir.iterdir()) == []
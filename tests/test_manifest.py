@@ -0,0 +1,27 @@
+import os
+
+from src.ingestion.manifest import RawFileManifest
+
+
+def test_manifest_tracks_new_unchanged_and_modified_files(tmp_path):
+    raw = tmp_path / "raw.csv"
+    raw.write_text("a,b\n1,2\n", encoding="utf-8")
+    manifest_path = tmp_path / "_raw_manifest.json"
+
+    manifest = RawFileManifest.load(manifest_path)
+    assert manifest.status(raw) == "new"
+
+    manifest.record(raw, rows=1, run_id="run1")
+    manifest.save()
+
+    reloaded = RawFileManifest.load(manifest_path)
+    assert reloaded.status(raw) == "unchanged"
+    assert reloaded.transform_pending
+
+    # Same content with a new mtime is still unchanged
+    stat = raw.stat()
+    os.utime(raw, (stat.st_atime, stat.st_mtime + 10))
+    assert reloaded.status(raw) == "unchanged"
+
+    raw.write_text("a,b\n1,3\n", encoding="utf-8")
+    assert reloaded.status(raw) == "modified"
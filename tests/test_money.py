@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.validation.money import from_cents, to_cents, to_nullable_cents
+
+
+def test_cents_round_trip_and_exact_sums():
+    amounts = pd.Series([0.1, 0.2, 120.5, -25.0, 0.125, 0.135], dtype="double[pyarrow]")
+
+    cents = to_cents(amounts)
+
+    assert cents.dtype == np.int64
+    # Sub-cent amounts round half to even, like round(2)
+    assert cents.tolist() == [10, 20, 12050, -2500, 12, 14]
+    assert from_cents(cents).tolist() == pd.Series(amounts.astype(float)).round(2).tolist()
+    # Integer sums are exact where float sums drift
+    assert from_cents(cents[:2].sum()) == 0.3
+    assert 0.1 + 0.2 != 0.3
+
+
+def test_missing_amounts():
+    with pytest.raises(ValueError):
+        to_cents([1.0, np.nan])
+
+    nullable = to_nullable_cents(pd.Series([1.5, None, 2.0]))
+    assert nullable.dtype == "Int64"
+    assert nullable.isna().tolist() == [False, True, False]
+    assert nullable.dropna().tolist() == [150, 200]
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from src.metrics.profile import BatchProfile, HyperLogLog, QuantileSketch, merge_profiles
+from src.storage.id_index import hash_ids
+
+
+def test_sketches_are_accurate_and_mergeable():
+    hll_a, hll_b = HyperLogLog(), HyperLogLog()
+    hll_a.add_hashes(hash_ids([f"T{i}" for i in range(0, 6000)]))
+    hll_b.add_hashes(hash_ids([f"T{i}" for i in range(4000, 10000)]))
+    assert abs(hll_a.merge(hll_b).estimate() - 10000) < 10000 * 0.05
+
+    values = np.random.default_rng(0).lognormal(4, 1, 20000)
+    sketch = QuantileSketch()
+    sketch.add(values[:10000])
+    other = QuantileSketch()
+    other.add(values[10000:])
+    merged = sketch.merge(other)
+    for q in (0.01, 0.5, 0.99):
+        exact = np.quantile(values, q, method="lower")
+        assert abs(merged.quantile(q) - exact) <= exact * 0.02
+
+
+def test_profile_merge_matches_single_pass():
+    df = pd.DataFrame(
+        {
+            "transaction_id": ["T1", "T2", "T3", "T4"],
+            "transaction_date": ["2025-10-01", "2025-09-15", "bad", "2025-11-30"],
+            "department_id": ["D1", "D2", None, "D1"],
+            "transaction_type": ["EXPENSE", "REFUND", "EXPENSE", "INCOME"],
+            "amount": [10.0, -5.0, 0.0, 200.0],
+        }
+    )
+    whole = BatchProfile()
+    whole.update(df)
+
+    parts = []
+    for chunk in (df.iloc[:2], df.iloc[2:]):
+        p = BatchProfile()
+        p.update(chunk)
+        parts.append(p.to_dict())
+
+    assert merge_profiles(parts) == whole.to_dict()
+    summary = whole.summary()
+    assert summary["distinct_departments"] == 2
+    assert summary["null_rates"]["department_id"] == 0.25
+    assert (summary["date_min"], summary["date_max"]) == ("2025-09-15", "2025-11-30")
+    assert summary["type_counts"] == {"EXPENSE": 2, "INCOME": 1, "REFUND": 1}
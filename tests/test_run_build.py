@@ -0,0 +1,117 @@
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+import pytest
+
+from transformations import run_build
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _valid(rows):
+    columns = ["transaction_id", "transaction_date", "department_id", "transaction_type"]
+    df = pd.DataFrame(rows, columns=[*columns, "amount_cents"])
+    df["transaction_date"] = pd.to_datetime(df["transaction_date"])
+    return df
+
+
+def _build(con, valid, full_refresh=False):
+    run_build.register_staging(con, valid)
+    sql_files = run_build.plan_sql(con, full_refresh)
+    counts = {}
+    for sql_path in sql_files:
+        run_build.combine_row_counts(counts, run_build.run_sql(con, sql_path))
+    if run_build.MERGE_FACT_SQL in sql_files:
+        return run_build.update_id_index(con), counts
+    return run_build.rebuild_id_index(con), counts
+
+
+def test_incremental_build_merges_new_and_changed_rows(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(PROJECT_ROOT)
+    monkeypatch.setattr(run_build, "ID_INDEX_PATH", tmp_path / "ids.npy")
+    con = duckdb.connect()
+    first = [
+        ("T1", "2024-01-01", "D1", "EXPENSE", -100),
+        ("T2", "2024-01-02", "D1", "INCOME", 250),
+    ]
+    _build(con, _valid(first))
+    assert run_build.plan_sql(con) == [run_build.MERGE_SQL[p] for p in run_build.SQL_FILES]
+
+    # T1 unchanged, T2 corrected, T3 new with a new date and department
+    second = [
+        ("T1", "2024-01-01", "D1", "EXPENSE", -100),
+        ("T2", "2024-01-02", "D1", "INCOME", 300),
+        ("T3", "2024-02-01", "D2", "EXPENSE", -5),
+    ]
+    index, counts = _build(con, _valid(second))
+
+    assert con.execute(
+        "SELECT COUNT(*) FILTER (is_new), COUNT(*) FILTER (NOT is_new) FROM fact_transactions_delta"
+    ).fetchone() == (1, 1)
+    merged = con.execute(
+        "SELECT transaction_id, amount_cents FROM fact_transactions ORDER BY 1"
+    ).fetchall()
+    assert merged == [("T1", -100), ("T2", 300), ("T3", -5)]
+    assert con.execute("SELECT COUNT(*) FROM dim_dates").fetchone()[0] == 3
+    assert con.execute("SELECT department_id FROM dim_departments ORDER BY 1").fetchall() == [
+        ("D1",),
+        ("D2",),
+    ]
+    assert len(index) == 3
+    # Merged tables report their final size next to the merge delta
+    run_build.print_summary(con, index, counts)
+    assert "- fact_transactions: 3 (+" in capsys.readouterr().out
+
+    # A full refresh rebuilds from the batch alone, dropping ids not in it
+    index, _ = _build(con, _valid(second[1:]), full_refresh=True)
+    assert con.execute("SELECT COUNT(*) FROM fact_transactions").fetchone()[0] == 2
+    assert len(index) == 2
+
+
+def test_sql_files_run_in_inferred_order_with_row_counts(tmp_path):
+    def sql(name, text):
+        path = tmp_path / f"{name}.sql"
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    fact = sql("fact", "CREATE OR REPLACE TABLE f AS SELECT range AS id FROM range(10);")
+    dim = sql("dim", "-- From f\nCREATE OR REPLACE TABLE d AS SELECT id FROM f WHERE id < 3;")
+    # Nothing in the SQL reads d, so the dependency is declared
+    mart = sql("mart", "-- depends_on: d\nCREATE OR REPLACE TABLE m AS SELECT 1 AS x;")
+    other = sql("other", "CREATE OR REPLACE TABLE o AS SELECT 1 AS x FROM read_parquet('x');")
+    append = sql("append", "INSERT INTO d SELECT 99;\nDELETE FROM d WHERE id = 0;")
+
+    files = [fact, dim, mart, other, append]
+    assert run_build.sql_dependencies(files) == {
+        fact: [],
+        dim: [fact],
+        mart: [dim],
+        other: [],
+        append: [dim, mart],  # writes d: after its builder and its readers
+    }
+
+    con = duckdb.connect()
+    counts = run_build.run_sql_files(con, files[:3] + files[4:], threads=2)
+
+    assert counts == {
+        "f": {"rows": 10},
+        "d": {"rows": 3, "inserted": 1, "deleted": 1},
+        "m": {"rows": 1},
+    }
+    assert con.execute("SELECT list(id ORDER BY id) FROM d").fetchone()[0] == [1, 2, 99]
+
+
+def test_failed_sql_file_is_rolled_back(tmp_path):
+    con = duckdb.connect()
+    con.execute("CREATE TABLE f AS SELECT range AS id FROM range(3)")
+    merge = tmp_path / "merge.sql"
+    merge.write_text(
+        "DELETE FROM f WHERE id = 0;\nINSERT INTO f SELECT CAST('x' AS BIGINT);\n",
+        encoding="utf-8",
+    )
+
+    with pytest.raises(duckdb.Error):
+        run_build.run_sql(con, merge)
+
+    assert con.execute("SELECT list(id ORDER BY id) FROM f").fetchone()[0] == [0, 1, 2]
@@ -0,0 +1,27 @@
+from pathlib import Path
+
+from orchestration.scheduler import MicroBatcher, batch_record
+
+
+def test_micro_batcher_debounces_and_cuts_batches():
+    batcher = MicroBatcher(debounce_s=2, max_wait_s=5, max_files=2)
+    a, b, c = Path("a.csv"), Path("b.csv"), Path("c.csv")
+
+    batcher.observe({a: (10, 1.0)}, now=0)
+    batcher.observe({a: (20, 2.0)}, now=1)  # still being written
+    assert batcher.ready(now=2.5) == []
+    assert [f.path for f in batcher.ready(now=3)] == [a]
+
+    # One ready file: waits for more until max_wait_s has passed
+    assert batcher.next_batch(now=3) == []
+    assert [f.path for f in batcher.next_batch(now=3, flush=True)] == [a]
+
+    batcher.observe({b: (1, 1.0), c: (1, 1.0)}, now=10)
+    batch = batcher.next_batch(now=12)  # max_files reached
+    assert sorted(f.path for f in batch) == [b, c]
+    assert batcher.pending == {}
+
+    record = batch_record("x", batch, cut_at=12, started_at=13, finished_at=15, exit_code=0)
+    assert record["latency"]["queued_s"] == 1
+    assert record["latency"]["max_s"] == 14  # arrived (mtime) 1.0 -> 15
+    assert record["run"]["warehouse_available"]
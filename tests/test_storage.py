@@ -0,0 +1,52 @@
+import pandas as pd
+
+from src.storage.datasets import DatasetWriter, OutputSpec, read_dataset, write_dataset
+
+
+def _transactions():
+    return pd.DataFrame(
+        {
+            "transaction_id": ["T001", "T002", "T003"],
+            "transaction_date": pd.to_datetime(["2025-09-30", "2025-10-01", "2025-11-15"]),
+            "department_id": ["D001", "D002", "D001"],
+            "amount": [10.0, 20.0, 30.0],
+        }
+    )
+
+
+def test_partitioned_parquet_prunes_months(tmp_path):
+    spec = OutputSpec(format="parquet", partition_by=("year_month",))
+
+    path = write_dataset(_transactions(), tmp_path, "clean", spec)
+
+    assert sorted(p.name for p in path.iterdir()) == [
+        "year_month=2025-09",
+        "year_month=2025-10",
+        "year_month=2025-11",
+    ]
+    df = read_dataset(tmp_path, "clean", spec, year_months=["2025-10", "2025-11"])
+    assert sorted(df["transaction_id"]) == ["T002", "T003"]
+
+
+def test_unpartitioned_parquet_filters_by_date(tmp_path):
+    spec = OutputSpec(format="parquet", row_group_size=1)
+
+    write_dataset(_transactions(), tmp_path, "clean", spec)
+
+    df = read_dataset(tmp_path, "clean", spec, year_months=["2025-10"])
+    assert df["transaction_id"].tolist() == ["T002"]
+
+
+def test_failed_write_keeps_previous_dataset(tmp_path):
+    spec = OutputSpec(format="csv")
+    write_dataset(_transactions(), tmp_path, "clean", spec)
+
+    try:
+        with DatasetWriter(tmp_path, "clean", spec) as writer:
+            writer.write(_transactions().head(1))
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    assert len(read_dataset(tmp_path, "clean", spec)) == 3
+    assert not (tmp_path / "clean.csv.tmp").exists()
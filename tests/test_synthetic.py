@@ -0,0 +1,70 @@
+import pandas as pd
+
+from benchmarks.generate_transactions import (
+    QUARANTINE_ERROR_RATES,
+    VALIDATION_ERROR_RATES,
+    SyntheticSpec,
+    generate_transactions,
+    injected_errors,
+    write_transactions_csv,
+)
+from src.ingestion.load_csv import load_transactions_csv
+from src.validation.rules import CRITICAL, evaluate_rules
+from src.validation.validate_schema import read_transactions_csv
+
+
+def test_generator_is_deterministic():
+    spec = SyntheticSpec(rows=2_000, departments=5, days=30, error_rates=VALIDATION_ERROR_RATES)
+
+    df = generate_transactions(spec)
+
+    pd.testing.assert_frame_equal(df, generate_transactions(spec))
+    assert len(df) == 2_000
+    assert df["department_id"].dropna().nunique() == 5
+    assert not generate_transactions(SyntheticSpec(rows=2_000, seed=1)).equals(df)
+
+
+def test_injected_errors_match_quarantine_and_rules(tmp_path):
+    spec = SyntheticSpec(rows=20_000, error_rates={k: 0.01 for k in QUARANTINE_ERROR_RATES})
+    raw = write_transactions_csv(spec, tmp_path / "raw.csv")
+    injected = injected_errors(spec)
+
+    df, metrics = load_transactions_csv(
+        raw_path=raw, processed_dir=tmp_path / "processed", return_metrics=True
+    )
+
+    quarantined = sum(n for k, n in injected.items() if k != "duplicate_transaction_id")
+    assert metrics["quarantined_rows"] == quarantined
+    assert len(df) == spec.rows - quarantined
+    assert metrics["rule_violations"]["duplicate_transaction_id"] == injected["duplicate_transaction_id"]
+
+    spec = SyntheticSpec(rows=20_000, error_rates=VALIDATION_ERROR_RATES, seed=3)
+    injected = injected_errors(spec)
+    result = evaluate_rules(read_transactions_csv(write_transactions_csv(spec, tmp_path / "v.csv")))
+
+    rejected = result.violations(result.mask_for(severity=CRITICAL)).sum()
+    assert rejected == sum(n for k, n in injected.items() if k != "duplicate_transaction_id")
+    assert result.counts["missing_amount"] == injected["missing_amount"]
+    assert result.counts["non_numeric_amount"] == injected["non_numeric_amount"]
+    # A blank type is not an allowed type either
+    assert result.counts["invalid_transaction_type"] == (
+        injected["invalid_transaction_type"] + injected["missing_transaction_type"]
+    )
+
+
+def test_benchmark_compare_flags_regressions():
+    from benchmarks.run_benchmarks import compare
+
+    baseline = {"load@10": {"rows_per_s": 100.0, "peak_rss_mb": 100.0}}
+    results = {
+        "load@10": {"wall_s": 0.2, "rows_per_s": 60.0, "peak_rss_mb": 100.0},
+        "build@10": {"wall_s": 0.1, "rows_per_s": 100.0, "peak_rss_mb": 50.0},
+    }
+
+    rows = {r["benchmark"]: r for r in compare(results, baseline, tolerance=0.3)}
+
+    assert rows["load@10"]["status"] == "REGRESSION (speed)"
+    assert rows["load@10"]["throughput"] == "-40%"
+    assert rows["build@10"]["status"] == "new"
+    results["load@10"].update(rows_per_s=90.0, peak_rss_mb=140.0)
+    assert compare(results, baseline, tolerance=0.3)[0]["status"] == "REGRESSION (memory)"
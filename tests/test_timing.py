@@ -0,0 +1,57 @@
+import tracemalloc
+
+from src.metrics.summarize_runs import stage_trends
+from src.metrics.timing import StageTimer, merge_timings, peak_rss_mb
+
+
+def test_stages_accumulate_and_merge():
+    timer = StageTimer()
+    chunks = list(timer.iterate("read", [[1, 2], [3]]))
+    for chunk in chunks:
+        with timer.stage("validate", len(chunk)):
+            pass
+
+    timings = timer.to_dict()
+    assert chunks == [[1, 2], [3]]
+    assert timings["read"]["rows"] == 3
+    assert timings["validate"]["calls"] == 2
+    assert timings["validate"]["rows"] == 3
+    assert {"wall_s", "cpu_s"} <= set(timings["validate"])
+    # resource on POSIX, GetProcessMemoryInfo on Windows
+    assert ("peak_rss_mb" in timings["validate"]) == (peak_rss_mb() is not None)
+
+    merged = merge_timings([timings, {"validate": dict(timings["validate"], wall_s=1.0)}])
+    assert merged["validate"]["calls"] == 4
+    assert merged["validate"]["rows"] == 6
+    assert merged["validate"]["rows_per_s"] == round(6 / merged["validate"]["wall_s"], 1)
+
+
+def test_nested_stage_keeps_outer_python_peak():
+    timer = StageTimer()
+    tracemalloc.start()
+    try:
+        with timer.stage("outer"):
+            block = bytearray(4 * 1024 * 1024)
+            del block
+            with timer.stage("inner"):
+                pass
+    finally:
+        tracemalloc.stop()
+
+    timings = timer.to_dict()
+    assert timings["outer"]["py_peak_mb"] >= 4
+    assert timings["inner"]["py_peak_mb"] < 4
+
+
+def test_stage_trends_compare_latest_with_median():
+    runs = [
+        {"timings": {"read": {"wall_s": 3.0, "cpu_s": 2.0}, "write": {"wall_s": 1.0, "cpu_s": 1.0}}},
+        {"timings": {"read": {"wall_s": 2.0, "cpu_s": 2.0}}},
+        {"timings": {"read": {"wall_s": 1.0, "cpu_s": 1.0}}},
+        {"run": {"skipped": True}},
+    ]
+
+    read, write = stage_trends(runs)
+
+    assert (read["stage"], read["runs"], read["median_wall_s"], read["change"]) == ("read", 3, 1.5, "+100%")
+    assert write["stage"] == "write" and write["change"] is None
@@ -1,7 +1,15 @@
 import pandas as pd
 from pathlib import Path
 
-from src.transforms.transform_transactions import transform_transactions
+from src.transforms.duckdb_backend import DuckDBSettings, transform_transactions_duckdb
+from src.transforms.transform_transactions import (
+    TOTAL_COLUMNS,
+    add_month_columns,
+    build_rollup_cube,
+    department_month_totals,
+    summary_drift,
+    transform_transactions,
+)
 
 
 def test_transform_creates_gold_outputs(tmp_path, monkeypatch):
@@ -36,3 +44,151 @@ def test_transform_creates_gold_outputs(tmp_path, monkeypatch):
     # Output files exist
     assert (base / "data/gold/transactions_analytics.csv").exists()
     assert (base / "data/gold/department_monthly_summary.csv").exists()
+
+
+def test_transform_accepts_in_memory_frame(tmp_path):
+    df = pd.DataFrame(
+        {
+            "transaction_id": ["T001", "T002"],
+            "transaction_date": pd.to_datetime(["2025-10-01", "2025-11-02"]),
+            "department_id": ["D001", "D001"],
+            "transaction_type": ["INCOME", "EXPENSE"],
+            "amount": [100.0, 40.0],
+            "description": ["Test", "Test"],
+        }
+    )
+    processed_dir = tmp_path / "processed"
+    gold_dir = tmp_path / "gold"
+
+    out_df = transform_transactions(
+        processed_dir=processed_dir, gold_dir=gold_dir, df=df
+    )
+
+    # No cleaned file was needed and the caller's frame is untouched
+    assert not processed_dir.exists()
+    assert "amount_normalized" not in df.columns
+    assert out_df["amount_normalized"].tolist() == [100.0, -40.0]
+    assert (gold_dir / "department_monthly_summary.csv").exists()
+
+
+def test_department_month_summary_matches_pivot_table():
+    df = pd.DataFrame(
+        {
+            "transaction_date": pd.to_datetime(
+                ["2025-11-03", "2025-10-01", "2025-10-09", "2024-12-31", "2025-10-20"]
+            ),
+            "department_id": pd.Categorical(["D002", "D001", "D001", "D002", "D001"]),
+            "transaction_type": pd.Categorical(
+                ["EXPENSE", "INCOME", "EXPENSE", "INCOME", "INCOME"]
+            ),
+            "amount_normalized": [-10.5, 100.0, -20.25, 7.0, 0.1],
+        }
+    )
+    df = add_month_columns(df)
+    assert df["year_month"].astype(str).tolist() == [
+        "2025-11", "2025-10", "2025-10", "2024-12", "2025-10",
+    ]
+
+    expected = df.assign(
+        year_month=df["year_month"].astype(str),
+        cents=(df["amount_normalized"] * 100).round().astype("int64"),
+    ).pivot_table(
+        index=["department_id", "year_month"],
+        columns="transaction_type",
+        values="cents",
+        aggfunc="sum",
+        fill_value=0,
+        observed=True,
+    ).reset_index()
+    expected["REFUND"] = 0
+    expected.columns.name = None
+    expected = expected.rename(columns=TOTAL_COLUMNS)
+
+    summary = department_month_totals(df)
+    pd.testing.assert_frame_equal(
+        summary.astype({"department_id": str}),
+        expected.astype({"department_id": str}),
+    )
+
+
+def test_incremental_summary_matches_full_rebuild(tmp_path):
+    def batch(ids, dates, depts, types, amounts):
+        return pd.DataFrame(
+            {
+                "transaction_id": ids,
+                "transaction_date": pd.to_datetime(dates),
+                "department_id": depts,
+                "transaction_type": types,
+                "amount": amounts,
+                "description": "Test",
+            }
+        )
+
+    first = batch(
+        ["T1", "T2"], ["2025-10-01", "2025-11-05"], ["D001", "D002"],
+        ["INCOME", "EXPENSE"], [100.0, 40.0],
+    )
+    second = batch(
+        ["T3", "T4"], ["2025-10-20", "2025-12-01"], ["D001", "D003"],
+        ["REFUND", "INCOME"], [-10.0, 5.0],
+    )
+
+    inc_dir, full_dir = tmp_path / "inc", tmp_path / "full"
+    transform_transactions(gold_dir=inc_dir, df=first)
+    transform_transactions(gold_dir=inc_dir, df=second, incremental=True)
+    transform_transactions(gold_dir=full_dir, df=pd.concat([first, second], ignore_index=True))
+
+    for name in ["department_monthly_summary.csv", "transactions_analytics.csv"]:
+        assert (inc_dir / name).read_text() == (full_dir / name).read_text()
+
+    inc = pd.read_csv(inc_dir / "department_monthly_summary.csv")
+    assert summary_drift(inc, pd.read_csv(full_dir / "department_monthly_summary.csv")) == 0
+    assert summary_drift(inc.iloc[1:], inc) == 1
+
+
+def test_rollup_cube_grains_and_grouping_sets():
+    totals = pd.DataFrame(
+        {
+            "department_id": ["D001", "D001", "D002", "D002"],
+            "year_month": ["2025-07", "2025-08", "2025-08", "2025-10"],
+            "transaction_type": ["INCOME", "EXPENSE", "INCOME", "REFUND"],
+            "amount_cents": [10000, -4000, 1000, -500],
+            "transactions": [1, 2, 1, 1],
+        }
+    )
+    cube = build_rollup_cube(totals, fiscal_year_start_month=8)
+    cube = cube.set_index(["grain", "period", "department_id", "transaction_type"])
+
+    # August starts FY2026; July still belongs to FY2025
+    assert cube.loc[("fiscal_year", "FY2025", "ALL", "ALL"), "total_amount"] == 100.0
+    assert cube.loc[("fiscal_year", "FY2026", "ALL", "ALL"), "total_amount"] == -35.0
+    assert cube.loc[("quarter", "2025-Q3", "D001", "ALL"), "total_amount"] == 60.0
+    assert cube.loc[("month", "2025-08", "ALL", "INCOME"), "transaction_count"] == 1
+    assert cube.loc[("all", "ALL", "ALL", "ALL"), "transaction_count"] == 5
+
+    # Every grain adds up to the same grand total
+    grand = cube.xs(("ALL", "ALL"), level=["department_id", "transaction_type"])
+    assert grand.groupby(level="grain")["total_amount"].sum().eq(65.0).all()
+
+
+def test_duckdb_backend_matches_pandas(tmp_path):
+    processed = tmp_path / "processed"
+    processed.mkdir()
+    (processed / "transactions_clean.csv").write_text(
+        "transaction_id,transaction_date,department_id,transaction_type,amount,description\n"
+        "T1,2025-10-01,D002,EXPENSE,120.5,Stationery\n"
+        "T2,2025-10-02,D001,REFUND,-25.0,\n"
+        "T3,2025-11-15,D001,INCOME,0.125,Rounds half to even\n"
+        "T4,2025-07-31,D002,INCOME,500.0,Grant\n"
+    )
+
+    transform_transactions(processed_dir=processed, gold_dir=tmp_path / "pandas")
+    result = transform_transactions_duckdb(
+        processed_dir=processed,
+        gold_dir=tmp_path / "duckdb",
+        settings=DuckDBSettings(threads=2, temp_directory=str(tmp_path / "spill")),
+    )
+
+    assert result.rows == 4
+    for path in sorted((tmp_path / "pandas").iterdir()):
+        assert path.read_bytes() == (tmp_path / "duckdb" / path.name).read_bytes(), path.name
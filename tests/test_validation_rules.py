@@ -1,7 +1,13 @@
 import pandas as pd
 import pytest
 
-from ingestion.validate_raw_data import ALLOWED_TRANSACTION_TYPES
+from ingestion.validate_raw_data import (
+    MAX_REJECT_RATE,
+    apply_rules,
+    budget_breached,
+)
+from src.storage.id_index import TransactionIdIndex
+from src.validation.rules import ALLOWED_TRANSACTION_TYPES, CRITICAL, WARNING
 
 
 def test_allowed_transaction_types():
@@ -9,13 +15,72 @@ def test_allowed_transaction_types():
     assert "INCOME" in ALLOWED_TRANSACTION_TYPES
     assert "REFUND" in ALLOWED_TRANSACTION_TYPES
     assert "TRANSFER" not in ALLOWED_TRANSACTION_TYPES
+
+
+def test_rejection_reason_bitmask():
+    df = pd.DataFrame(
+        {
+            "transaction_id": ["T001", "T002", "T001"],
+            "transaction_date": ["2025-10-01", "INVALID_DATE", "2025-10-03"],
+            "department_id": ["D001", None, "D001"],
+            "transaction_type": ["EXPENSE", "EXPENSE", "REFUND"],
+            "amount": [10.0, 5.0, 7.0],
+        }
+    )
+
+    _, result = apply_rules(df)
+
+    assert result.codes[0] == 0
+    assert result.decode(result.codes).tolist() == [
+        "",
+        "missing_department_id; invalid_transaction_date",
+        "refund_amount_must_be_negative; duplicate_transaction_id",
+    ]
+    assert result.count(result.mask_for(severity=CRITICAL)) == {
+        "missing_department_id": 1,
+        "invalid_transaction_date": 1,
+        "refund_amount_must_be_negative": 1,
+    }
+    # The duplicate is a warning only
+    assert result.count(result.mask_for(severity=WARNING)) == {"duplicate_transaction_id": 1}
+    assert set(result.timings) == {r.reason for r in result.rules}
+
+
+def test_reject_budget_and_cross_chunk_duplicates():
+    total = 1000
+    allowed = int(total * MAX_REJECT_RATE)
+    # A partial count already over the file-wide budget is final
+    assert budget_breached(allowed + 1, total)
+    assert not budget_breached(allowed, total)
+
+    def chunk(ids):
+        return pd.DataFrame(
+            {
+                "transaction_id": ids,
+                "transaction_date": ["2025-10-01"] * len(ids),
+                "department_id": ["D001"] * len(ids),
+                "transaction_type": ["EXPENSE"] * len(ids),
+                "amount": [1.0] * len(ids),
+            }
+        )
+
+    seen = TransactionIdIndex()
+    _, first = apply_rules(chunk(["T1", "T2"]), seen_ids=seen)
+    seen.add(first.context.id_hashes)
+    _, second = apply_rules(chunk(["T2", "T3"]), seen_ids=seen)
+    assert second.count(second.mask_for(severity=WARNING)) == {"duplicate_transaction_id": 1}
 import pandas as pd
 import pytest
 
+from src.ingestion.load_csv import load_transactions_csv
 from src.validation.validate_schema import (
+    DATE_DTYPE,
     SchemaValidationError,
+    parse_transaction_dates,
     transactions_schema_spec,
     validate_schema,
+    validate_transaction_dates,
+    validate_transaction_types,
 )
 
 
@@ -41,3 +106,51 @@ def test_schema_passes_with_required_columns():
     spec = transactions_schema_spec()
 
     validate_schema(df, spec)
+
+
+def test_parse_transaction_dates_iso_and_fallback():
+    values = pd.Series(["2025-10-01", "01 Oct 2025", "INVALID_DATE", None])
+
+    parsed = parse_transaction_dates(values)
+
+    assert parsed.dtype == DATE_DTYPE
+    assert parsed.iloc[0] == pd.Timestamp("2025-10-01")
+    assert parsed.iloc[1] == pd.Timestamp("2025-10-01")
+    assert parsed.iloc[2:].isna().all()
+    # Already-parsed columns pass straight through
+    assert parse_transaction_dates(parsed) is parsed
+
+
+def test_load_fails_on_sign_rule_with_all_violations(tmp_path):
+    raw = tmp_path / "raw.csv"
+    raw.write_text(
+        "transaction_id,transaction_date,department_id,transaction_type,amount\n"
+        "T1,2025-10-01,D1,EXPENSE,-5.00\n"
+        "T2,2025-10-01,D1,REFUND,5.00\n"
+        "T3,2025-10-01,D1,BONUS,5.00\n"
+    )
+
+    with pytest.raises(SchemaValidationError) as exc:
+        load_transactions_csv(raw_path=raw, processed_dir=tmp_path / "processed")
+
+    message = str(exc.value)
+    for reason in [
+        "expense_amount_must_be_positive",
+        "refund_amount_must_be_negative",
+        "invalid_transaction_type",
+    ]:
+        assert reason in message
+
+
+def test_schema_validators_use_the_rules():
+    df = pd.DataFrame(
+        {"transaction_type": ["INCOME", "TRANSFER"], "transaction_date": ["2025-10-01", "bad"]}
+    )
+
+    with pytest.raises(SchemaValidationError, match="TRANSFER"):
+        validate_transaction_types(df)
+    with pytest.raises(SchemaValidationError, match="bad"):
+        validate_transaction_dates(df)
+    validate_transaction_types(df.iloc[:1])
+    validate_transaction_dates(df.iloc[:1])
+
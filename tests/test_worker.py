@@ -0,0 +1,25 @@
+import json
+
+from orchestration.worker import run_request, submit
+
+
+def test_requests_queue_in_order_and_exit_codes_are_kept(tmp_path):
+    first = submit(["--mode", "lenient"], spool=tmp_path)
+    second = submit([], pipeline="pipeline", spool=tmp_path)
+
+    queued = sorted(p.stem for p in (tmp_path / "incoming").glob("*.json"))
+    assert queued == [first, second]
+    request = json.loads((tmp_path / "incoming" / f"{first}.json").read_text())
+    assert (request["pipeline"], request["args"]) == ("orchestration", ["--mode", "lenient"])
+
+    def strict_breach(args, con=None):
+        raise SystemExit(1)
+
+    def crash(args):
+        raise RuntimeError("boom")
+
+    runners = {"orchestration": strict_breach, "pipeline": crash}
+    assert run_request({"pipeline": "orchestration", "args": []}, runners, con=None) == 1
+    assert run_request({"pipeline": "pipeline", "args": []}, runners, con=None) == 1
+    runners["pipeline"] = lambda args: None
+    assert run_request({"pipeline": "pipeline", "args": []}, runners, con=None) == 0
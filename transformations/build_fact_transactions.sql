@@ -1,4 +1,5 @@
 -- Build fact_transactions from validated data
+-- (staging_transactions_valid is set up by run_build.register_staging)
 
 CREATE OR REPLACE TABLE fact_transactions AS
 SELECT
@@ -6,5 +7,7 @@ SELECT
     transaction_date,
     department_id,
     transaction_type,
-    amount
-FROM read_parquet('data/staging/transactions_valid.parquet');
+    -- Exact cents from validation; amount is derived as a decimal
+    amount_cents,
+    CAST(amount_cents AS DECIMAL(18, 0)) * 0.01 AS amount
+FROM staging_transactions_valid;
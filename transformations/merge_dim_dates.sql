@@ -0,0 +1,11 @@
+-- Add the dates of newly merged fact rows to dim_dates
+-- (fact_transactions_delta is written by merge_fact_transactions.sql)
+
+INSERT INTO dim_dates
+SELECT DISTINCT
+    transaction_date AS date,
+    EXTRACT(year FROM transaction_date) AS year,
+    EXTRACT(month FROM transaction_date) AS month,
+    EXTRACT(quarter FROM transaction_date) AS quarter
+FROM fact_transactions_delta
+WHERE transaction_date NOT IN (SELECT date FROM dim_dates WHERE date IS NOT NULL);
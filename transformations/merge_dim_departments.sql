@@ -0,0 +1,9 @@
+-- Add the departments of newly merged fact rows to dim_departments
+-- (fact_transactions_delta is written by merge_fact_transactions.sql)
+
+INSERT INTO dim_departments
+SELECT DISTINCT
+    department_id
+FROM fact_transactions_delta
+WHERE department_id IS NOT NULL
+  AND department_id NOT IN (SELECT department_id FROM dim_departments);
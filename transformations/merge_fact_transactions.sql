@@ -0,0 +1,49 @@
+-- Incrementally merge validated data into fact_transactions
+-- (staging_transactions_valid is set up by run_build.register_staging).
+-- Rows are keyed by transaction_id: ids whose rows differ from the stored
+-- ones are replaced, new ids inserted, unchanged ids left alone. Ids missing
+-- from the batch are kept; a full refresh (build_fact_transactions.sql)
+-- drops them.
+
+CREATE OR REPLACE TEMP TABLE fact_batch AS
+SELECT
+    transaction_id,
+    transaction_date,
+    department_id,
+    transaction_type,
+    -- Exact cents from validation; amount is derived as a decimal
+    amount_cents,
+    CAST(amount_cents AS DECIMAL(18, 0)) * 0.01 AS amount
+FROM staging_transactions_valid;
+
+CREATE OR REPLACE TEMP TABLE fact_stored AS
+SELECT *
+FROM fact_transactions
+WHERE transaction_id IN (SELECT transaction_id FROM fact_batch);
+
+-- The rows this merge adds, read by the incremental dimension loads and
+-- the id index update; is_new is false for ids replaced with changed rows
+CREATE OR REPLACE TABLE fact_transactions_delta AS
+WITH changed_ids AS (
+    SELECT DISTINCT transaction_id
+    FROM (
+        (SELECT * FROM fact_batch EXCEPT ALL SELECT * FROM fact_stored)
+        UNION ALL
+        (SELECT * FROM fact_stored EXCEPT ALL SELECT * FROM fact_batch)
+    )
+)
+SELECT
+    b.*,
+    b.transaction_id NOT IN (SELECT transaction_id FROM fact_stored) AS is_new
+FROM fact_batch AS b
+WHERE b.transaction_id IN (SELECT transaction_id FROM changed_ids);
+
+DELETE FROM fact_transactions
+WHERE transaction_id IN (SELECT transaction_id FROM fact_transactions_delta WHERE NOT is_new);
+
+INSERT INTO fact_transactions
+SELECT transaction_id, transaction_date, department_id, transaction_type, amount_cents, amount
+FROM fact_transactions_delta;
+
+DROP TABLE fact_batch;
+DROP TABLE fact_stored;
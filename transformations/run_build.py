@@ -1,38 +1,377 @@
 from __future__ import annotations
 
+import argparse
+import json
+import re
+import sys
+import time
+from datetime import datetime
 from pathlib import Path
 import duckdb
+import pandas as pd
+import pyarrow as pa
+
+from orchestration.dag import Step, StepFailed, print_lines, run_dag
+from src.metrics.timing import StageTimer
+from src.storage.id_index import ID_INDEX_PATH, TransactionIdIndex, hash_ids
 
 
 DB_PATH = Path("warehouse.duckdb")
+METRICS_DIR = Path("metrics")
+VALID_PATH = Path("data/staging/transactions_valid.parquet")
 
-SQL_FILES = [
-    Path("transformations/build_fact_transactions.sql"),
+FACT_SQL = Path("transformations/build_fact_transactions.sql")
+DIM_SQL = [
     Path("transformations/build_dim_dates.sql"),
     Path("transformations/build_dim_departments.sql"),
 ]
+SQL_FILES = [FACT_SQL, *DIM_SQL]
 
+# Incremental counterpart of each full build: merges only new or changed
+# rows into the existing table. The fact merge writes the rows it added to
+# DELTA_TABLE, which the dimension merges and the id index update read.
+MERGE_FACT_SQL = Path("transformations/merge_fact_transactions.sql")
+MERGE_SQL = {
+    FACT_SQL: MERGE_FACT_SQL,
+    DIM_SQL[0]: Path("transformations/merge_dim_dates.sql"),
+    DIM_SQL[1]: Path("transformations/merge_dim_departments.sql"),
+}
+DELTA_TABLE = "fact_transactions_delta"
+STAGING_VIEW = "staging_transactions_valid"
+
+# Tables a SQL file writes and reads, for ordering the files (comments are
+# stripped first). Reads are every FROM/JOIN target that is not a function
+# call such as read_parquet(...), so they can include column names (e.g.
+# EXTRACT(year FROM d)); those never match a written table and are harmless.
+# A file can also declare what it reads: ``-- depends_on: table_a, table_b``.
+_IDENT = r"([A-Za-z_][\w.]*)\b(?!\s*\()"
+_WRITE_RE = re.compile(
+    r"\b(?:CREATE\s+(?:OR\s+REPLACE\s+)?(TEMP(?:ORARY)?\s+)?(?:TABLE|VIEW)\s+"
+    r"(?:IF\s+NOT\s+EXISTS\s+)?|INSERT\s+INTO\s+|DELETE\s+FROM\s+|UPDATE\s+)" + _IDENT,
+    re.IGNORECASE,
+)
+_READ_RE = re.compile(r"\b(?:FROM|JOIN)\s+" + _IDENT, re.IGNORECASE)
+_CTE_RE = re.compile(r"\b(?:WITH|,)\s*" + _IDENT + r"\s+AS\s*\(", re.IGNORECASE)
+_DEPENDS_RE = re.compile(r"--\s*depends_on:([^\n]*)", re.IGNORECASE)
+_COMMENT_RE = re.compile(r"--[^\n]*")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the warehouse from validated staging data")
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Rebuild every table from the staging data (backfills, or to drop rows "
+        "no longer in the source) instead of merging new and changed rows",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="SQL files run concurrently when their dependencies allow "
+        "(default: thread pool default)",
+    )
+    return parser.parse_args()
+
+
+def table_name(sql_path: Path) -> str:
+    """Table a build or merge SQL file writes, e.g. ``build_dim_dates.sql`` -> ``dim_dates``."""
+    return sql_path.stem.removeprefix("build_").removeprefix("merge_")
+
+
+def table_exists(con: duckdb.DuckDBPyConnection, name: str) -> bool:
+    return bool(
+        con.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [name]
+        ).fetchone()[0]
+    )
+
+
+def sql_tables(sql: str) -> tuple[set[str], set[str]]:
+    """
+    ``(writes, reads)``: the tables a SQL script creates or modifies and the
+    ones it reads. Temporary tables and CTEs are local to the script and left
+    out of both.
+    """
+    declared = {
+        name.strip().lower()
+        for line in _DEPENDS_RE.findall(sql)
+        for name in line.split(",")
+        if name.strip()
+    }
+    sql = _COMMENT_RE.sub("", sql)
+    writes, local = set(), {m.lower() for m in _CTE_RE.findall(sql)}
+    for temp, name in _WRITE_RE.findall(sql):
+        (local if temp else writes).add(name.lower())
+    reads = {m.lower() for m in _READ_RE.findall(sql)} | declared
+    return writes - local, reads - local
+
+
+def sql_dependencies(sql_files: list[Path]) -> dict[Path, list[Path]]:
+    """
+    For each file, the earlier files in ``sql_files`` it must run after:
+    those writing a table it reads or writes, or reading a table it writes.
+    Files with no such overlap are independent and may run concurrently;
+    anything that conflicts keeps its list order.
+    """
+    tables = {p: sql_tables(p.read_text(encoding="utf-8")) for p in sql_files}
+    deps: dict[Path, list[Path]] = {}
+    for i, path in enumerate(sql_files):
+        writes, reads = tables[path]
+        deps[path] = [
+            earlier
+            for earlier in sql_files[:i]
+            if tables[earlier][0] & (reads | writes) or tables[earlier][1] & writes
+        ]
+    return deps
+
+
+def reads_staging(sql_path: Path) -> bool:
+    return STAGING_VIEW in sql_tables(sql_path.read_text(encoding="utf-8"))[1]
+
+
+def plan_sql(con: duckdb.DuckDBPyConnection, full_refresh: bool = False) -> list[Path]:
+    """
+    The SQL files for this build, in ``SQL_FILES`` order: each table is
+    merged incrementally when it already exists, unless ``full_refresh``.
+    The dimension merges read the fact merge's delta, so they only run
+    incrementally when the fact does.
+    """
+    if full_refresh or not table_exists(con, table_name(FACT_SQL)):
+        return list(SQL_FILES)
+    return [MERGE_FACT_SQL] + [
+        MERGE_SQL[p] if table_exists(con, table_name(p)) else p for p in DIM_SQL
+    ]
+
+
+def register_staging(con: duckdb.DuckDBPyConnection, valid: pd.DataFrame | None = None) -> None:
+    """
+    Point the ``staging_transactions_valid`` view (read by the fact SQL) at
+    the validated rows: the in-memory frame when given, else the staging
+    parquet. Temporary, so it never outlives the connection.
+    """
+    if valid is None:
+        con.execute(
+            "CREATE OR REPLACE TEMP VIEW staging_transactions_valid AS "
+            f"SELECT * FROM read_parquet('{VALID_PATH.as_posix()}')"
+        )
+        return
+
+    table = pa.Table.from_pandas(valid, preserve_index=False)
+    # Categoricals arrive as dictionaries; store plain text like the parquet path
+    table = table.cast(
+        pa.schema(
+            f.with_type(f.type.value_type) if pa.types.is_dictionary(f.type) else f
+            for f in table.schema
+        )
+    )
+    con.register("staging_transactions_valid_arrow", table)
+    con.execute(
+        "CREATE OR REPLACE TEMP VIEW staging_transactions_valid AS "
+        "SELECT * FROM staging_transactions_valid_arrow"
+    )
 
-def main() -> None:
-    con = duckdb.connect(str(DB_PATH))
 
-    for sql_path in SQL_FILES:
-        if not sql_path.exists():
-            raise FileNotFoundError(f"Missing SQL file: {sql_path}")
+def _add_count(counts: dict[str, dict[str, int]], query: str, result) -> None:
+    query = _COMMENT_RE.sub("", query).lstrip()
+    match = _WRITE_RE.match(query)
+    if match is None or match.group(1):
+        return  # not a table write, or a temporary table
+    statement = query.split(None, 1)[0].upper()
+    kind = {"CREATE": "rows", "INSERT": "inserted", "DELETE": "deleted"}.get(statement)
+    row = result.fetchone() if kind else None
+    if row is not None:
+        table = counts.setdefault(match.group(2).lower(), {})
+        table[kind] = table.get(kind, 0) + int(row[0])
 
-        sql = sql_path.read_text(encoding="utf-8")
-        con.execute(sql)
-        print(f"✅ ran {sql_path}")
 
-    # Quick row-count checks
-    fact_count = con.execute("SELECT COUNT(*) FROM fact_transactions").fetchone()[0]
-    dates_count = con.execute("SELECT COUNT(*) FROM dim_dates").fetchone()[0]
-    dept_count = con.execute("SELECT COUNT(*) FROM dim_departments").fetchone()[0]
+def combine_row_counts(
+    total: dict[str, dict[str, int]], counts: dict[str, dict[str, int]]
+) -> None:
+    """
+    Fold one file's row counts into ``total`` (files run in dependency
+    order). A table's size stays known through later inserts and deletes.
+    """
+    for table, c in counts.items():
+        if "rows" in c:
+            total[table] = dict(c)
+            continue
+        t = total.setdefault(table, {})
+        for kind in ("inserted", "deleted"):
+            t[kind] = t.get(kind, 0) + c.get(kind, 0)
+        if "rows" in t:
+            t["rows"] += c.get("inserted", 0) - c.get("deleted", 0)
 
+
+def run_sql(
+    con: duckdb.DuckDBPyConnection, sql_path: Path, timer: StageTimer | None = None
+) -> dict[str, dict[str, int]]:
+    """
+    Run a SQL file one statement at a time, in a single transaction that
+    is rolled back if any statement fails, and return the row counts
+    DuckDB reports for each table it writes: ``rows`` after a
+    ``CREATE TABLE ... AS`` (the table's size), ``inserted`` / ``deleted``
+    for merges, so the build needs no extra ``COUNT(*)`` scans.
+    """
+    if not sql_path.exists():
+        raise FileNotFoundError(f"Missing SQL file: {sql_path}")
+
+    sql = sql_path.read_text(encoding="utf-8")
+    counts: dict[str, dict[str, int]] = {}
+    started = time.perf_counter()
+    with (timer or StageTimer()).stage(f"sql.{sql_path.stem}") as stage:
+        # One transaction per file: a merge's DELETE and INSERT land
+        # together or not at all
+        con.begin()
+        try:
+            for statement in con.extract_statements(sql):
+                _add_count(counts, statement.query, con.execute(statement.query))
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        stage["rows"] = sum(n for table in counts.values() for n in table.values())
+    written = ", ".join(
+        f"{table} {' '.join(f'{k}={n}' for k, n in c.items())}" for table, c in counts.items()
+    )
+    # Files run concurrently: print through the DAG's lock
+    print_lines(f"✅ ran {sql_path} in {time.perf_counter() - started:.2f}s ({written or 'no rows'})")
+    return counts
+
+
+def run_sql_files(
+    con: duckdb.DuckDBPyConnection,
+    sql_files: list[Path],
+    timer: StageTimer | None = None,
+    threads: int | None = None,
+    valid: pd.DataFrame | None = None,
+) -> dict[str, dict[str, int]]:
+    """
+    Run ``sql_files`` in dependency order (``sql_dependencies``), each on
+    its own cursor; independent files run concurrently, at most ``threads``
+    at a time. Files reading the staging view get it registered on their
+    cursor (from ``valid`` when given). Returns the row counts of every
+    table written; raises ``StepFailed`` if a file fails.
+    """
+    deps = sql_dependencies(sql_files)
+
+    def step(sql_path: Path):
+        def run(*_upstream):
+            cur = con.cursor()
+            if reads_staging(sql_path):
+                register_staging(cur, valid)
+            return run_sql(cur, sql_path, timer)
+
+        return run
+
+    results = run_dag(
+        [
+            Step(p.stem, step(p), deps=tuple(d.stem for d in deps[p]), title=str(p))
+            for p in sql_files
+        ],
+        max_workers=threads,
+    )
+    counts: dict[str, dict[str, int]] = {}
+    for sql_path in sql_files:
+        combine_row_counts(counts, results[sql_path.stem])
+    return counts
+
+
+def update_id_index(
+    con: duckdb.DuckDBPyConnection, timer: StageTimer | None = None
+) -> TransactionIdIndex:
+    """
+    Add the ids the last incremental fact merge inserted to the id index,
+    instead of rehashing the whole fact table (rebuilt if it is missing).
+    """
+    if not ID_INDEX_PATH.exists():
+        return rebuild_id_index(con, timer)
+    with (timer or StageTimer()).stage("id_index") as stage:
+        index = TransactionIdIndex.load(ID_INDEX_PATH)
+        reader = con.execute(
+            f"SELECT transaction_id FROM {DELTA_TABLE} WHERE is_new AND transaction_id IS NOT NULL"
+        ).to_arrow_reader(100_000)
+        added = sum(index.add(hash_ids(batch.column(0).to_pandas())) for batch in reader)
+        if added:
+            index.save()
+        stage["rows"] = added
+    return index
+
+
+def rebuild_id_index(
+    con: duckdb.DuckDBPyConnection, timer: StageTimer | None = None
+) -> TransactionIdIndex:
+    """Ids now in the warehouse, probed by validation for cross-run duplicates."""
+    with (timer or StageTimer()).stage("id_index") as stage:
+        reader = con.execute("SELECT transaction_id FROM fact_transactions").to_arrow_reader(
+            100_000
+        )
+        index = TransactionIdIndex.rebuild(
+            ID_INDEX_PATH, (batch.column(0).to_pandas() for batch in reader)
+        )
+        stage["rows"] = len(index)
+    return index
+
+
+def write_build_metrics(
+    timer: StageTimer, row_counts: dict[str, dict[str, int]] | None = None
+) -> Path:
+    """
+    Per-SQL-file timings and the row counts of the tables written, as
+    ``metrics/build_<ts>.json`` (see summarize_runs --kind build).
+    """
+    METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    now = datetime.now()
+    # Microseconds: scheduler micro-batches can build within the same second
+    out_path = METRICS_DIR / f"build_{now.strftime('%Y%m%d_%H%M%S_%f')}.json"
+    payload = {
+        "run": {"timestamp": now.isoformat(timespec="seconds")},
+        "timings": timer.to_dict(),
+        "tables": row_counts or {},
+    }
+    out_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    return out_path
+
+
+def print_summary(
+    con: duckdb.DuckDBPyConnection,
+    index: TransactionIdIndex,
+    row_counts: dict[str, dict[str, int]] | None = None,
+) -> None:
+    """
+    Row counts of the warehouse tables, as reported while building them,
+    followed by the rows inserted / deleted for merged tables. Tables whose
+    size the build did not report (merged into, or restored from the step
+    cache) are counted with a query.
+    """
     print("\nBuild complete:")
-    print(f"- fact_transactions: {fact_count}")
-    print(f"- dim_dates: {dates_count}")
-    print(f"- dim_departments: {dept_count}")
+    for table in (table_name(p) for p in SQL_FILES):
+        counts = (row_counts or {}).get(table, {})
+        rows = counts.get("rows")
+        if rows is None:
+            rows = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        line = f"- {table}: {rows}"
+        if "inserted" in counts or "deleted" in counts:
+            line += f" (+{counts.get('inserted', 0)} / -{counts.get('deleted', 0)} merged)"
+        print(line)
+    print(f"- transaction id index: {len(index)} ids -> {ID_INDEX_PATH}")
+
+
+def main() -> None:
+    args = parse_args()
+    con = duckdb.connect(str(DB_PATH))
+    timer = StageTimer()
+
+    sql_files = plan_sql(con, args.full_refresh)
+    try:
+        row_counts = run_sql_files(con, sql_files, timer, args.threads)
+    except StepFailed as e:
+        sys.exit(e.exit_code)
+
+    incremental = MERGE_FACT_SQL in sql_files
+    index = (update_id_index if incremental else rebuild_id_index)(con, timer)
+    print_summary(con, index, row_counts)
+    print(f"Timings -> {write_build_metrics(timer, row_counts)}")
 
 
 if __name__ == "__main__":